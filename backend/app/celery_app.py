@@ -13,7 +13,34 @@ celery_app.conf.update(
         "app.services.pdf_processor.process_submission_task": {"queue": "extraction"},
         "app.services.embedding_service.embed_submission_slides_task": {"queue": "embedding"},
         "app.services.embedding_service.auto_categorize_project_task": {"queue": "embedding"},
-        "app.services.evaluation_service.evaluate_submission_task": {"queue": "evaluation"}
+        "app.services.plagiarism_service.detect_plagiarism_task": {"queue": "embedding"},
+        "app.services.evaluation_service.evaluate_submission_task": {"queue": "evaluation"},
+        "app.services.evaluation_service.evaluate_project_batch_task": {"queue": "evaluation"},
+        "app.services.lease_service.reap_expired_leases": {"queue": "maintenance"}
+    },
+    # Requeues pipeline tasks whose worker stopped heartbeating (see app/services/lease_service.py).
+    # Runs on its own `maintenance` queue so it is never stuck behind pipeline work; a tick not
+    # picked up before the next one is superseded by it.
+    beat_schedule={
+        "reap-expired-leases": {
+            "task": "app.services.lease_service.reap_expired_leases",
+            "schedule": float(os.getenv("LEASE_REAP_INTERVAL", "10")),
+            "options": {"queue": "maintenance", "expires": float(os.getenv("LEASE_REAP_INTERVAL", "10"))}
+        }
     }
 )
-celery_app.autodiscover_tasks(["app.services.embedding_service", "app.services.pdf_processor", "app.services.evaluation_service"])
+celery_app.autodiscover_tasks(["app.services.embedding_service", "app.services.pdf_processor", "app.services.evaluation_service", "app.services.plagiarism_service", "app.services.lease_service"])
+
+
+def send_task_group(task_name: str, arg_lists, queue: str):
+    """
+    Publishes one `task_name` message per args list as a Celery group, so the whole batch goes
+    out over a single broker connection instead of one connection checkout per send_task call.
+    """
+    from celery import group
+    arg_lists = list(arg_lists)
+    if not arg_lists:
+        return None
+    return group(
+        celery_app.signature(task_name, args=args, queue=queue) for args in arg_lists
+    ).apply_async()
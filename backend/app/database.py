@@ -1,10 +1,15 @@
 
 import os
+import functools
+import anyio
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
 load_dotenv()
 
+# Max supabase calls from async routes in flight at once (each holds a worker thread)
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "20"))
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
@@ -38,3 +43,29 @@ except Exception as e:
         def execute(self): return None
     admin_supabase = DummyClient()
     anon_supabase = DummyClient()
+
+
+# ---------------------------------------------------------------------------
+# Non-blocking access from async routes
+# ---------------------------------------------------------------------------
+# The supabase client is synchronous. Calling it directly inside an `async def` route
+# blocks the event loop for every other request until PostgREST answers, so routes go
+# through these helpers, which run the call in a worker thread. A dedicated limiter
+# bounds how many run at once, so a burst of dashboard requests can't exhaust the
+# shared threadpool or open hundreds of PostgREST connections.
+
+_db_limiter = None
+
+def _get_db_limiter() -> anyio.CapacityLimiter:
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(DB_MAX_CONCURRENCY)
+    return _db_limiter
+
+async def run_db(fn, *args, **kwargs):
+    """Runs a blocking call (supabase, or a sync helper that uses it) off the event loop."""
+    return await anyio.to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=_get_db_limiter())
+
+async def db_execute(query):
+    """`await db_execute(admin_supabase.table(...).select(...))` — non-blocking `.execute()`."""
+    return await run_db(query.execute)
@@ -1,19 +1,20 @@
 
 from fastapi import APIRouter, Depends, Header, HTTPException
-from app.services.auth import get_current_user, sync_user_to_db, update_user_profile
+from app.services.auth import get_current_user, get_current_user_full, sync_user_to_db, update_user_profile
+from app.database import run_db
 from app.schemas import UserResponse, UserUpdate
 
 router = APIRouter()
 
 @router.post("/auth/sync", response_model=UserResponse)
-async def sync_user_endpoint(user = Depends(get_current_user)):
+async def sync_user_endpoint(user = Depends(get_current_user_full)):
     """
     Called by frontend after Google Login.
-    1. Verifies the token (via get_current_user dependency)
+    1. Verifies the token and loads the full user with identities (get_current_user_full)
     2. Syncs user to public.users table
     3. Returns user profile
     """
-    synced_user = sync_user_to_db(user)
+    synced_user = await run_db(sync_user_to_db, user)
     return synced_user
 
 @router.put("/auth/profile", response_model=UserResponse)
@@ -24,7 +25,7 @@ async def update_profile_endpoint(
     """
     Update logged-in user's profile details
     """
-    updated_user = update_user_profile(user.id, updates)
+    updated_user = await run_db(update_user_profile, user.id, updates)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found or update failed")
     return updated_user
\ No newline at end of file
@@ -1,59 +1,87 @@
-from fastapi import APIRouter, Depends, Header, BackgroundTasks, HTTPException
-from app.services.auth import get_current_user
+from fastapi import APIRouter, Depends, Header, BackgroundTasks, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.services.auth import get_current_user, get_current_user_sse
 from app.services.projects import create_project_in_db
 from app.services.google_drive import list_files_in_folder, scan_and_store_submissions
-from app.celery_app import celery_app
+from app.celery_app import celery_app, send_task_group
 from app.schemas import ProjectCreateRequest, ProjectResponse, ProcessingStartResponse, ParseRubricRequest
-from app.database import admin_supabase
+from app.database import admin_supabase, db_execute, run_db
+from app.services.redis_service import register_awaiting_categorization
+from app.services.progress_service import reset_progress, get_progress_snapshot, progress_channel, get_async_redis
+from app.services.qdrant_service import find_similar_submissions
+from app.services.search_service import search_project_slides
+from app.services.evaluation_service import EVAL_BATCH_MODE, _select_all
+from app.services.leaderboard_service import build_leaderboard, leaderboard_etag
 import re
+import gzip
+import hashlib
 import httpx
+import json
 import os
+import orjson
 router = APIRouter()
 
+SSE_HEARTBEAT_SECONDS = 15
+
 @router.get("/projects")
 async def get_projects(current_user = Depends(get_current_user)):
     """Fetch all projects owned by the current user."""
-    result = admin_supabase.table("projects") \
-        .select("*") \
-        .eq("owner_user_id", current_user.id) \
-        .order("created_at", desc=True) \
-        .execute()
+    result = await db_execute(
+        admin_supabase.table("projects")
+        .select("*")
+        .eq("owner_user_id", current_user.id)
+        .order("created_at", desc=True)
+    )
     return {"projects": result.data or []}
 
 @router.get("/projects/{project_id}/details")
-async def get_project_details(project_id: str, current_user = Depends(get_current_user)):
-    """Return project + all submissions + slide counts."""
-    project_res = (
+async def get_project_details(
+    project_id: str,
+    limit: int = Query(500, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    current_user = Depends(get_current_user)
+):
+    """
+    Return project + one page of submissions with slide counts, latest job status and
+    weighted aggregate score — all from a single RPC (migrations/003_project_submission_summaries.sql).
+    """
+    project_res = await db_execute(
         admin_supabase.table("projects")
         .select("*")
         .eq("project_id", project_id)
         .eq("owner_user_id", current_user.id)
         .single()
-        .execute()
     )
     if not project_res.data:
         raise HTTPException(status_code=404, detail="Project not found.")
 
-    submissions_res = (
+    summaries_res = await db_execute(admin_supabase.rpc("project_submission_summaries", {
+        "p_project_id": project_id,
+        "p_limit": limit,
+        "p_offset": offset
+    }))
+    submissions = summaries_res.data or []
+
+    # Counted on its own: a page past the end has no rows to read `total_count` from
+    total_res = await db_execute(
         admin_supabase.table("submissions")
-        .select("*")
+        .select("submission_id", count="exact")
         .eq("project_id", project_id)
-        .order("created_at", desc=True)
-        .execute()
+        .limit(1)
     )
-    submissions = submissions_res.data or []
-
-    # Attach slide count per submission
+    total = total_res.count or 0
     for sub in submissions:
-        slides_res = (
-            admin_supabase.table("submission_slides")
-            .select("slide_id", count="exact")
-            .eq("submission_id", sub["submission_id"])
-            .execute()
-        )
-        sub["slide_count"] = slides_res.count or 0
+        sub.pop("total_count", None)
 
-    return {"project": project_res.data, "submissions": submissions}
+    return {
+        "project": project_res.data,
+        "submissions": submissions,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": offset + len(submissions) < total
+    }
 
 @router.post("/projects/create", response_model=ProjectResponse)
 async def create_project(project: ProjectCreateRequest, current_user = Depends(get_current_user)):
@@ -127,13 +155,12 @@ async def start_scan(project_id: str, current_user = Depends(get_current_user)):
     'pending' submissions in the database. Called right after project creation.
     """
     # Verify ownership and get drive_folder_url
-    project_res = (
+    project_res = await db_execute(
         admin_supabase.table("projects")
         .select("project_id, drive_folder_url")
         .eq("project_id", project_id)
         .eq("owner_user_id", current_user.id)
         .single()
-        .execute()
     )
     if not project_res.data:
         raise HTTPException(status_code=404, detail="Project not found or access denied.")
@@ -154,6 +181,31 @@ async def start_scan(project_id: str, current_user = Depends(get_current_user)):
     }
 
 
+PDF_EXTRACTION_TASK = "app.services.pdf_processor.process_submission_task"
+
+
+async def _queue_extraction(project_id: str, sub_ids: list, log_tag: str):
+    """
+    Creates (or resets to 'queued') the pdf_extraction job row of every submission in one
+    upsert — rows must exist before any worker looks them up with _get_job_id_sync() — then
+    publishes all extraction tasks as one Celery group.
+    """
+    try:
+        await db_execute(
+            admin_supabase.table("processing_jobs").upsert([
+                {"job_type": "pdf_extraction", "submission_id": sub_id, "project_id": project_id, "status": "queued"}
+                for sub_id in sub_ids
+            ], on_conflict="submission_id,job_type")
+        )
+    except Exception as e:
+        # Non-fatal — workers will still run, just won't have job tracking
+        print(f"[{log_tag}] WARNING: Could not upsert pdf_extraction jobs for project {project_id}: {e}")
+
+    await run_in_threadpool(
+        send_task_group, PDF_EXTRACTION_TASK, ([sub_id, project_id] for sub_id in sub_ids), "extraction"
+    )
+
+
 @router.post("/projects/{project_id}/start-processing", response_model=ProcessingStartResponse)
 async def start_processing(
     project_id: str,
@@ -164,24 +216,22 @@ async def start_processing(
     Returns immediately with a count of queued submissions.
     """
     # Verify project exists and belongs to this user
-    project_res = (
+    project_res = await db_execute(
         admin_supabase.table("projects")
         .select("project_id, project_name, status")
         .eq("project_id", project_id)
         .eq("owner_user_id", current_user.id)
         .single()
-        .execute()
     )
     if not project_res.data:
         raise HTTPException(status_code=404, detail="Project not found or access denied.")
 
     # Fetch pending submissions so we can report back right away and queue them
-    pending_res = (
+    pending_res = await db_execute(
         admin_supabase.table("submissions")
         .select("submission_id")
         .eq("project_id", project_id)
         .eq("processing_status", "pending")
-        .execute()
     )
     
     pending_submissions = pending_res.data or []
@@ -194,39 +244,11 @@ async def start_processing(
             queued=0
         )
 
-    # For each pending submission: create the pdf_extraction job row FIRST, then fire Celery.
-    # This ensures _get_job_id_sync() inside the worker can find the row immediately.
-    for sub in pending_submissions:
-        sub_id = sub["submission_id"]
-        try:
-            # Upsert the pdf_extraction job row (Bug 3 fix: it was never created here before)
-            existing_job = admin_supabase.table("processing_jobs") \
-                .select("job_id") \
-                .eq("submission_id", sub_id) \
-                .eq("job_type", "pdf_extraction") \
-                .execute()
-            if not existing_job.data:
-                admin_supabase.table("processing_jobs").insert({
-                    "job_type": "pdf_extraction",
-                    "submission_id": sub_id,
-                    "project_id": project_id,
-                    "status": "queued"
-                }).execute()
-            else:
-                # Reset to queued if it already exists (e.g. after a reset-submissions)
-                admin_supabase.table("processing_jobs").update({"status": "queued"}) \
-                    .eq("submission_id", sub_id) \
-                    .eq("job_type", "pdf_extraction") \
-                    .execute()
-        except Exception as e:
-            # Non-fatal — worker will still run, just won't have job tracking
-            print(f"[start-processing] WARNING: Could not upsert pdf_extraction job for {sub_id}: {e}")
+    # Register them with the categorization barrier before any worker can finish
+    await run_db(register_awaiting_categorization, project_id, [s["submission_id"] for s in pending_submissions])
+    await run_db(reset_progress, project_id, pending_count)
 
-        celery_app.send_task(
-            "app.services.pdf_processor.process_submission_task",
-            args=[sub_id, project_id],
-            queue="extraction"
-        )
+    await _queue_extraction(project_id, [s["submission_id"] for s in pending_submissions], "start-processing")
 
     return ProcessingStartResponse(
         message=f"Processing started for {pending_count} submission(s).",
@@ -242,65 +264,55 @@ async def reset_submissions(project_id: str, current_user = Depends(get_current_
     then immediately queue fresh extraction tasks — all in one call.
     (Bug 1 fix: previously only reset status, never queued any tasks.)
     """
-    project_res = (
+    project_res = await db_execute(
         admin_supabase.table("projects")
         .select("project_id")
         .eq("project_id", project_id)
         .eq("owner_user_id", current_user.id)
         .single()
-        .execute()
     )
     if not project_res.data:
         raise HTTPException(status_code=404, detail="Project not found or access denied.")
 
     # 1. Fetch all submission IDs for this project
-    sub_ids_res = admin_supabase.table("submissions") \
-        .select("submission_id") \
-        .eq("project_id", project_id) \
-        .execute()
+    sub_ids_res = await db_execute(
+        admin_supabase.table("submissions")
+        .select("submission_id")
+        .eq("project_id", project_id)
+    )
     sub_ids = [s["submission_id"] for s in (sub_ids_res.data or [])]
 
     if not sub_ids:
         return {"message": "No submissions found.", "project_id": project_id, "queued": 0}
 
     # 2. Delete old slides
-    admin_supabase.table("submission_slides") \
-        .delete() \
-        .in_("submission_id", sub_ids) \
-        .execute()
+    await db_execute(
+        admin_supabase.table("submission_slides")
+        .delete()
+        .in_("submission_id", sub_ids)
+    )
 
     # 3. Delete stale processing_jobs so progress tracking starts fresh
-    admin_supabase.table("processing_jobs") \
-        .delete() \
-        .in_("submission_id", sub_ids) \
-        .execute()
+    await db_execute(
+        admin_supabase.table("processing_jobs")
+        .delete()
+        .in_("submission_id", sub_ids)
+    )
 
     # 4. Reset all submissions to 'pending'
-    admin_supabase.table("submissions") \
-        .update({"processing_status": "pending"}) \
-        .eq("project_id", project_id) \
-        .execute()
-
-    # 5. Create pdf_extraction job rows + queue Celery tasks
-    #    (Same logic as start-processing — Bug 1: this was completely missing before)
-    queued = 0
-    for sub_id in sub_ids:
-        try:
-            admin_supabase.table("processing_jobs").insert({
-                "job_type": "pdf_extraction",
-                "submission_id": sub_id,
-                "project_id": project_id,
-                "status": "queued"
-            }).execute()
-        except Exception as e:
-            print(f"[reset-submissions] WARNING: Could not create pdf_extraction job for {sub_id}: {e}")
+    await db_execute(
+        admin_supabase.table("submissions")
+        .update({"processing_status": "pending"})
+        .eq("project_id", project_id)
+    )
 
-        celery_app.send_task(
-            "app.services.pdf_processor.process_submission_task",
-            args=[sub_id, project_id],
-            queue="extraction"
-        )
-        queued += 1
+    # 5. Start a fresh categorization barrier for this run
+    await run_db(register_awaiting_categorization, project_id, sub_ids, reset=True)
+    await run_db(reset_progress, project_id, len(sub_ids))
+
+    # 6. Create pdf_extraction job rows + queue Celery tasks
+    await _queue_extraction(project_id, sub_ids, "reset-submissions")
+    queued = len(sub_ids)
 
     return {
         "message": f"Reset complete. {queued} submission(s) queued for re-processing.",
@@ -309,41 +321,308 @@ async def reset_submissions(project_id: str, current_user = Depends(get_current_
     }
 
 
+@router.post("/projects/{project_id}/evaluate-batch")
+async def evaluate_batch(project_id: str, force_refresh: bool = False, current_user = Depends(get_current_user)):
+    """
+    Queue (or resume) project-wide batch evaluation. Criteria already scored for a
+    submission are skipped, so calling this again after a crash continues the run.
+    `force_refresh=true` bypasses the LLM response cache.
+    """
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    task = await run_in_threadpool(
+        celery_app.send_task,
+        "app.services.evaluation_service.evaluate_project_batch_task",
+        args=[project_id],
+        kwargs={"force_refresh": force_refresh},
+        queue="evaluation"
+    )
+    return {"message": "Batch evaluation queued.", "project_id": project_id, "task_id": task.id}
+
+
+@router.post("/projects/{project_id}/re-evaluate")
+async def re_evaluate(project_id: str, current_user = Depends(get_current_user)):
+    """
+    Re-run evaluation after a rubric or problem statement change — no re-extraction or
+    re-embedding. Each score is fingerprinted, so only the criteria/submissions whose
+    inputs changed are sent to the judge again.
+    """
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    subs = await run_db(_select_all, lambda: admin_supabase.table("submissions")
+                        .select("submission_id")
+                        .eq("project_id", project_id)
+                        .in_("processing_status", ["processing", "completed"])
+                        .order("submission_id"))
+    submission_ids = [s["submission_id"] for s in subs]
+    if not submission_ids:
+        return {"message": "No evaluated submissions to re-evaluate.", "project_id": project_id, "queued": 0}
+
+    if EVAL_BATCH_MODE:
+        await run_in_threadpool(
+            celery_app.send_task,
+            "app.services.evaluation_service.evaluate_project_batch_task",
+            args=[project_id],
+            queue="evaluation"
+        )
+    else:
+        await db_execute(
+            admin_supabase.table("processing_jobs").update({"status": "queued"})
+            .eq("project_id", project_id)
+            .eq("job_type", "evaluation")
+        )
+        await run_in_threadpool(
+            send_task_group, "app.services.evaluation_service.evaluate_submission_task",
+            ([sub_id] for sub_id in submission_ids), "evaluation"
+        )
+
+    return {
+        "message": f"Re-evaluation queued for {len(submission_ids)} submission(s); unchanged criteria are skipped.",
+        "project_id": project_id,
+        "queued": len(submission_ids)
+    }
+
+
+@router.get("/projects/{project_id}/leaderboard")
+async def get_leaderboard(
+    project_id: str,
+    request: Request,
+    problem_statement_id: str = None,
+    limit: int = Query(500, ge=1, le=1000),
+    cursor: str = None,
+    current_user = Depends(get_current_user)
+):
+    """
+    Ranked, weighted leaderboard (materialized as scores arrive — see migrations/004_leaderboard.sql
+    and 007_leaderboard_versions.sql).
+    Optional `problem_statement_id` filter, keyset pagination via `cursor` / `next_cursor`,
+    and an ETag on the board version: unchanged boards answer 304 or come from the Redis cache.
+    """
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id, project_name, max_score")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    # The version has its own row (migrations/007_leaderboard_versions.sql); none yet means no scores
+    version_res = await db_execute(
+        admin_supabase.table("leaderboard_versions")
+        .select("version")
+        .eq("project_id", project_id)
+        .limit(1)
+    )
+    version = version_res.data[0]["version"] if version_res.data else 0
+    project = {**project_res.data, "leaderboard_version": version}
+
+    etag = leaderboard_etag(project_id, version, problem_statement_id, limit, cursor)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        body = await run_db(build_leaderboard, project, etag, problem_statement_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return JSONResponse(body, headers=headers)
+
+
+SLIDE_FIELDS = (
+    "slide_id", "submission_id", "project_id", "slide_number", "text_content", "tables_data",
+    "images_ocr_text", "element_counts", "complexity_score", "qdrant_indexed", "qdrant_indexed_at"
+)
+COMPRESS_MIN_BYTES = 1024
+
+
+def _compact_json_response(request: Request, body: dict) -> Response:
+    """
+    orjson-encoded response with a content-hash ETag (304 on If-None-Match) and gzip / brotli
+    compression when the client accepts it. Brotli needs the optional `brotli` package.
+    """
+    payload = orjson.dumps(body)
+    etag = f'W/"{hashlib.sha1(payload).hexdigest()[:20]}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    accepted = request.headers.get("accept-encoding", "")
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        if "br" in accepted:
+            try:
+                import brotli
+                payload = brotli.compress(payload, quality=5)
+                headers["Content-Encoding"] = "br"
+            except ImportError:
+                pass
+        if "Content-Encoding" not in headers and "gzip" in accepted:
+            payload = gzip.compress(payload, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
 @router.get("/submissions/{submission_id}/slides")
-async def get_submission_slides(submission_id: str, current_user = Depends(get_current_user)):
-    """Return all extracted slide data for a submission, ordered by slide number."""
-    slides_res = (
-        admin_supabase.table("submission_slides")
-        .select("*")
+async def get_submission_slides(
+    submission_id: str,
+    request: Request,
+    fields: str = None,
+    after: int = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_user = Depends(get_current_user)
+):
+    """
+    Extracted slide data for a submission, ordered by slide number.
+    `fields=slide_number,text_content` selects columns (default: all); pages are keyed by
+    slide number — pass `next_cursor` back as `after` for the next page.
+    """
+    columns = list(SLIDE_FIELDS)
+    if fields:
+        columns = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = set(columns) - set(SLIDE_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown slide field(s): {', '.join(sorted(unknown))}")
+    if "slide_number" not in columns:
+        columns.append("slide_number")  # the pagination key
+
+    query = admin_supabase.table("submission_slides") \
+        .select(",".join(columns)) \
+        .eq("submission_id", submission_id)
+    if after is not None:
+        query = query.gt("slide_number", after)
+    slides_res = await db_execute(query.order("slide_number").limit(limit))
+    slides = slides_res.data or []
+
+    next_cursor = slides[-1]["slide_number"] if len(slides) == limit else None
+    return _compact_json_response(request, {"slides": slides, "next_cursor": next_cursor})
+
+@router.get("/projects/{project_id}/search")
+async def search_slides(
+    project_id: str,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    hybrid: bool = True,
+    current_user = Depends(get_current_user)
+):
+    """
+    Semantic search over the project's slides, grouped per team with highlighted snippets.
+    `hybrid=true` (default) fuses in BM25 keyword matches for exact terms.
+    """
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    try:
+        return await run_db(search_project_slides, project_id, q, limit=limit, hybrid=hybrid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Slide search failed: {e}")
+
+@router.get("/submissions/{submission_id}/similar")
+async def get_similar_submissions(submission_id: str, limit: int = 5, current_user = Depends(get_current_user)):
+    """Return the teams whose decks are closest to this submission (centroid-vector search)."""
+    sub_res = await db_execute(
+        admin_supabase.table("submissions")
+        .select("submission_id, project_id")
         .eq("submission_id", submission_id)
-        .order("slide_number")
-        .execute()
+        .single()
+    )
+    if not sub_res.data:
+        raise HTTPException(status_code=404, detail="Submission not found.")
+
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id")
+        .eq("project_id", sub_res.data["project_id"])
+        .eq("owner_user_id", current_user.id)
+        .single()
     )
-    return {"slides": slides_res.data or []}
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    try:
+        similar = await run_db(find_similar_submissions, sub_res.data["project_id"], submission_id, limit=min(limit, 50))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Similarity search failed: {e}")
+    return {"submission_id": submission_id, "similar": similar}
+
+@router.get("/projects/{project_id}/plagiarism")
+async def get_plagiarism_flags(project_id: str, current_user = Depends(get_current_user)):
+    """Return slide pairs flagged as near-duplicates across submissions, most similar first."""
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id, plagiarism_detection_enabled")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    flags_res = await db_execute(
+        admin_supabase.table("plagiarism_flags")
+        .select("*")
+        .eq("project_id", project_id)
+        .order("vector_similarity", desc=True)
+    )
+    return {
+        "enabled": project_res.data.get("plagiarism_detection_enabled", False),
+        "flags": flags_res.data or []
+    }
 
 @router.get("/projects/{project_id}/embedding-progress")
 async def get_embedding_progress(project_id: str, current_user = Depends(get_current_user)):
     """Return real-time metrics on the extraction, embedding, and categorization progress."""
+    # Runs started since progress tracking moved to Redis are answered from the counters
+    try:
+        snapshot = await run_db(get_progress_snapshot, project_id)
+        if snapshot is not None:
+            return snapshot
+    except Exception as e:
+        print(f"[embedding-progress] Redis snapshot unavailable, counting rows instead: {e}")
+
     try:
         # Total Submissions
-        total_res = admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id).execute()
+        total_res = await db_execute(admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id))
         total = total_res.count or 0
 
         if total == 0:
             return {"total_submissions": 0, "extraction_complete": 0, "embedding_complete": 0, "categorization_complete": 0}
 
         # Extracted (or higher)
-        extracted_res = admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id).neq("processing_status", "pending").execute()
+        extracted_res = await db_execute(admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id).neq("processing_status", "pending"))
         # Anything past 'pending' (e.g., extracted, indexed, categorized) has been extracted
         extracted = extracted_res.count or 0
 
         # Categorized — 'completed' is the final status after auto-categorization runs
         # ('categorized' was the old value but is NOT in the DB CHECK constraint)
-        cat_res = admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id).eq("processing_status", "completed").execute()
+        cat_res = await db_execute(admin_supabase.table("submissions").select("submission_id", count="exact").eq("project_id", project_id).eq("processing_status", "completed"))
         categorized = cat_res.count or 0
 
         # Embedded: look up processing_jobs where job_type='embedding' (not 'embed_submission_slides')
-        emb_res = admin_supabase.table("processing_jobs").select("job_id", count="exact").eq("project_id", project_id).eq("job_type", "embedding").eq("status", "completed").execute()
+        emb_res = await db_execute(admin_supabase.table("processing_jobs").select("job_id", count="exact").eq("project_id", project_id).eq("job_type", "embedding").eq("status", "completed"))
         embedded = emb_res.count or 0
         
         # Calculate ETA (rough estimate: 2s per remaining extraction, 2s per remaining embedding)
@@ -360,28 +639,75 @@ async def get_embedding_progress(project_id: str, current_user = Depends(get_cur
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+@router.get("/projects/{project_id}/progress/stream")
+async def stream_progress(project_id: str, request: Request, current_user = Depends(get_current_user_sse)):
+    """
+    Server-Sent Events feed of pipeline progress. Sends a `snapshot` event on connect, then a
+    `progress` event (delta + fresh counts/ETA) for every stage transition workers publish.
+    Idle connections cost one Redis subscription and a heartbeat comment every 15 seconds.
+    """
+    project_res = await db_execute(
+        admin_supabase.table("projects")
+        .select("project_id")
+        .eq("project_id", project_id)
+        .eq("owner_user_id", current_user.id)
+        .single()
+    )
+    if not project_res.data:
+        raise HTTPException(status_code=404, detail="Project not found or access denied.")
+
+    async def event_stream():
+        client = get_async_redis()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(progress_channel(project_id))
+        try:
+            # Subscribe first, then snapshot — nothing published in between is lost
+            snapshot = await run_db(get_progress_snapshot, project_id)
+            yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=SSE_HEARTBEAT_SECONDS)
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: progress\ndata: {message['data']}\n\n"
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+            await client.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/projects/{project_id}/recover-stuck")
 async def recover_stuck(project_id: str, current_user = Depends(get_current_user)):
-    """Re-queue any submission stuck in 'processing' for more than 30 minutes."""
+    """
+    Re-queue any submission stuck in 'processing' for more than 30 minutes. Crashed workers are
+    normally recovered within seconds by the lease reaper (app/services/lease_service.py); this
+    is the manual fallback for work that exhausted its lease requeues.
+    """
     from datetime import datetime, timezone, timedelta
     cutoff = (datetime.now(timezone.utc) - timedelta(minutes=30)).isoformat()
 
-    stuck = admin_supabase.table("submissions") \
-        .select("submission_id") \
-        .eq("project_id", project_id) \
-        .eq("processing_status", "processing") \
-        .lt("updated_at", cutoff) \
-        .execute()
+    stuck = await db_execute(
+        admin_supabase.table("submissions")
+        .select("submission_id")
+        .eq("project_id", project_id)
+        .eq("processing_status", "processing")
+        .lt("updated_at", cutoff)
+    )
 
-    requeued = 0
-    for sub in (stuck.data or []):
-        admin_supabase.table("submissions").update({
+    stuck_ids = [sub["submission_id"] for sub in (stuck.data or [])]
+    await run_db(register_awaiting_categorization, project_id, stuck_ids)
+
+    if stuck_ids:
+        await db_execute(admin_supabase.table("submissions").update({
             "processing_status": "pending", "updated_at": datetime.now(timezone.utc).isoformat()
-        }).eq("submission_id", sub["submission_id"]).execute()
-        celery_app.send_task(
-            "app.services.pdf_processor.process_submission_task",
-            args=[sub["submission_id"], project_id], queue="extraction"
-        )
-        requeued += 1
+        }).in_("submission_id", stuck_ids))
+        await _queue_extraction(project_id, stuck_ids, "recover-stuck")
+    requeued = len(stuck_ids)
 
     return {"requeued": requeued, "project_id": project_id}
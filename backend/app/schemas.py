@@ -46,6 +46,7 @@ class ProjectCreateRequest(BaseModel):
     theme_desc: Optional[str] = None
     problem_statements: List[ProblemStatementRequest] = []
     scoring_criteria: List[ScoringCriterionRequest] = []
+    max_score: float = 10  # leaderboard scale: a weighted total is out of this
     
     # Feature Flags
     auto_categorization_enabled: bool = True
@@ -1,28 +1,256 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
 
-from fastapi import HTTPException, status, Header
-from typing import Optional
-from app.database import admin_supabase
+import jwt
+from fastapi import HTTPException, status, Header, Query
 
-async def get_current_user(authorization: str = Header(...)):
+from app.database import admin_supabase, run_db, SUPABASE_URL
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Local token verification
+#
+# Supabase access tokens are JWTs signed either with the project's shared secret (HS256,
+# SUPABASE_JWT_SECRET) or with asymmetric signing keys published at the JWKS endpoint.
+# Verifying them here avoids a round-trip to the auth server on every request; the remote
+# get_user call is only used when no local key material is available.
+# ---------------------------------------------------------------------------
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else ""
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = 30      # floor between refetches triggered by an unknown `kid`
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+JWT_LEEWAY_SECONDS = 10
+
+
+@dataclass
+class AuthUser:
+    """The subset of the Supabase user that the API needs, built from verified token claims."""
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    user_metadata: Dict[str, Any] = field(default_factory=dict)
+    app_metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class _SigningKeys:
+    """kid -> key cache for the project JWKS, refreshed by a daemon thread."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self._keys: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._last_fetch = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        import httpx
+        try:
+            res = httpx.get(self.url, timeout=5)
+            res.raise_for_status()
+            keys = {}
+            for jwk in res.json().get("keys", []):
+                try:
+                    keys[jwk.get("kid")] = jwt.PyJWK(jwk)
+                except Exception as e:
+                    logger.warning(f"[Auth] Skipping unusable JWK {jwk.get('kid')}: {e}")
+            with self._lock:
+                self._keys = keys
+                self._last_fetch = time.monotonic()
+            return True
+        except Exception as e:
+            logger.warning(f"[Auth] JWKS refresh from {self.url} failed: {e}")
+            with self._lock:
+                self._last_fetch = time.monotonic()
+            return False
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(JWKS_REFRESH_SECONDS)
+            self.refresh()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name="jwks-refresh", daemon=True)
+        self.refresh()
+        self._thread.start()
+
+    def get(self, kid: Optional[str]):
+        with self._lock:
+            return self._keys.get(kid)
+
+    def has_keys(self) -> bool:
+        with self._lock:
+            return bool(self._keys)
+
+    def may_refetch(self) -> bool:
+        with self._lock:
+            return time.monotonic() - self._last_fetch >= JWKS_MIN_REFETCH_SECONDS
+
+
+_signing_keys = _SigningKeys(SUPABASE_JWKS_URL) if SUPABASE_JWKS_URL else None
+
+# token digest -> (expires_at, AuthUser); bounded LRU
+_user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+
+def _cache_get(digest: str) -> Optional[AuthUser]:
+    with _user_cache_lock:
+        hit = _user_cache.get(digest)
+        if hit is None:
+            return None
+        if hit[0] <= time.time():
+            del _user_cache[digest]
+            return None
+        _user_cache.move_to_end(digest)
+        return hit[1]
+
+
+def _cache_put(digest: str, user: AuthUser, token_exp: Optional[float]):
+    expires_at = time.time() + AUTH_USER_CACHE_TTL
+    if token_exp:
+        expires_at = min(expires_at, token_exp)
+    with _user_cache_lock:
+        _user_cache[digest] = (expires_at, user)
+        _user_cache.move_to_end(digest)
+        while len(_user_cache) > AUTH_USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> AuthUser:
+    return AuthUser(
+        id=claims["sub"],
+        email=claims.get("email"),
+        role=claims.get("role"),
+        user_metadata=claims.get("user_metadata") or {},
+        app_metadata=claims.get("app_metadata") or {},
+    )
+
+
+async def _resolve_key(token: str):
+    """Verification key for the token, or None when local verification is not configured."""
+    header = jwt.get_unverified_header(token)
+    alg = header.get("alg")
+    if alg == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            return None
+        return SUPABASE_JWT_SECRET
+    if _signing_keys is None:
+        return None
+
+    if _signing_keys._thread is None:
+        await run_db(_signing_keys.start)  # first fetch, then background refresh
+    key = _signing_keys.get(header.get("kid"))
+    if key is None and _signing_keys.may_refetch():
+        # Key rotation: the token was signed with a key published after our last fetch
+        await run_db(_signing_keys.refresh)
+        key = _signing_keys.get(header.get("kid"))
+    if key is None:
+        if not _signing_keys.has_keys():
+            return None  # JWKS unreachable / empty: fall back to the auth server
+        raise jwt.InvalidTokenError("Unknown signing key")
+    return key
+
+
+async def verify_access_token(token: str) -> Optional[AuthUser]:
     """
-    Dependency to verify the Bearer token and return the user.
+    Verifies a Supabase access token locally. Returns None when no key material is
+    configured for the token's algorithm; raises jwt.InvalidTokenError on a bad token.
     """
+    key = await _resolve_key(token)
+    if key is None:
+        return None
+    algorithms = ["HS256"] if isinstance(key, str) else [key.algorithm_name]
+    claims = jwt.decode(
+        token,
+        key=key if isinstance(key, str) else key.key,
+        algorithms=algorithms,
+        audience=SUPABASE_JWT_AUDIENCE,
+        leeway=JWT_LEEWAY_SECONDS,
+        options={"require": ["exp", "sub"]},
+    )
+    user = _user_from_claims(claims)
+    _cache_put(hashlib.sha256(token.encode()).hexdigest(), user, claims.get("exp"))
+    return user
+
+
+def _bearer_token(authorization: str) -> str:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid token format")
-    
-    token = authorization.split(" ")[1]
-    
+    return authorization.split(" ")[1]
+
+
+async def _get_remote_user(token: str):
     try:
         # Verify token with Supabase
-        user_response = admin_supabase.auth.get_user(token)
+        user_response = await run_db(admin_supabase.auth.get_user, token)
         if not user_response.user:
             raise HTTPException(status_code=401, detail="Invalid token")
-            
         return user_response.user
-        
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
+
+async def get_current_user(authorization: str = Header(...)):
+    """
+    Dependency to verify the Bearer token and return the user.
+    Tokens are checked locally (cached per token for AUTH_USER_CACHE_TTL); the auth server
+    is only asked when no signing key is configured.
+    """
+    token = _bearer_token(authorization)
+
+    cached = _cache_get(hashlib.sha256(token.encode()).hexdigest())
+    if cached is not None:
+        return cached
+
+    try:
+        user = await verify_access_token(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.InvalidTokenError as e:
+        raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+    if user is not None:
+        return user
+
+    return await _get_remote_user(token)
+
+
+async def get_current_user_full(authorization: str = Header(...)):
+    """
+    Full user record from the auth server, including linked identities. Only for
+    endpoints that need more than the token claims (e.g. /auth/sync).
+    """
+    return await _get_remote_user(_bearer_token(authorization))
+
+async def get_current_user_sse(authorization: Optional[str] = Header(None), access_token: Optional[str] = Query(None)):
+    """
+    Same as get_current_user, but also accepts `?access_token=` — the browser EventSource
+    API cannot set an Authorization header on Server-Sent Events requests.
+    """
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing credentials")
+    return await get_current_user(authorization)
+
 def sync_user_to_db(user):
     """
     Syncs the authenticated Supabase user to our public.users table.
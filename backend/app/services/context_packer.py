@@ -0,0 +1,176 @@
+"""
+context_packer.py — Builds the slide context that goes into a grading prompt
+
+Replaces the old character cut (`response_text[:20000]`), which could land mid-slide,
+spend tokens on repeated footers and drop the conclusion slides entirely.
+
+  1. CLEAN    : drop page-number markers and lines repeated across most slides of the deck
+                (footers, team name banners, confidentiality notices)
+  2. DEDUPE   : drop OCR lines that only repeat the slide's native text
+  3. PACK     : count tokens with the judge's own tokenizer and fill EVAL_CONTEXT_TOKENS
+                by slide priority (title slide, closing slides, then the densest slides),
+                emitting the chosen slides in their original order
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+EVAL_TOKENIZER = os.getenv("EVAL_TOKENIZER", os.getenv("VLLM_MODEL", "prometheus-eval/prometheus-7b-v2.0"))
+EVAL_CONTEXT_TOKENS = int(os.getenv("EVAL_CONTEXT_TOKENS", "5000"))
+BOILERPLATE_RATIO = 0.6     # a line on >= 60% of slides is deck boilerplate
+BOILERPLATE_MIN_SLIDES = 3  # ...but only decide that on decks with a few slides
+CLOSING_SLIDES = 2          # conclusion / future scope usually lives here
+
+EMPTY_DECK_TEXT = "No content could be extracted from this submission."
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_tokenizer_failed = False
+
+# "Slide 3", "Page 3 of 12", "3 / 12" — unambiguous page markers wherever they appear
+_PAGE_MARKER_RE = re.compile(r"^((slide|page)\s*\d+(\s*(/|of)\s*\d+)?|\d+\s*(/|of)\s*\d+)$", re.IGNORECASE)
+_BARE_NUMBER_RE = re.compile(r"^\d+$")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _get_tokenizer():
+    """Lazy-load the judge's tokenizer (cached globally, thread-safe)."""
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is not None or _tokenizer_failed:
+        return _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_failed:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(EVAL_TOKENIZER)
+                logger.info(f"[ContextPacker] Loaded tokenizer for {EVAL_TOKENIZER}")
+            except Exception as e:
+                _tokenizer_failed = True
+                logger.warning(f"[ContextPacker] Tokenizer unavailable ({e}); falling back to ~4 chars/token estimate.")
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _line_key(line: str) -> str:
+    """Normalization used to spot repeats — 'Page 3 | Team X' and 'Page 4 | Team X' match."""
+    return _DIGITS_RE.sub("#", line.strip().lower())
+
+
+def _split_lines(text: str) -> List[str]:
+    return [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+
+
+def _boilerplate_keys(slides: List[Dict[str, Any]]) -> set:
+    if len(slides) < BOILERPLATE_MIN_SLIDES:
+        return set()
+    seen = Counter()
+    for slide in slides:
+        lines = _split_lines(slide.get("text_content")) + _split_lines(slide.get("images_ocr_text"))
+        # Bare numbers all normalize to "#"; page numbers among them are handled by _is_page_marker
+        seen.update({_line_key(ln) for ln in lines if not _BARE_NUMBER_RE.match(ln)})
+    threshold = BOILERPLATE_RATIO * len(slides)
+    return {key for key, n in seen.items() if n >= threshold}
+
+
+def _is_page_marker(lines: List[str], i: int, slide_number) -> bool:
+    """
+    A bare number only counts as a page number in header/footer position (first or last line)
+    and when it is (about) the slide's own number — "2024" or "98%" content lines stay.
+    """
+    line = lines[i]
+    if _PAGE_MARKER_RE.match(line):
+        return True
+    if not _BARE_NUMBER_RE.match(line) or i not in (0, len(lines) - 1) or slide_number is None:
+        return False
+    return abs(int(line) - int(slide_number)) <= 1  # decks often leave the title page unnumbered
+
+
+def _clean_slide(slide: Dict[str, Any], boilerplate: set) -> str:
+    number = slide.get("slide_number")
+    native_lines = _split_lines(slide.get("text_content"))
+    native = [
+        ln for i, ln in enumerate(native_lines)
+        if not _is_page_marker(native_lines, i, number) and _line_key(ln) not in boilerplate
+    ]
+    native_keys = {_line_key(ln) for ln in native}
+    ocr_lines = _split_lines(slide.get("images_ocr_text"))
+    ocr = [
+        ln for i, ln in enumerate(ocr_lines)
+        if not _is_page_marker(ocr_lines, i, number)
+        and _line_key(ln) not in boilerplate
+        and _line_key(ln) not in native_keys
+    ]
+    return "\n".join(native + ocr)
+
+
+def _priority(index: int, total: int, slide: Dict[str, Any]) -> tuple:
+    """Lower sorts first: title slide, closing slides, then by complexity score."""
+    if index == 0:
+        rank = 0
+    elif index >= total - CLOSING_SLIDES:
+        rank = 1
+    else:
+        rank = 2
+    return (rank, -(slide.get("complexity_score") or 0.0), index)
+
+
+def pack_slides(slides: List[Dict[str, Any]], token_budget: int = None) -> str:
+    """
+    Returns the packed deck text for `slides` (ordered by slide_number), never exceeding
+    `token_budget` tokens of the judge tokenizer.
+    """
+    budget = token_budget or EVAL_CONTEXT_TOKENS
+    boilerplate = _boilerplate_keys(slides)
+
+    blocks = []
+    for idx, slide in enumerate(slides):
+        body = _clean_slide(slide, boilerplate)
+        if not body:
+            continue
+        text = f"Slide {slide.get('slide_number')}:\n{body}\n"
+        blocks.append({"idx": idx, "text": text, "tokens": count_tokens(text), "slide": slide})
+
+    if not blocks:
+        return EMPTY_DECK_TEXT
+
+    chosen, used = [], 0
+    for block in sorted(blocks, key=lambda b: _priority(b["idx"], len(slides), b["slide"])):
+        if used + block["tokens"] <= budget:
+            chosen.append(block)
+            used += block["tokens"]
+
+    if not chosen:
+        # Even the top slide alone is over budget — keep its head, cut on a token boundary
+        top = min(blocks, key=lambda b: _priority(b["idx"], len(slides), b["slide"]))
+        tokenizer = _get_tokenizer()
+        if tokenizer is None:
+            return top["text"][:budget * 4]
+        ids = tokenizer.encode(top["text"], add_special_tokens=False)[:budget]
+        return tokenizer.decode(ids)
+
+    chosen.sort(key=lambda b: b["idx"])
+    packed = "\n".join(b["text"] for b in chosen)
+
+    # Per-block counts can differ slightly from the joined text at block boundaries —
+    # drop the lowest-priority slides until the exact count fits
+    while len(chosen) > 1 and count_tokens(packed) > budget:
+        worst = max(chosen, key=lambda b: _priority(b["idx"], len(slides), b["slide"]))
+        chosen.remove(worst)
+        packed = "\n".join(b["text"] for b in chosen)
+
+    dropped = len(blocks) - len(chosen)
+    if dropped:
+        logger.info(f"[ContextPacker] Packed {len(chosen)}/{len(blocks)} slides into {budget} tokens ({dropped} dropped).")
+    return packed
@@ -5,7 +5,13 @@ from typing import List, Dict, Any
 from datetime import datetime, timezone
 from app.database import admin_supabase
 from app.celery_app import celery_app
-from app.services.qdrant_service import qdrant_client, COLLECTION_NAME
+from app.services.qdrant_service import qdrant_client, COLLECTION_NAME, VECTOR_SIZE
+from app.services.redis_service import settle_submission
+from app.services.plagiarism_service import queue_plagiarism_detection
+from app.services.progress_service import record_stage
+from app.services.lease_service import leased
+from app.services.search_service import index_slide_keywords
+from app.services.evaluation_service import EVAL_BATCH_MODE
 from qdrant_client.http.models import PointStruct
 
 logger = logging.getLogger(__name__)
@@ -105,6 +111,7 @@ def embed_problem_statements(project_id: str, statements: List[Dict[str, Any]]):
 # ---------------------------------------------------------------------------
 
 @celery_app.task(bind=True, max_retries=3, queue="embedding")
+@leased("submission_id")
 def embed_submission_slides_task(self, submission_id: str):
     """
     Triggered via Celery task chain after PDF extraction finishes.
@@ -140,7 +147,8 @@ def embed_submission_slides_task(self, submission_id: str):
     if not slides:
         logger.info(f"[WorkflowB] No unindexed slides found for {submission_id}.")
         _update_job_status(submission_id, "embedding", "completed")  # ✅ valid job_type
-        _check_all_indexed_and_trigger_categorize(project_id)
+        record_stage(project_id, "embedded", [submission_id])
+        _settle_and_maybe_categorize(project_id, submission_id)
         return
         
     # 3. Batch Prepare Texts
@@ -187,7 +195,14 @@ def embed_submission_slides_task(self, submission_id: str):
             points=points
         )
         
-        # 7. Update Supabase
+        # 7. Fold the new slides into the submission-level centroid point. Must succeed before the
+        #    slides are marked indexed — a failure raises into the retry below, since once marked
+        #    they would never be folded in again. A retry may already have folded them (the
+        #    centroid upsert went through, step 8 did not), so retries rebuild it from scratch.
+        _upsert_submission_centroid(project_id, submission_id, team_name, embeddings, slide_ids,
+                                    rebuild=self.request.retries > 0)
+
+        # 8. Update Supabase
         for slide_id in slide_ids:
             admin_supabase.table("submission_slides").update({
                 "qdrant_point_id": slide_id,
@@ -196,16 +211,114 @@ def embed_submission_slides_task(self, submission_id: str):
                 "embedding_model": "all-MiniLM-L6-v2",
                 "embedding_version": 1
             }).eq("slide_id", slide_id).execute()
-        
+
+        # Keyword vectors for hybrid search
+        try:
+            index_slide_keywords(project_id, submission_id, slides)
+        except Exception as kw_e:
+            # Non-fatal — search falls back to dense results for these slides
+            logger.warning(f"[WorkflowB] Could not index slide keywords for {submission_id}: {kw_e}")
+
         _update_job_status(submission_id, "embedding", "completed")  # ✅ valid job_type
-        _check_all_indexed_and_trigger_categorize(project_id)
+        record_stage(project_id, "embedded", [submission_id])
+        _settle_and_maybe_categorize(project_id, submission_id)
 
     except Exception as e:
         logger.error(f"[WorkflowB] Failed embedding task for {submission_id}: {e}")
         _update_job_status(submission_id, "embedding", "failed", str(e))  # ✅ valid job_type
+        if self.request.retries >= self.max_retries:
+            # Out of retries — don't hold the rest of the project back
+            record_stage(project_id, "failed", [submission_id])
+            _settle_and_maybe_categorize(project_id, submission_id)
         raise self.retry(exc=e, countdown=15)
 
 
+CENTROID_RETRIEVE_BATCH = 256
+
+
+def _slide_point_vectors(slide_ids: List[str]):
+    """Stored (unit-length) vectors of the given slide points; ids missing from Qdrant are skipped."""
+    import numpy as np
+    vectors = []
+    for start in range(0, len(slide_ids), CENTROID_RETRIEVE_BATCH):
+        points = qdrant_client.retrieve(
+            collection_name=COLLECTION_NAME,
+            ids=[str(i) for i in slide_ids[start:start + CENTROID_RETRIEVE_BATCH]],
+            with_payload=False,
+            with_vectors=["text"],
+        )
+        vectors.extend(np.asarray(pt.vector["text"], dtype=np.float32) for pt in points)
+    return vectors
+
+
+def _upsert_submission_centroid(project_id: str, submission_id: str, team_name: str, new_vectors, new_slide_ids: List[str], rebuild: bool = False):
+    """
+    Maintains one `granularity: submission` point per submission holding the mean of its slide vectors.
+    Qdrant normalizes cosine vectors on upload, so the norm of the mean is kept in the payload
+    (`centroid_norm`) to rebuild the running sum when the next batch of slides arrives.
+    The point id is the submission_id itself.
+
+    With `rebuild` the stored centroid is ignored and the mean is recomputed from the slide points
+    of every indexed slide plus the new ones, so folding the same slides twice is harmless.
+    """
+    import numpy as np
+
+    # The new slides are not marked indexed yet, so this is every slide folded in earlier runs
+    indexed_res = admin_supabase.table("submission_slides") \
+        .select("slide_id", count="exact") \
+        .eq("submission_id", submission_id) \
+        .eq("qdrant_indexed", True) \
+        .execute()
+
+    if rebuild:
+        slide_ids = list(dict.fromkeys([row["slide_id"] for row in (indexed_res.data or [])] + list(new_slide_ids)))
+        vectors = _slide_point_vectors(slide_ids)
+        if not vectors:
+            return
+        total = np.sum(vectors, axis=0)
+        count = len(vectors)
+    else:
+        vectors = np.asarray(new_vectors, dtype=np.float32)
+        total = vectors.sum(axis=0)
+        count = len(new_slide_ids)
+
+        # No slide indexed before this run: start from scratch (a reset-submissions
+        # re-extraction leaves a stale centroid behind otherwise)
+        if indexed_res.count:
+            existing = qdrant_client.retrieve(
+                collection_name=COLLECTION_NAME,
+                ids=[submission_id],
+                with_payload=["slide_count", "centroid_norm"],
+                with_vectors=["text"],
+            )
+            if existing and existing[0].payload.get("slide_count"):
+                prev = existing[0]
+                prev_count = int(prev.payload["slide_count"])
+                prev_mean = np.asarray(prev.vector["text"], dtype=np.float32) * float(prev.payload.get("centroid_norm", 1.0))
+                total += prev_mean * prev_count
+                count += prev_count
+
+    centroid = total / count
+    qdrant_client.upsert(
+        collection_name=COLLECTION_NAME,
+        points=[
+            PointStruct(
+                id=str(submission_id),
+                vector={"text": centroid.tolist()},
+                payload={
+                    "granularity": "submission",
+                    "project_id": project_id,
+                    "submission_id": submission_id,
+                    "team_name": team_name,
+                    "slide_count": count,
+                    "centroid_norm": float(np.linalg.norm(centroid)),
+                    "indexed_at": _now_iso()
+                }
+            )
+        ]
+    )
+
+
 def _update_job_status(submission_id: str, job_type: str, status: str, error: str = None):
     """Updates the async processing_jobs state."""
     payload = {"status": status}
@@ -223,47 +336,140 @@ def _update_job_status(submission_id: str, job_type: str, status: str, error: st
 # Auto-Categorization (Option A)
 # ---------------------------------------------------------------------------
 
-def _check_all_indexed_and_trigger_categorize(project_id: str):
-    subs = admin_supabase.table("submissions") \
-        .select("submission_id, processing_status") \
-        .eq("project_id", project_id) \
-        .execute()
-    submissions = subs.data or []
+def _settle_and_maybe_categorize(project_id: str, submission_id: str):
+    """
+    Removes the submission from the project's remaining-work set.
+    The call that empties the set triggers auto-categorization — exactly once per run.
+    """
+    try:
+        if settle_submission(project_id, submission_id):
+            logger.info(f"[AutoCat] All submissions indexed for project {project_id}. Triggering Auto-Categorization.")
+            auto_categorize_project_task.delay(project_id)
+            queue_plagiarism_detection(project_id)
+    except Exception as e:
+        logger.error(f"[AutoCat] Could not update categorization barrier for {submission_id}: {e}")
 
-    if not submissions:
-        return  # nothing to do
 
-    all_indexed = True
+SIMILARITY_THRESHOLD = 0.35  # Adjust as needed based on empirical data
+SCROLL_PAGE_SIZE = 1000
+SUBMISSION_WRITE_CHUNK = 500
+SUBMISSION_PAGE_SIZE = 1000
 
-    for s in submissions:
-        sub_id = s["submission_id"]
 
-        # ── Gate 1: skip submissions that failed — they will never have slides ──
-        if s.get("processing_status") == "failed":
-            continue
+def _scroll_all(scroll_filter: dict, with_payload, with_vectors):
+    """Yields pages of points matching the filter, following Qdrant's scroll offsets."""
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            scroll_filter=scroll_filter,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+        )
+        if points:
+            yield points
+        if offset is None:
+            break
+
 
-        # ── Gate 2: the submission must have AT LEAST one slide ──
-        total_slides = admin_supabase.table("submission_slides") \
-            .select("slide_id", count="exact") \
-            .eq("submission_id", sub_id) \
+def _compute_submission_centroids(project_id: str, submission_ids: List[str]):
+    """
+    Returns (centroids, counts) — row i belongs to submission_ids[i]; a count of 0 means no slides.
+    Centroids come from the persisted `granularity: submission` points. Submissions indexed
+    before those points existed fall back to streaming their slide vectors and reducing them
+    here. Rows are not normalized; that is enough for cosine similarity since direction is
+    all that matters.
+    """
+    import numpy as np
+
+    row_of = {sub_id: i for i, sub_id in enumerate(submission_ids)}
+    sums = np.zeros((len(submission_ids), VECTOR_SIZE), dtype=np.float32)
+    counts = np.zeros(len(submission_ids), dtype=np.int64)
+
+    # 1. One vector per submission
+    centroid_filter = {
+        "must": [
+            {"key": "granularity", "match": {"value": "submission"}},
+            {"key": "project_id", "match": {"value": project_id}}
+        ]
+    }
+    for page in _scroll_all(centroid_filter, with_payload=["submission_id", "slide_count"], with_vectors=["text"]):
+        for pt in page:
+            row = row_of.get(pt.payload.get("submission_id"))
+            if row is None:
+                continue
+            sums[row] = pt.vector["text"]
+            counts[row] = pt.payload.get("slide_count") or 0
+
+    # 2. Fallback for submissions without a centroid point
+    missing = [sub_id for sub_id in submission_ids if counts[row_of[sub_id]] == 0]
+    if not missing:
+        return sums, counts
+
+    logger.info(f"[AutoCat] {len(missing)} submission(s) have no centroid point — reducing slide vectors.")
+    slide_filter = {
+        "must": [
+            {"key": "granularity", "match": {"value": "slide"}},
+            {"key": "project_id", "match": {"value": project_id}},
+            {"key": "submission_id", "match": {"any": missing}}
+        ]
+    }
+    for page in _scroll_all(slide_filter, with_payload=["submission_id"], with_vectors=["text"]):
+        rows, vecs = [], []
+        for pt in page:
+            row = row_of.get(pt.payload.get("submission_id"))
+            if row is None:
+                continue
+            rows.append(row)
+            vecs.append(pt.vector["text"])
+        if not rows:
+            continue
+        rows = np.asarray(rows)
+        np.add.at(sums, rows, np.asarray(vecs, dtype=np.float32))
+        counts += np.bincount(rows, minlength=len(submission_ids))
+
+    return sums, counts
+
+
+def _fetch_project_submission_ids(project_id: str) -> List[str]:
+    """Range-paginates over the project's submission ids (PostgREST caps each response)."""
+    ids = []
+    offset = 0
+    while True:
+        res = admin_supabase.table("submissions") \
+            .select("submission_id") \
+            .eq("project_id", project_id) \
+            .order("submission_id") \
+            .range(offset, offset + SUBMISSION_PAGE_SIZE - 1) \
             .execute()
+        page = res.data or []
+        ids.extend(row["submission_id"] for row in page)
+        if len(page) < SUBMISSION_PAGE_SIZE:
+            return ids
+        offset += SUBMISSION_PAGE_SIZE
 
-        if not total_slides.count or total_slides.count == 0:
-            # Extraction hasn't produced any slides yet — not ready
-            all_indexed = False # <--- ADDED THIS
-            break               # <--- ADDED THIS to stop the loop early
-            
-    if all_indexed and len(submissions) > 0:
-        logger.info(f"[AutoCat] All submissions indexed for project {project_id}. Triggering Auto-Categorization.")
-        auto_categorize_project_task.delay(project_id)
+
+def _bulk_update_submissions(rows: List[Dict[str, Any]]):
+    """
+    Writes {submission_id, detected_problem_statement_id, detection_confidence} rows in a few
+    round-trips. Only the category columns are updated (migrations/006_submission_categories.sql),
+    so status changes made meanwhile by other workers are never overwritten.
+    """
+    for start in range(0, len(rows), SUBMISSION_WRITE_CHUNK):
+        admin_supabase.rpc("set_submission_categories", {
+            "p_rows": rows[start:start + SUBMISSION_WRITE_CHUNK]
+        }).execute()
 
 
 @celery_app.task(bind=True, queue="embedding")
+@leased("project_id")
 def auto_categorize_project_task(self, project_id: str):
     """
     Once all submissions are indexed, this runs to auto-categorize.
-    It averages the slide vectors for each submission, compares it with PS vectors, 
-    and updates `detected_problem_statement_id` in Supabase.
+    It averages the slide vectors for each submission, compares the centroids with all PS
+    vectors in one matrix multiply, and bulk-updates `detected_problem_statement_id` in Supabase.
     """
     if not qdrant_client:
         raise self.retry(countdown=5)
@@ -272,110 +478,101 @@ def auto_categorize_project_task(self, project_id: str):
         import numpy as np
         
         # 1. Fetch PS Embeddings
-        ps_results = qdrant_client.scroll(
-            collection_name=COLLECTION_NAME,
-            scroll_filter={
-                "must": [
-                    {"key": "granularity", "match": {"value": "problem_statement"}},
-                    {"key": "project_id", "match": {"value": project_id}}
-                ]
-            },
-            with_vectors=True,
-            limit=100
-        )[0]
+        ps_results = [
+            pt for page in _scroll_all(
+                {
+                    "must": [
+                        {"key": "granularity", "match": {"value": "problem_statement"}},
+                        {"key": "project_id", "match": {"value": project_id}}
+                    ]
+                },
+                with_payload=["statement_id"],
+                with_vectors=["text"],
+            )
+            for pt in page
+        ]
         
         # 2. Match each submission
-        subs_res = admin_supabase.table("submissions").select("submission_id").eq("project_id", project_id).execute()
-        submissions = subs_res.data or []
+        sub_ids = _fetch_project_submission_ids(project_id)
+
+        if not sub_ids:
+            return
 
         if not ps_results:
             logger.warning(f"[AutoCat] No problem statement embeddings found for project {project_id}. "
-                         f"Marking {len(submissions)} submissions as completed without categorization.")
-            for sub in submissions:
-                admin_supabase.table("submissions").update({
-                    "detected_problem_statement_id": None,
-                    "detection_confidence": None,
-                    "processing_status": "processing" # Changed from completed to processing to continue to evaluation
-                }).eq("submission_id", sub["submission_id"]).execute()
-                
-                # Trigger evaluation
-                _trigger_evaluation_task(sub["submission_id"], project_id)
+                         f"Evaluating {len(sub_ids)} submissions without categorization.")
+            _bulk_update_submissions([
+                {"submission_id": sub_id, "detected_problem_statement_id": None, "detection_confidence": None}
+                for sub_id in sub_ids
+            ])
+
+            # Trigger evaluation
+            _trigger_project_evaluation(project_id, sub_ids)
             return
             
-        logger.info(f"[AutoCat] Found {len(ps_results)} problem statements. Categorizing {len(submissions)} submissions.")
-        
-        for sub in submissions:
-            sub_id = sub["submission_id"]
-            
-            # Fetch Slide embeddings
-            slide_results = qdrant_client.scroll(
-                collection_name=COLLECTION_NAME,
-                scroll_filter={
-                    "must": [
-                        {"key": "granularity", "match": {"value": "slide"}},
-                        {"key": "submission_id", "match": {"value": sub_id}}
-                    ]
-                },
-                with_vectors=True,
-                limit=100
-            )[0]
-            
-            if not slide_results:
+        logger.info(f"[AutoCat] Found {len(ps_results)} problem statements. Categorizing {len(sub_ids)} submissions.")
+
+        # 3. Centroids for every submission from one streamed pass over the project's slides
+        sums, counts = _compute_submission_centroids(project_id, sub_ids)
+
+        # 4. Cosine similarity against all statements: normalized (subs x 384) @ (384 x ps)
+        ps_matrix = np.asarray([pt.vector["text"] for pt in ps_results], dtype=np.float32)
+        ps_matrix /= np.maximum(np.linalg.norm(ps_matrix, axis=1, keepdims=True), 1e-12)
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        sims = centroids @ ps_matrix.T
+        best_idx = sims.argmax(axis=1)
+        best_scores = sims[np.arange(len(sub_ids)), best_idx]
+        ps_ids = [pt.payload.get("statement_id") for pt in ps_results]
+
+        updates = []
+        for i, sub_id in enumerate(sub_ids):
+            if counts[i] == 0:
                 logger.warning(f"[AutoCat] No slides found for submission {sub_id}. Skipping categorization.")
-                # We still trigger evaluation even if categorization fails
-                _trigger_evaluation_task(sub_id, project_id)
                 continue
+
+            best_score = float(best_scores[i])
+            best_ps_id = ps_ids[best_idx[i]]
+            updates.append({
+                "submission_id": sub_id,
+                # Below the threshold: open innovation / theme-based (no strong match)
+                "detected_problem_statement_id": best_ps_id if best_ps_id and best_score >= SIMILARITY_THRESHOLD else None,
+                "detection_confidence": round(best_score, 4),
+            })
+
+        # 5. Bulk write, then trigger evaluation (we still evaluate submissions that had no slides)
+        _bulk_update_submissions(updates)
+        _trigger_project_evaluation(project_id, sub_ids)
                 
-            # Average vectors
-            vectors = [pt.vector["text"] for pt in slide_results]
-            sub_vector = np.mean(vectors, axis=0)
-            
-            # Cosine Sim
-            best_ps_id = None
-            best_score = -1.0
-            
-            for ps_pt in ps_results:
-                ps_vec = np.array(ps_pt.vector["text"])
-                # cos_sim = dot(u,v) / (norm(u)*norm(v))
-                cos_sim = np.dot(sub_vector, ps_vec) / (np.linalg.norm(sub_vector) * np.linalg.norm(ps_vec))
-                if cos_sim > best_score:
-                    best_score = cos_sim
-                    best_ps_id = ps_pt.payload.get("statement_id")
-            
-            # Apply threshold for Open Innovation vs Specific Problem Statement
-            SIMILARITY_THRESHOLD = 0.35  # Adjust as needed based on empirical data
-            
-            # Keep processing_status = processing
-            payload = {"processing_status": "processing"}
-            if best_ps_id and best_score >= SIMILARITY_THRESHOLD:
-                payload["detected_problem_statement_id"] = best_ps_id
-                payload["detection_confidence"] = round(float(best_score), 4)
-            else:
-                # Treat as open innovation / theme-based (no strong match)
-                payload["detected_problem_statement_id"] = None
-                if best_score > -1.0:
-                    payload["detection_confidence"] = round(float(best_score), 4)
-
-            admin_supabase.table("submissions").update(payload).eq("submission_id", sub_id).execute()
-            
-            # Trigger Evaluation
-            _trigger_evaluation_task(sub_id, project_id)
-                
-        logger.info(f"[AutoCat] Successfully categorized {len(submissions)} submissions for project {project_id}.")
+        logger.info(f"[AutoCat] Successfully categorized {len(updates)} of {len(sub_ids)} submissions for project {project_id}.")
         
     except Exception as e:
         logger.error(f"[AutoCat] Error categorizing project {project_id}: {e}")
         # FALLBACK: Enqueue evaluations anyway
         try:
-            subs_fallback = admin_supabase.table("submissions").select("submission_id").eq("project_id", project_id).execute()
-            for sub in (subs_fallback.data or []):
-                _trigger_evaluation_task(sub["submission_id"], project_id)
+            _trigger_project_evaluation(project_id, _fetch_project_submission_ids(project_id))
             logger.info(f"[AutoCat] Fallback: Triggered evaluations despite categorization error.")
         except Exception as fallback_error:
             logger.error(f"[AutoCat] Fallback also failed: {fallback_error}")
             
         raise self.retry(exc=e, countdown=15)
 
+def _trigger_project_evaluation(project_id: str, submission_ids: List[str]):
+    """Queues evaluation for the categorized submissions — one batch task in batch mode, else one task each."""
+    record_stage(project_id, "categorized", submission_ids)
+    if EVAL_BATCH_MODE:
+        try:
+            celery_app.send_task(
+                "app.services.evaluation_service.evaluate_project_batch_task",
+                args=[project_id],
+                queue="evaluation"
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue batch evaluation for project {project_id}: {e}")
+        return
+
+    for submission_id in submission_ids:
+        _trigger_evaluation_task(submission_id, project_id)
+
 def _trigger_evaluation_task(submission_id: str, project_id: str):
     """Inserts a processing job for evaluation and sends task."""
     try:
@@ -1,12 +1,19 @@
 import os
 import logging
-import httpx
+import asyncio
 from datetime import datetime, timezone
 import re
+import json
+import hashlib
 from typing import Dict, Any, List
 
 from app.database import admin_supabase
 from app.celery_app import celery_app
+from app.services.llm_cache import get_cached_judgement, store_judgement
+from app.services.context_packer import pack_slides
+from app.services.progress_service import record_stage
+from app.services.lease_service import leased
+from app.services.vllm_client import chat_completion, run_async, circuit_retry_after, VLLMError, VLLMUnavailableError
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +23,27 @@ load_dotenv()
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL", "http://3.110.43.22:8000/v1")
 VLLM_API_URL = f"{PROMETHEUS_URL}/chat/completions"
 VLLM_MODEL = os.getenv("VLLM_MODEL", "prometheus-eval/prometheus-7b-v2.0")
+# Max criterion prompts of one submission in flight against vLLM at once
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "5"))
+# Send one criterion first so the shared prompt prefix is cached before the rest fan out
+EVAL_PREFIX_WARMUP = os.getenv("EVAL_PREFIX_WARMUP", "true").lower() == "true"
+# Project-wide batch mode: one task streams every criterion prompt of the project
+EVAL_BATCH_MODE = os.getenv("EVAL_BATCH_MODE", "false").lower() == "true"
+EVAL_BATCH_WINDOW = int(os.getenv("EVAL_BATCH_WINDOW", "64"))       # max requests in flight
+EVAL_BATCH_FLUSH_SIZE = int(os.getenv("EVAL_BATCH_FLUSH_SIZE", "50"))  # scores per bulk insert
+EVAL_BATCH_CHUNK = 50  # submissions per slide fetch
+DB_PAGE_SIZE = 1000    # PostgREST's max rows per response
+DB_IN_CHUNK = 200      # ids per `in_` filter, keeps request URLs short
+# 'full'     — every criterion sees the whole packed deck (one shared, prefix-cacheable context)
+# 'targeted' — each criterion only sees its top-k most relevant slides retrieved from Qdrant
+EVAL_CONTEXT_MODE = os.getenv("EVAL_CONTEXT_MODE", "full").lower()
+EVAL_TARGETED_TOP_K = int(os.getenv("EVAL_TARGETED_TOP_K", "5"))
+# Constrained grading: vLLM guided decoding forces "Feedback: ... [RESULT] <1-5>" and stops
+# right after the score. 'regex' (default), 'json' (guided_json object) or 'none' (stop strings only)
+EVAL_GUIDED_DECODING = os.getenv("EVAL_GUIDED_DECODING", "regex").lower()
+EVAL_FEEDBACK_TOKENS = int(os.getenv("EVAL_FEEDBACK_TOKENS", "256"))  # feedback budget per judgement
+_FEEDBACK_MAX_CHARS = EVAL_FEEDBACK_TOKENS * 3   # stays under the token budget for ordinary prose
+_FEEDBACK_MAX_WORDS = EVAL_FEEDBACK_TOKENS * 2 // 3
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -35,83 +63,373 @@ def _update_job_status(submission_id: str, job_type: str, status: str, error: st
         .eq("submission_id", submission_id) \
         .eq("job_type", job_type).execute()
 
-def build_prometheus_prompt(instruction: str, response: str, criterion_name: str) -> str:
-    """Builds the absolute grading prompt expected by Prometheus-Eval."""
-    
-    score_rubric = f"""[{criterion_name}]
-Score 1: Very poor {criterion_name}.
-Score 2: Below average {criterion_name}.
-Score 3: Average {criterion_name}.
-Score 4: Good {criterion_name}.
-Score 5: Excellent and outstanding {criterion_name}."""
-
-    prompt = f"""###Task Description:
+# The prompt is laid out as [shared prefix][criterion suffix]. Everything that is the same
+# for all criteria of a submission (task description, instruction, the long response) comes
+# first and is built ONCE per submission, so every criterion prompt starts with the exact same
+# bytes and vLLM's automatic prefix caching can reuse the KV cache of the whole deck.
+# Nothing criterion-specific may ever be added to the prefix.
+_PROMETHEUS_TASK_DESCRIPTION = """###Task Description:
 An instruction (might include an Input inside it), a response to evaluate, and a score rubric representing a evaluation criteria are given.
 1. Write a detailed feedback that assess the quality of the response strictly based on the given score rubric, not evaluating in general.
 2. After writing a feedback, write a score that is an integer between 1 and 5. You should refer to the score rubric.
+   Keep the feedback under {max_words} words.
 3. The output format should look as follows: "Feedback: (write a feedback for criteria) [RESULT] (an integer number between 1 and 5)"
-4. Please do not generate any other opening, closing, and explanations. Be sure to include [RESULT] in your output.
+4. Please do not generate any other opening, closing, and explanations. Be sure to include [RESULT] in your output.""".format(max_words=_FEEDBACK_MAX_WORDS)
+
+def _normalize_prompt_text(text: str) -> str:
+    """Canonical whitespace so logically identical inputs always produce identical bytes."""
+    lines = (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def build_prometheus_prefix(instruction: str, response: str) -> str:
+    """The criterion-independent head of every grading prompt for a submission."""
+    return f"""{_PROMETHEUS_TASK_DESCRIPTION}
 
 ###The instruction to evaluate:
-{instruction}
+{_normalize_prompt_text(instruction)}
 
 ###Response to evaluate:
-{response}
+{_normalize_prompt_text(response)}
 
 ###Score Rubrics:
-{score_rubric}
+"""
+
+def build_prometheus_suffix(criterion_name: str, criterion_description: str = None) -> str:
+    """The criterion-specific tail — the only part that differs between a submission's prompts."""
+    criterion_name = _normalize_prompt_text(criterion_name)
+    header = f"[{criterion_name}]"
+    if criterion_description:
+        header += f" {_normalize_prompt_text(criterion_description)}"
+
+    return f"""{header}
+Score 1: Very poor {criterion_name}.
+Score 2: Below average {criterion_name}.
+Score 3: Average {criterion_name}.
+Score 4: Good {criterion_name}.
+Score 5: Excellent and outstanding {criterion_name}.
 
 ###Feedback:"""
-    return prompt
 
-def evaluate_with_prometheus(prompt: str) -> Dict[str, Any]:
-    """Call the AWS vLLM instance."""
+def build_prometheus_prompt(instruction: str, response: str, criterion_name: str, criterion_description: str = None) -> str:
+    """Builds the absolute grading prompt expected by Prometheus-Eval."""
+    return build_prometheus_prefix(instruction, response) + build_prometheus_suffix(criterion_name, criterion_description)
+
+class JudgementParseError(VLLMError):
+    """The judge answered, but without a usable score. Retryable — never replaced by a default score."""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=True, retry_after=5)
+
+_GRADING_REGEX = rf"Feedback: [^\[\]]{{1,{_FEEDBACK_MAX_CHARS}}} \[RESULT\] [1-5]"
+_GRADING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "feedback": {"type": "string", "maxLength": _FEEDBACK_MAX_CHARS},
+        "score": {"type": "integer", "minimum": 1, "maximum": 5},
+    },
+    "required": ["feedback", "score"],
+}
+
+def _vllm_payload(prompt: str) -> Dict[str, Any]:
+    payload = {
+        "model": VLLM_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+        # Feedback budget + room for " [RESULT] N" / JSON framing
+        "max_tokens": EVAL_FEEDBACK_TOKENS + 32,
+        "temperature": 0.1
+    }
+    if EVAL_GUIDED_DECODING == "regex":
+        payload["guided_regex"] = _GRADING_REGEX
+    elif EVAL_GUIDED_DECODING == "json":
+        payload["guided_json"] = _GRADING_SCHEMA
+    else:
+        # No grammar: end generation on the score itself
+        payload["stop"] = [f"[RESULT] {n}" for n in range(1, 6)]
+        payload["include_stop_str_in_output"] = True
+    return payload
+
+_RESULT_RE = re.compile(r"\[RESULT\]\s*\(?([1-5])\b")
+
+def _parse_prometheus_output(content: str) -> Dict[str, Any]:
+    """
+    Parse output format: Feedback: ... [RESULT] X (or the guided_json object).
+    Raises JudgementParseError when there is no score between 1 and 5.
+    """
+    content = content or ""
+    if EVAL_GUIDED_DECODING == "json":
+        try:
+            data = json.loads(content)
+            score, feedback = int(data["score"]), str(data["feedback"]).strip()
+        except (ValueError, KeyError, TypeError) as e:
+            raise JudgementParseError(f"Unparseable JSON judgement: {e}")
+        if not 1 <= score <= 5:
+            raise JudgementParseError(f"Score out of range: {score}")
+        return {"score": score, "feedback": feedback, "raw": content}
+
+    score_match = _RESULT_RE.search(content)
+    if not score_match:
+        raise JudgementParseError(f"No [RESULT] score in judgement: {content[-200:]!r}")
+    feedback = content[:score_match.start()].replace("Feedback:", "", 1).strip()
+    return {"score": int(score_match.group(1)), "feedback": feedback, "raw": content}
+
+def evaluate_with_prometheus(prompt: str, force_refresh: bool = False) -> Dict[str, Any]:
+    """
+    Call the AWS vLLM instance.
+    Judgements are served from the LLM cache when the exact same request was made before;
+    `force_refresh` skips the lookup to force a fresh judgement (the result is still cached).
+    Raises VLLMError when no judgement could be obtained — there is no fallback score.
+    """
+    return run_async(evaluate_with_prometheus_async(prompt, force_refresh=force_refresh))
+
+async def evaluate_with_prometheus_async(prompt: str, force_refresh: bool = False) -> Dict[str, Any]:
+    """Async variant of evaluate_with_prometheus — lets vLLM batch several criteria of a submission."""
+    payload = _vllm_payload(prompt)
+    if not force_refresh:
+        cached = await asyncio.to_thread(get_cached_judgement, payload)
+        if cached:
+            return cached
+
+    data = await chat_completion(VLLM_API_URL, payload)
     try:
-        response = httpx.post(
-            VLLM_API_URL, 
-            json={
-                "model": VLLM_MODEL,
-                "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 1024,
-                "temperature": 0.1
-            },
-            timeout=120.0
-        )
-        response.raise_for_status()
-        data = response.json()
         content = data["choices"][0]["message"]["content"]
-        
-        # Parse output format: Feedback: ... [RESULT] X
-        # Some models might not include "Feedback:" string exactly or might vary.
-        # We look for [RESULT] \d
-        
-        score_match = re.search(r"\[RESULT\]\s*(\d+)", content)
-        if score_match:
-            score = int(score_match.group(1))
-            # Extract feedback before result
-            feedback = content.split("[RESULT]")[0].replace("Feedback:", "").strip()
-        else:
-            score = 3  # Fallback
-            feedback = content
-            
-        # Bound the score between 1 and 5
-        score = max(1, min(5, score))
-        return {"score": score, "feedback": feedback, "raw": content}
+    except (KeyError, IndexError, TypeError) as e:
+        raise VLLMError(f"Malformed vLLM response: {e}")
+    result = _parse_prometheus_output(content)
+    await asyncio.to_thread(store_judgement, payload, result)
+    return result
+
+# ---------------------------------------------------------------------------
+# Fingerprints: re-judge only what changed
+# ---------------------------------------------------------------------------
+
+# One row per (submission, criterion) — see migrations/002_evaluation_fingerprints.sql
+SCORE_CONFLICT_KEY = "submission_id,criterion_id"
+
+def evaluation_fingerprint(criterion: Dict[str, Any], instruction: str, response: str) -> str:
+    """
+    Identifies everything a judgement depends on: criterion text and weight, the problem
+    statement (via the instruction), the packed deck context, the judge model and the
+    output constraints. A stored score with the same fingerprint is still valid.
+    """
+    material = json.dumps({
+        "criterion": [criterion.get("criterion_name"), criterion.get("description"), criterion.get("weight")],
+        "instruction": _normalize_prompt_text(instruction),
+        "context": hashlib.sha256(_normalize_prompt_text(response).encode()).hexdigest(),
+        "model": VLLM_MODEL,
+        "grading": [EVAL_GUIDED_DECODING, EVAL_FEEDBACK_TOKENS],
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode()).hexdigest()
+
+def _select_all(build_query) -> List[Dict[str, Any]]:
+    """
+    Range-paginates a select — PostgREST silently caps each response at DB_PAGE_SIZE rows.
+    `build_query()` must return a fresh query with a total order.
+    """
+    rows, offset = [], 0
+    while True:
+        page = build_query().range(offset, offset + DB_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < DB_PAGE_SIZE:
+            return rows
+        offset += DB_PAGE_SIZE
+
+def _chunks(ids: List[str], size: int = DB_IN_CHUNK):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def _stored_fingerprints(submission_ids: List[str]) -> Dict[tuple, str]:
+    """(submission_id, criterion_id) → fingerprint of the stored score (None for pre-fingerprint rows)."""
+    stored = {}
+    for chunk in _chunks(submission_ids):
+        rows = _select_all(lambda chunk=chunk: admin_supabase.table("evaluation_scores")
+                           .select("submission_id, criterion_id, fingerprint")
+                           .in_("submission_id", chunk)
+                           .order("submission_id")
+                           .order("criterion_id"))
+        stored.update({(r["submission_id"], r["criterion_id"]): r.get("fingerprint") for r in rows})
+    return stored
+
+def _score_row(submission_id: str, criterion: Dict[str, Any], ai_result: Dict[str, Any], fingerprint: str) -> Dict[str, Any]:
+    return {
+        "submission_id": submission_id,
+        "criterion_id": criterion["criterion_id"],
+        "score": ai_result["score"],
+        "feedback": ai_result["feedback"],
+        "fingerprint": fingerprint,
+        "updated_at": _now_iso()
+    }
+
+def _save_criterion_result(submission_id: str, criterion: Dict[str, Any], ai_result: Dict[str, Any], fingerprint: str, progress: int):
+    # Upsert so a retried task or a re-evaluation replaces the score instead of duplicating it
+    admin_supabase.table("evaluation_scores") \
+        .upsert(_score_row(submission_id, criterion, ai_result, fingerprint), on_conflict=SCORE_CONFLICT_KEY) \
+        .execute()
+    _update_job_status(submission_id, "evaluation", "running", progress=progress)
+
+async def _evaluate_criteria_concurrently(
+    submission_id: str,
+    criteria: List[Dict[str, Any]],
+    instruction: str,
+    responses: Dict[str, str],
+    concurrency: int = None,
+    force_refresh: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Dispatches every criterion prompt of a submission at once (bounded by `concurrency`)
+    and saves each result + progress as soon as it comes back, in completion order.
+    `responses` maps criterion_id → the deck context that criterion is graded on.
+    Criteria whose stored score has the same fingerprint are skipped unless `force_refresh`.
+
+    With EVAL_PREFIX_WARMUP the first criterion is sent alone so its shared prefix is in
+    vLLM's prefix cache before the remaining criteria arrive; otherwise requests landing in
+    the same scheduler step would each prefill the whole deck. Only useful when all criteria
+    share one context.
+    """
+    fingerprints = {c["criterion_id"]: evaluation_fingerprint(c, instruction, responses[c["criterion_id"]]) for c in criteria}
+    if not force_refresh:
+        stored = await asyncio.to_thread(_stored_fingerprints, [submission_id])
+        unchanged = [c for c in criteria if stored.get((submission_id, c["criterion_id"])) == fingerprints[c["criterion_id"]]]
+        if unchanged:
+            logger.info(f"[EvaluationService] {len(unchanged)}/{len(criteria)} criteria unchanged for {submission_id}, skipping.")
+        criteria = [c for c in criteria if c not in unchanged]
+    if not criteria:
+        return []
+
+    semaphore = asyncio.Semaphore(concurrency or EVAL_CONCURRENCY)
+    total_criteria = len(criteria)
+    prefixes = {text: build_prometheus_prefix(instruction, text) for text in {responses[c["criterion_id"]] for c in criteria}}
+    results = []
+
+    async def _judge(criterion: Dict[str, Any]):
+        prefix = prefixes[responses[criterion["criterion_id"]]]
+        prompt = prefix + build_prometheus_suffix(criterion["criterion_name"], criterion.get("description"))
+        async with semaphore:
+            logger.info(f"Evaluating {criterion['criterion_name']} for {submission_id}...")
+            return criterion, await evaluate_with_prometheus_async(prompt, force_refresh=force_refresh)
+
+    async def _record(criterion: Dict[str, Any], ai_result: Dict[str, Any]):
+        # Save into DB + update progress without blocking the other in-flight calls
+        progress = 10 + int((len(results) + 1) / total_criteria * 80)
+        await asyncio.to_thread(_save_criterion_result, submission_id, criterion, ai_result, fingerprints[criterion["criterion_id"]], progress)
+        results.append({"criterion_id": criterion["criterion_id"], **ai_result})
+
+    # Keep every judgement that succeeded, then surface the first failure
+    errors = []
+    remaining = list(criteria)
+    if EVAL_PREFIX_WARMUP and len(prefixes) == 1 and len(remaining) > 1:
+        await _record(*await _judge(remaining.pop(0)))
+    for next_result in asyncio.as_completed([_judge(c) for c in remaining]):
+        try:
+            await _record(*await next_result)
+        except VLLMError as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+    return results
+
+def _build_response_text(slides: List[Dict[str, Any]]) -> str:
+    """
+    Packs a submission's slides (ordered by slide_number) into the response to grade —
+    boilerplate stripped and fitted to EVAL_CONTEXT_TOKENS with the judge's tokenizer.
+    """
+    return pack_slides(slides)
+
+_criterion_vectors: Dict[str, List[float]] = {}
+
+def _criterion_query_vectors(criteria: List[Dict[str, Any]]) -> List[List[float]]:
+    """Embeds 'name: description' per criterion (cached per worker — criteria rarely change)."""
+    texts = [f"{c['criterion_name']}: {c.get('description') or ''}".strip(": ") for c in criteria]
+    missing = [t for t in texts if t not in _criterion_vectors]
+    if missing:
+        # Lazy import: the embedding model is only needed in targeted mode
+        from app.services.embedding_service import get_model
+        for text, vec in zip(missing, get_model().encode(missing, show_progress_bar=False)):
+            _criterion_vectors[text] = vec.tolist()
+    return [_criterion_vectors[t] for t in texts]
 
+def _retrieve_criterion_slides(submission_id: str, criteria: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Top-k slide numbers of the submission per criterion — one batched Qdrant query."""
+    from app.services.qdrant_service import qdrant_client, COLLECTION_NAME, get_search_params
+    from qdrant_client.http.models import QueryRequest
+
+    if qdrant_client is None:
+        return {}
+    slide_filter = {
+        "must": [
+            {"key": "granularity", "match": {"value": "slide"}},
+            {"key": "submission_id", "match": {"value": submission_id}}
+        ]
+    }
+    responses = qdrant_client.query_batch_points(
+        collection_name=COLLECTION_NAME,
+        requests=[
+            QueryRequest(
+                query=vec,
+                using="text",
+                filter=slide_filter,
+                params=get_search_params(),
+                limit=EVAL_TARGETED_TOP_K,
+                with_payload=["slide_number"],
+            )
+            for vec in _criterion_query_vectors(criteria)
+        ],
+    )
+    return {
+        c["criterion_id"]: [pt.payload.get("slide_number") for pt in r.points]
+        for c, r in zip(criteria, responses)
+    }
+
+def _build_criterion_responses(submission_id: str, slides: List[Dict[str, Any]], criteria: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    criterion_id → packed deck context. In 'targeted' mode each criterion gets the title slide
+    plus its top-k retrieved slides; on any retrieval problem it falls back to the full deck.
+    """
+    full_text = _build_response_text(slides)
+    if EVAL_CONTEXT_MODE != "targeted" or not slides:
+        return {c["criterion_id"]: full_text for c in criteria}
+
+    try:
+        retrieved = _retrieve_criterion_slides(submission_id, criteria)
     except Exception as e:
-        logger.error(f"vLLM API Error: {e}")
-        # Default fallback
-        return {"score": 3, "feedback": f"Evaluation failed due to server error: {e}", "raw": ""}
+        logger.warning(f"[EvaluationService] Slide retrieval failed for {submission_id}, using full deck: {e}")
+        retrieved = {}
+
+    title_slide = slides[0].get("slide_number")
+    responses = {}
+    for criterion in criteria:
+        wanted = set(retrieved.get(criterion["criterion_id"]) or [])
+        if not wanted:
+            responses[criterion["criterion_id"]] = full_text
+            continue
+        wanted.add(title_slide)
+        responses[criterion["criterion_id"]] = _build_response_text([s for s in slides if s.get("slide_number") in wanted])
+    return responses
+
+def _build_instruction(problem_statement: Dict[str, Any] = None) -> str:
+    if problem_statement:
+        return f"Evaluate the following hackathon submission based on this Problem Statement:\nTitle: {problem_statement.get('title')}\nDescription: {problem_statement.get('description')}"
+    return "Evaluate the following hackathon submission."
 
 @celery_app.task(bind=True, max_retries=3, queue="evaluation")
-def evaluate_submission_task(self, submission_id: str):
+@leased("submission_id")
+def evaluate_submission_task(self, submission_id: str, force_refresh: bool = False):
     """
     Evaluates a submission against the project's scoring criteria using Prometheus-7B.
+    Criteria whose stored score fingerprint still matches are skipped, so retries and
+    re-evaluations only judge what changed. `force_refresh` re-judges every criterion and
+    bypasses the LLM response cache.
     """
     logger.info(f"[EvaluationService] Starting evaluation for {submission_id}")
+
+    # 0. vLLM is known to be down — wait for the circuit to close without doing any work
+    retry_after = circuit_retry_after()
+    if retry_after > 0:
+        logger.warning(f"[EvaluationService] vLLM circuit open; deferring {submission_id} by {retry_after:.0f}s")
+        raise self.retry(countdown=retry_after, max_retries=None)
     
     # 1. Update job to running
     _update_job_status(submission_id, "evaluation", "running", progress=10)
+    project_id = None
     
     try:
         # 2. Fetch Submission & Project Details
@@ -128,55 +446,23 @@ def evaluate_submission_task(self, submission_id: str):
             logger.warning(f"No scoring criteria for project {project_id}. Skipping evaluation.")
             _update_job_status(submission_id, "evaluation", "completed")
             admin_supabase.table("submissions").update({"processing_status": "completed"}).eq("submission_id", submission_id).execute()
+            record_stage(project_id, "evaluated", [submission_id])
             return
 
         # 4. Fetch Submission Slides to form the response
         slides_res = admin_supabase.table("submission_slides").select("*").eq("submission_id", submission_id).order("slide_number").execute()
-        slides = slides_res.data or []
-        response_text = ""
-        for slide in slides:
-            content = slide.get("text_content", "") or ""
-            ocr = slide.get("images_ocr_text", "") or ""
-            response_text += f"\nSlide {slide.get('slide_number')}:\n{content}\n{ocr}\n"
-        
-        if not response_text.strip():
-            response_text = "No content could be extracted from this submission."
-
-        # Limit response length to prevent hitting context limits (~6k words)
-        response_text = response_text[:20000] 
+        responses = _build_criterion_responses(submission_id, slides_res.data or [], criteria)
 
         # 5. Fetch Problem Statement Context (if detected)
-        instruction = "Evaluate the following hackathon submission."
+        problem_statement = None
         ps_id = submission.get("detected_problem_statement_id")
         if ps_id:
             ps_res = admin_supabase.table("problem_statements").select("*").eq("statement_id", ps_id).single().execute()
-            if ps_res.data:
-                instruction = f"Evaluate the following hackathon submission based on this Problem Statement:\nTitle: {ps_res.data.get('title')}\nDescription: {ps_res.data.get('description')}"
+            problem_statement = ps_res.data
+        instruction = _build_instruction(problem_statement)
 
-        # 6. Evaluate Each Criterion
-        total_criteria = len(criteria)
-        for idx, criterion in enumerate(criteria):
-            logger.info(f"Evaluating {criterion['criterion_name']} for {submission_id}...")
-            
-            prompt = build_prometheus_prompt(
-                instruction=instruction,
-                response=response_text,
-                criterion_name=criterion["criterion_name"]
-            )
-            
-            ai_result = evaluate_with_prometheus(prompt)
-            
-            # Save into DB
-            admin_supabase.table("evaluation_scores").insert({
-                "submission_id": submission_id,
-                "criterion_id": criterion["criterion_id"],
-                "score": ai_result["score"],
-                "feedback": ai_result["feedback"]
-            }).execute()
-            
-            # Update Progress
-            progress = 10 + int((idx + 1) / total_criteria * 80)
-            _update_job_status(submission_id, "evaluation", "running", progress=progress)
+        # 6. Evaluate changed criteria concurrently (upserted, so retries never duplicate)
+        run_async(_evaluate_criteria_concurrently(submission_id, criteria, instruction, responses, force_refresh=force_refresh))
 
         # 7. Mark as complete
         _update_job_status(submission_id, "evaluation", "completed")
@@ -184,9 +470,30 @@ def evaluate_submission_task(self, submission_id: str):
             "processing_status": "completed",
             "updated_at": _now_iso()
         }).eq("submission_id", submission_id).execute()
+        record_stage(project_id, "evaluated", [submission_id])
         
         logger.info(f"[EvaluationService] Finished evaluation for {submission_id} ✅")
 
+    except VLLMError as e:
+        if e.retryable and (isinstance(e, VLLMUnavailableError) or self.request.retries < self.max_retries):
+            # The judge is overloaded or down — this is not the submission's fault. Leave it
+            # queued and come back later; an open circuit pauses without using up retries.
+            logger.warning(f"[EvaluationService] vLLM unavailable for {submission_id}, retrying in {e.retry_after:.0f}s: {e}")
+            _update_job_status(submission_id, "evaluation", "queued", f"Retrying: {e}")
+            raise self.retry(
+                exc=e,
+                countdown=max(5, e.retry_after),
+                max_retries=None if isinstance(e, VLLMUnavailableError) else self.max_retries
+            )
+        logger.error(f"[EvaluationService] Evaluation failed for {submission_id}: {e}")
+        _update_job_status(submission_id, "evaluation", "failed", str(e))
+        admin_supabase.table("submissions").update({
+            "processing_status": "failed",
+            "updated_at": _now_iso()
+        }).eq("submission_id", submission_id).execute()
+        record_stage(project_id, "failed", [submission_id])
+        raise
+
     except Exception as e:
         logger.error(f"[EvaluationService] Evaluation failed for {submission_id}: {e}")
         _update_job_status(submission_id, "evaluation", "failed", str(e))
@@ -195,3 +502,195 @@ def evaluate_submission_task(self, submission_id: str):
             "updated_at": _now_iso()
         }).eq("submission_id", submission_id).execute()
         raise self.retry(exc=e, countdown=30)
+
+
+# ---------------------------------------------------------------------------
+# Batch Mode: whole project in one high-concurrency stream
+# ---------------------------------------------------------------------------
+
+def _ensure_evaluation_jobs(project_id: str, submission_ids: List[str]):
+    """Creates or marks running the evaluation job row of every submission — upserts on the
+    (submission_id, job_type) key, so no read of the existing rows is needed."""
+    for chunk in _chunks(submission_ids):
+        admin_supabase.table("processing_jobs").upsert([
+            {"job_type": "evaluation", "submission_id": sub_id, "project_id": project_id, "status": "running"}
+            for sub_id in chunk
+        ], on_conflict="submission_id,job_type").execute()
+
+def _fetch_slides_by_submission(submission_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """submission_id → its slides ordered by slide_number."""
+    slides = _select_all(lambda: admin_supabase.table("submission_slides")
+                         .select("submission_id, slide_number, text_content, images_ocr_text, complexity_score")
+                         .in_("submission_id", submission_ids)
+                         .order("submission_id")
+                         .order("slide_number"))
+    slides_by_sub: Dict[str, List[Dict[str, Any]]] = {}
+    for slide in slides:
+        slides_by_sub.setdefault(slide["submission_id"], []).append(slide)
+    return slides_by_sub
+
+def _iter_batch_prompts(submissions: List[Dict[str, Any]], criteria: List[Dict[str, Any]], stored: Dict[tuple, str], problem_statements: Dict[str, Any], force_refresh: bool = False):
+    """
+    Lazily yields (submission_id, [(criterion, prompt, fingerprint), ...]) per submission, with
+    only the criteria whose stored fingerprint differs (all of them with `force_refresh`).
+    Slides are fetched a chunk of submissions at a time so memory stays bounded on big projects,
+    and prompts of one submission are kept together so their shared prefix stays hot.
+    """
+    for start in range(0, len(submissions), EVAL_BATCH_CHUNK):
+        chunk = submissions[start:start + EVAL_BATCH_CHUNK]
+        slides_by_sub = _fetch_slides_by_submission([s["submission_id"] for s in chunk])
+
+        for sub in chunk:
+            sub_id = sub["submission_id"]
+            instruction = _build_instruction(problem_statements.get(sub.get("detected_problem_statement_id")))
+            responses = _build_criterion_responses(sub_id, slides_by_sub.get(sub_id, []), criteria)
+            todo = []
+            for criterion in criteria:
+                response = responses[criterion["criterion_id"]]
+                fingerprint = evaluation_fingerprint(criterion, instruction, response)
+                if force_refresh or stored.get((sub_id, criterion["criterion_id"])) != fingerprint:
+                    todo.append((criterion, response, fingerprint))
+            prefixes = {response: build_prometheus_prefix(instruction, response) for _, response, _ in todo}
+            yield sub_id, [
+                (criterion, prefixes[response] + build_prometheus_suffix(criterion["criterion_name"], criterion.get("description")), fingerprint)
+                for criterion, response, fingerprint in todo
+            ]
+
+def _write_score_rows(rows: List[Dict[str, Any]]):
+    admin_supabase.table("evaluation_scores").upsert(rows, on_conflict=SCORE_CONFLICT_KEY).execute()
+
+def _finish_batch_submissions(project_id: str, submission_ids: List[str]):
+    if not submission_ids:
+        return
+    for chunk in _chunks(submission_ids):
+        admin_supabase.table("processing_jobs").update({
+            "status": "completed", "completed_at": _now_iso(), "progress_percentage": 100
+        }).in_("submission_id", chunk).eq("job_type", "evaluation").execute()
+        admin_supabase.table("submissions").update({
+            "processing_status": "completed", "updated_at": _now_iso()
+        }).in_("submission_id", chunk).execute()
+    record_stage(project_id, "evaluated", submission_ids)
+
+async def _run_batch(project_id: str, submissions: List[Dict[str, Any]], criteria: List[Dict[str, Any]], stored: Dict[tuple, str], problem_statements: Dict[str, Any], force_refresh: bool = False) -> int:
+    """
+    Streams prompts with at most EVAL_BATCH_WINDOW requests in flight, buffering scores and
+    writing them with bulk upserts. A submission is marked completed as soon as its last
+    changed criterion lands. Returns the number of judgements made.
+    """
+    window = asyncio.Semaphore(EVAL_BATCH_WINDOW)
+    remaining: Dict[str, int] = {}
+    buffer: List[Dict[str, Any]] = []
+    finished: List[str] = []
+    judged = 0
+    flush_lock = asyncio.Lock()
+
+    async def _flush(force: bool = False):
+        nonlocal buffer, finished
+        async with flush_lock:
+            if not buffer and not finished:
+                return
+            if not force and len(buffer) < EVAL_BATCH_FLUSH_SIZE:
+                return
+            rows, buffer = buffer, []
+            subs_done, finished = finished, []
+            # Scores first — a crash between the two writes only re-marks, never loses a score
+            if rows:
+                await asyncio.to_thread(_write_score_rows, rows)
+            await asyncio.to_thread(_finish_batch_submissions, project_id, subs_done)
+
+    errors: List[VLLMError] = []
+
+    async def _judge(sub_id: str, criterion: Dict[str, Any], prompt: str, fingerprint: str):
+        nonlocal judged
+        try:
+            ai_result = await evaluate_with_prometheus_async(prompt, force_refresh=force_refresh)
+            buffer.append(_score_row(sub_id, criterion, ai_result, fingerprint))
+            judged += 1
+            remaining[sub_id] -= 1
+            if remaining[sub_id] == 0:
+                finished.append(sub_id)
+            await _flush()
+        except VLLMError as e:
+            errors.append(e)
+        finally:
+            window.release()
+
+    in_flight = set()
+    for sub_id, prompts in _iter_batch_prompts(submissions, criteria, stored, problem_statements, force_refresh):
+        if errors:
+            # vLLM is failing — stop feeding it; what's done so far is kept and the rest resumes later
+            break
+        if not prompts:
+            # Every fingerprint matches (unchanged or resumed) — just make sure it's marked completed
+            finished.append(sub_id)
+            continue
+        remaining[sub_id] = len(prompts)
+        for criterion, prompt, fingerprint in prompts:
+            await window.acquire()
+            if errors:
+                window.release()
+                break
+            task = asyncio.create_task(_judge(sub_id, criterion, prompt, fingerprint))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+    await _flush(force=True)
+    logger.info(f"[EvaluationBatch] Project {project_id}: {judged} judgement(s) written.")
+    if errors:
+        raise errors[0]
+    return judged
+
+@celery_app.task(bind=True, max_retries=3, queue="evaluation", acks_late=True)
+@leased("project_id")
+def evaluate_project_batch_task(self, project_id: str, force_refresh: bool = False):
+    """
+    Offline batch evaluation of every categorized submission of a project.
+    Incremental: pairs whose stored score has a matching fingerprint are skipped, so a rubric
+    edit only re-judges the affected criteria, and with acks_late a task lost to a worker
+    crash is redelivered and picks up where it stopped.
+    """
+    logger.info(f"[EvaluationBatch] Starting batch evaluation for project {project_id}")
+    try:
+        criteria_res = admin_supabase.table("scoring_criteria").select("*").eq("project_id", project_id).execute()
+        criteria = criteria_res.data or []
+
+        submissions = _select_all(lambda: admin_supabase.table("submissions")
+                                  .select("submission_id, detected_problem_statement_id")
+                                  .eq("project_id", project_id)
+                                  .in_("processing_status", ["processing", "completed"])
+                                  .order("submission_id"))
+        if not submissions:
+            logger.info(f"[EvaluationBatch] No categorized submissions for project {project_id}.")
+            return
+
+        submission_ids = [s["submission_id"] for s in submissions]
+        _ensure_evaluation_jobs(project_id, submission_ids)
+
+        if not criteria:
+            logger.warning(f"No scoring criteria for project {project_id}. Skipping evaluation.")
+            _finish_batch_submissions(project_id, submission_ids)
+            return
+
+        ps_res = admin_supabase.table("problem_statements").select("*").eq("project_id", project_id).execute()
+        problem_statements = {ps["statement_id"]: ps for ps in (ps_res.data or [])}
+
+        stored = {} if force_refresh else _stored_fingerprints(submission_ids)
+        run_async(_run_batch(project_id, submissions, criteria, stored, problem_statements, force_refresh=force_refresh))
+
+    except VLLMError as e:
+        if not e.retryable:
+            logger.error(f"[EvaluationBatch] Batch evaluation failed for project {project_id}: {e}")
+            raise
+        # Progress is saved — resume once vLLM is back; an open circuit doesn't use up retries
+        logger.warning(f"[EvaluationBatch] vLLM unavailable for project {project_id}, resuming in {e.retry_after:.0f}s: {e}")
+        raise self.retry(
+            exc=e,
+            countdown=max(5, e.retry_after),
+            max_retries=None if isinstance(e, VLLMUnavailableError) else self.max_retries
+        )
+
+    except Exception as e:
+        logger.error(f"[EvaluationBatch] Batch evaluation failed for project {project_id}: {e}")
+        raise self.retry(exc=e, countdown=30)
@@ -56,7 +56,7 @@ async def scan_and_store_submissions(project_id: str, folder_id: str, drive_fold
 
     Returns: { "stored": N, "skipped": N, "total_found": N }
     """
-    from app.database import admin_supabase
+    from app.database import admin_supabase, db_execute
 
     files = await list_files_in_folder(folder_id)
     if not files:
@@ -85,9 +85,9 @@ async def scan_and_store_submissions(project_id: str, folder_id: str, drive_fold
         }
 
         try:
-            admin_supabase.table("submissions").upsert(
+            await db_execute(admin_supabase.table("submissions").upsert(
                 payload, on_conflict="drive_file_id"
-            ).execute()
+            ))
             stored += 1
             print(f"[Scan] Stored: {file_name} → team='{team_name}'")
         except Exception as e:
@@ -0,0 +1,120 @@
+"""
+leaderboard_service.py — Reads the materialized leaderboard
+
+The weighted totals live in `leaderboard_entries` and are maintained by database
+triggers as scores are written (see migrations/004_leaderboard.sql and
+007_leaderboard_versions.sql). Every write transaction that changes a board bumps its
+`leaderboard_versions` row once, so a (version, query) pair fully identifies a board page:
+it is the HTTP ETag and the key of the Redis response cache.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from app.database import admin_supabase
+from app.services.redis_service import redis_client, KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_DEFAULT_MAX_SCORE = 10  # projects.max_score default; totals are scaled in SQL
+LEADERBOARD_CACHE_TTL = 600  # seconds; versions change on writes, so this only bounds memory
+
+
+def encode_cursor(total_score: float, submission_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{total_score}|{submission_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """Raises ValueError on a malformed cursor."""
+    score, submission_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+    return float(score), submission_id
+
+
+def leaderboard_etag(project_id: str, version: int, statement_id: Optional[str], limit: int, cursor: Optional[str]) -> str:
+    query = hashlib.sha1(f"{statement_id}|{limit}|{cursor}".encode()).hexdigest()[:12]
+    return f'W/"lb-{project_id}-{version}-{query}"'
+
+
+def _cache_key(etag: str) -> str:
+    return f"{KEY_PREFIX}:leaderboard:{hashlib.sha1(etag.encode()).hexdigest()}"
+
+
+def _get_cached(etag: str) -> Optional[Dict[str, Any]]:
+    if redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(_cache_key(etag))
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        logger.warning(f"[Leaderboard] Cache read failed: {e}")
+        return None
+
+
+def _set_cached(etag: str, body: Dict[str, Any]):
+    if redis_client is None:
+        return
+    try:
+        redis_client.set(_cache_key(etag), json.dumps(body), ex=LEADERBOARD_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"[Leaderboard] Cache write failed: {e}")
+
+
+def build_leaderboard(project: Dict[str, Any], etag: str, statement_id: Optional[str], limit: int, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    One page of the ranked board in the shape Leaderboard.js renders. Served from Redis when
+    this exact page was built at the current version.
+    """
+    cached = _get_cached(etag)
+    if cached is not None:
+        return cached
+
+    project_id = project["project_id"]
+    after_score, after_id = decode_cursor(cursor) if cursor else (None, None)
+
+    criteria_res = admin_supabase.table("scoring_criteria") \
+        .select("criterion_name, weight") \
+        .eq("project_id", project_id) \
+        .order("weight", desc=True) \
+        .execute()
+
+    rows_res = admin_supabase.rpc("project_leaderboard", {
+        "p_project_id": project_id,
+        "p_statement_id": statement_id,
+        "p_limit": limit,
+        "p_after_score": after_score,
+        "p_after_id": after_id
+    }).execute()
+    rows = rows_res.data or []
+
+    total = rows[0]["total_count"] if rows else 0
+    entries = []
+    for row in rows:
+        row.pop("total_count", None)
+        row["total_score"] = float(row["total_score"] or 0)
+        row["criteria_scores"] = {name: float(v) for name, v in (row.get("criteria_scores") or {}).items()}
+        entries.append(row)
+
+    next_cursor = None
+    if len(entries) == limit:
+        last = entries[-1]
+        next_cursor = encode_cursor(last["total_score"], last["submission_id"])
+
+    body = {
+        "project": {
+            "project_id": project_id,
+            "project_name": project.get("project_name"),
+            "max_score": float(project.get("max_score") or LEADERBOARD_DEFAULT_MAX_SCORE),
+            "scoring_criteria": [
+                {"name": c["criterion_name"], "weight": c["weight"]} for c in (criteria_res.data or [])
+            ],
+        },
+        "leaderboard": entries,
+        "total": total,
+        "next_cursor": next_cursor,
+        "version": project.get("leaderboard_version", 0),
+    }
+    _set_cached(etag, body)
+    return body
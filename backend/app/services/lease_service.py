@@ -0,0 +1,226 @@
+"""
+lease_service.py — Heartbeat leases for pipeline tasks
+
+Every pipeline task holds a short Redis lease on the thing it works on (a submission or a
+project) while it runs:
+
+  - LEASE      : `hackeval:lease:{task}:{resource}` = owner token, set with NX and a
+                 LEASE_TTL_SECONDS expiry. A second delivery of the same work finds the
+                 lease taken and is retried once it could have expired, so the same
+                 submission is never processed twice concurrently and a real re-run
+                 (re-evaluate, force_refresh) still happens after the current one
+  - HEARTBEAT  : a daemon thread renews the lease every LEASE_HEARTBEAT_SECONDS, only while
+                 the token still matches (a lost lease is never re-taken)
+  - REGISTRY   : `hackeval:leases` maps each held lease to the message that started it.
+                 acks_late tasks are left out: the broker already redelivers them when
+                 their worker dies, and a reaper requeue would run them a second time
+
+If a worker dies, its heartbeats stop and the lease expires within LEASE_TTL_SECONDS. The
+`reap_expired_leases` beat task then finds registry entries without a live lease and sends
+the original task again (at most LEASE_MAX_REQUEUES times). Celery retries release the
+lease and drop the registry entry — the retry message is already on the broker.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+from app.celery_app import celery_app
+from app.services.redis_service import redis_client, KEY_PREFIX, PROJECT_STATE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL_SECONDS = int(os.getenv("LEASE_TTL_SECONDS", "20"))
+LEASE_HEARTBEAT_SECONDS = float(os.getenv("LEASE_HEARTBEAT_SECONDS", str(LEASE_TTL_SECONDS / 4)))
+LEASE_REAP_INTERVAL = float(os.getenv("LEASE_REAP_INTERVAL", "10"))
+LEASE_MAX_REQUEUES = int(os.getenv("LEASE_MAX_REQUEUES", "3"))
+LEASE_BUSY_RETRIES = int(os.getenv("LEASE_BUSY_RETRIES", "60"))  # waits of LEASE_TTL_SECONDS for a held lease
+
+_REGISTRY_KEY = f"{KEY_PREFIX}:leases"
+_REQUEUES_KEY = f"{KEY_PREFIX}:leases:requeues"
+
+# Renew / release only while we are still the owner
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('HDEL', KEYS[2], KEYS[1])
+    return 1
+end
+return 0
+"""
+
+# Claims an expired entry for requeueing: exactly one reaper wins, and only if nobody
+# re-acquired the lease in the meantime
+_CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if redis.call('HDEL', KEYS[2], KEYS[1]) == 0 then
+    return 0
+end
+return redis.call('HINCRBY', KEYS[3], KEYS[1], 1)
+"""
+
+
+def lease_key(task_name: str, resource_id: str) -> str:
+    return f"{KEY_PREFIX}:lease:{task_name}:{resource_id}"
+
+
+class Lease:
+    """A held lease plus its heartbeat thread."""
+
+    def __init__(self, key: str, token: str):
+        self.key = key
+        self.token = token
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-heartbeat:{key}", daemon=True)
+
+    def _heartbeat(self):
+        while not self._stop.wait(LEASE_HEARTBEAT_SECONDS):
+            try:
+                if not redis_client.eval(_RENEW_SCRIPT, 1, self.key, self.token, int(LEASE_TTL_SECONDS * 1000)):
+                    logger.warning(f"[Lease] Lost {self.key} — another worker may have taken over this work")
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # Redis blip: keep trying until the TTL runs out
+                logger.warning(f"[Lease] Heartbeat for {self.key} failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+    def release(self):
+        """Work is done (or handed to a Celery retry): drop the lease, its registry entry and requeue count."""
+        self.stop()
+        try:
+            if redis_client.eval(_RELEASE_SCRIPT, 2, self.key, _REGISTRY_KEY, self.token):
+                redis_client.hdel(_REQUEUES_KEY, self.key)
+        except Exception as e:
+            logger.warning(f"[Lease] Could not release {self.key}: {e}")
+
+
+def acquire_lease(task_name: str, resource_id: str, message: Optional[dict]) -> Optional[Lease]:
+    """
+    Takes the lease for (task, resource) and registers `message` for requeueing should the
+    holder die (not registered when None). Returns None when another live worker holds it.
+    """
+    key = lease_key(task_name, resource_id)
+    token = uuid.uuid4().hex
+    if not redis_client.set(key, token, nx=True, ex=LEASE_TTL_SECONDS):
+        return None
+    if message is not None:
+        pipe = redis_client.pipeline()
+        pipe.hset(_REGISTRY_KEY, key, json.dumps(message))
+        pipe.expire(_REGISTRY_KEY, PROJECT_STATE_TTL_SECONDS)
+        pipe.execute()
+    lease = Lease(key, token)
+    lease._thread.start()
+    return lease
+
+
+def leased(resource_arg: str):
+    """
+    Decorator for bound Celery tasks (put it below @celery_app.task): runs the task body under
+    the lease for the value of `resource_arg`. If that work is already running, the delivery
+    is retried after LEASE_TTL_SECONDS instead of dropped. Fails open — without Redis the task
+    simply runs unleased.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            resource_id = signature.bind(self, *args, **kwargs).arguments[resource_arg]
+            message = None
+            if not getattr(self, "acks_late", False):
+                message = {
+                    "task": self.name,
+                    "args": list(args),
+                    "kwargs": kwargs,
+                    "queue": getattr(self, "queue", None),
+                }
+            busy = False
+            try:
+                lease = acquire_lease(self.name, str(resource_id), message) if redis_client is not None else None
+                busy = lease is None and redis_client is not None
+            except Exception as e:
+                logger.warning(f"[Lease] Could not take lease for {self.name}:{resource_id}, running unleased: {e}")
+                lease = None
+
+            if busy:
+                logger.info(f"[Lease] {self.name} for {resource_id} is already running elsewhere; retrying in {LEASE_TTL_SECONDS}s")
+                raise self.retry(countdown=LEASE_TTL_SECONDS, max_retries=LEASE_BUSY_RETRIES)
+
+            if lease is None:
+                return func(self, *args, **kwargs)
+
+            try:
+                result = func(self, *args, **kwargs)
+            except Exception:
+                # Retries are already on the broker; terminal failures are handled by the task
+                lease.release()
+                raise
+            except BaseException:
+                # Worker shutting down mid-task: stop heartbeating and let the reaper requeue it
+                lease.stop()
+                raise
+            lease.release()
+            if lease.lost.is_set():
+                logger.warning(f"[Lease] {self.name} for {resource_id} finished after losing its lease")
+            return result
+
+        return wrapper
+    return decorator
+
+
+@celery_app.task(bind=True, queue="maintenance")
+def reap_expired_leases(self):
+    """
+    Celery beat job: re-sends every registered task whose lease has expired (its worker
+    stopped heartbeating). Gives up after LEASE_MAX_REQUEUES attempts for the same work.
+    """
+    if redis_client is None:
+        return 0
+    entries = redis_client.hgetall(_REGISTRY_KEY)
+    if not entries:
+        return 0
+
+    pipe = redis_client.pipeline()
+    for key in entries:
+        pipe.exists(key)
+    alive = pipe.execute()
+
+    requeued = 0
+    for (key, raw), is_alive in zip(entries.items(), alive):
+        if is_alive:
+            continue
+        attempts = redis_client.eval(_CLAIM_SCRIPT, 3, key, _REGISTRY_KEY, _REQUEUES_KEY)
+        if not attempts:
+            continue
+        message = json.loads(raw)
+        if attempts > LEASE_MAX_REQUEUES:
+            logger.error(f"[Lease] {key} expired {attempts} times; not requeueing {message['task']} again")
+            redis_client.hdel(_REQUEUES_KEY, key)
+            continue
+        logger.warning(f"[Lease] {key} expired (worker lost) — requeueing {message['task']} (attempt {attempts})")
+        celery_app.send_task(
+            message["task"],
+            args=message["args"],
+            kwargs=message["kwargs"],
+            queue=message["queue"]
+        )
+        requeued += 1
+    return requeued
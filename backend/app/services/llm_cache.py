@@ -0,0 +1,72 @@
+"""
+llm_cache.py — Persistent cache for vLLM judgements
+
+Grading prompts are deterministic (fixed template, temperature 0.1), so re-running an
+evaluation after reset-submissions, a Celery retry or a worker crash would otherwise pay
+the full generation cost again for identical requests.
+
+Entries live in Redis under
+    hackeval:llm_cache:<model>:<sha256(sampling params)>:<sha256(prompt)>
+with a TTL, and a sorted-set index of insertion times enforces a size cap (oldest
+entries are evicted first).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.services.redis_service import redis_client, KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+
+_INDEX_KEY = f"{KEY_PREFIX}:llm_cache:index"
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """Key for a chat-completions payload: (model, sampling params, prompt)."""
+    params = {k: v for k, v in payload.items() if k not in ("model", "messages")}
+    prompt = json.dumps(payload.get("messages", []), sort_keys=True, ensure_ascii=False)
+    params_hash = _sha256(json.dumps(params, sort_keys=True))[:16]
+    return f"{KEY_PREFIX}:llm_cache:{payload.get('model')}:{params_hash}:{_sha256(prompt)}"
+
+
+def get_cached_judgement(payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not LLM_CACHE_ENABLED or redis_client is None:
+        return None
+    try:
+        raw = redis_client.get(cache_key(payload))
+        return json.loads(raw) if raw else None
+    except Exception as e:
+        # A cache failure must never fail an evaluation
+        logger.warning(f"[LLMCache] Lookup failed: {e}")
+        return None
+
+
+def store_judgement(payload: Dict[str, Any], result: Dict[str, Any]):
+    if not LLM_CACHE_ENABLED or redis_client is None:
+        return
+    try:
+        key = cache_key(payload)
+        pipe = redis_client.pipeline()
+        pipe.set(key, json.dumps(result), ex=LLM_CACHE_TTL_SECONDS)
+        pipe.zadd(_INDEX_KEY, {key: time.time()})
+        pipe.zcard(_INDEX_KEY)
+        size = pipe.execute()[-1]
+
+        if size > LLM_CACHE_MAX_ENTRIES:
+            evicted = redis_client.zpopmin(_INDEX_KEY, size - LLM_CACHE_MAX_ENTRIES)
+            if evicted:
+                redis_client.delete(*[k for k, _ in evicted])
+    except Exception as e:
+        logger.warning(f"[LLMCache] Store failed: {e}")
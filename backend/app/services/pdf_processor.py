@@ -22,6 +22,10 @@ from io import BytesIO
 from app.database import admin_supabase
 from app.services.google_drive import stream_pdf_bytes_sync   # ✅ sync version
 from app.services.docling_extractor import _sync_extract_pdf, _store_slides_sync  # ✅ sync internals
+from app.services.redis_service import settle_submission
+from app.services.plagiarism_service import queue_plagiarism_detection
+from app.services.progress_service import record_stage
+from app.services.lease_service import leased
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +37,7 @@ logger = logging.getLogger(__name__)
 from app.celery_app import celery_app
 
 @celery_app.task(bind=True, max_retries=3, queue="extraction")
+@leased("submission_id")
 def process_submission_task(self, submission_id: str, project_id: str) -> None:
     """
     Main background worker entrypoint (Celery Task).
@@ -75,6 +80,8 @@ def process_submission_task(self, submission_id: str, project_id: str) -> None:
         )
     except Exception as e:
         logger.error(f"[Worker] Failed during _fetch_single_submission_sync for {submission_id}: {e}")
+        if self.request.retries >= self.max_retries:
+            _settle_failed_submission(submission_id, project_id)
         raise self.retry(exc=e, countdown=20)
 
     if pdf_bytes is not None:
@@ -97,6 +104,7 @@ def process_submission_task(self, submission_id: str, project_id: str) -> None:
                     "updated_at": _now_iso()
                 }).eq("submission_id", submission_id).execute()
                 print(f"[Worker]    ✅ '{team_name}' → slides extracted, queuing embedding task.")
+                record_stage(project_id, "extracted", [submission_id])
 
                 # Upsert the embedding job row so the progress endpoint can track it
                 # job_type must be 'embedding' per DB CHECK constraint (not 'embed_submission_slides')
@@ -134,8 +142,10 @@ def process_submission_task(self, submission_id: str, project_id: str) -> None:
                 print(f"[Worker]    ❌ '{team_name}' → extraction failed")
             except Exception as e:
                 logger.warning(f"[Worker] Could not mark submission failed (extract): {e}")
+            _settle_failed_submission(submission_id, project_id)
     else:
         print(f"[Worker]    ❌ '{team_name}' → fetch failed")
+        _settle_failed_submission(submission_id, project_id)
 
     # --- Update project status after processing ---
     try:
@@ -271,6 +281,26 @@ def _get_job_id_sync(submission_id: str, project_id: str, job_type: str) -> str
     return None
 
 
+def _settle_failed_submission(submission_id: str, project_id: str) -> None:
+    """
+    A failed submission will never be embedded — take it out of the categorization
+    barrier so the rest of the project isn't held back. If it was the last one
+    outstanding, trigger auto-categorization from here.
+    """
+    record_stage(project_id, "failed", [submission_id])
+    try:
+        if settle_submission(project_id, submission_id):
+            print(f"[Worker] Last outstanding submission settled — triggering auto-categorization for {project_id}")
+            celery_app.send_task(
+                "app.services.embedding_service.auto_categorize_project_task",
+                args=[project_id],
+                queue="embedding"
+            )
+            queue_plagiarism_detection(project_id)
+    except Exception as e:
+        print(f"  [Helper] Could not update categorization barrier for submission_id={submission_id}: {e}")
+
+
 def _now_iso() -> str:
     """Returns the current UTC time as an ISO 8601 string."""
     return datetime.now(timezone.utc).isoformat()
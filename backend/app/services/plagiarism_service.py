@@ -0,0 +1,238 @@
+"""
+plagiarism_service.py — Cross-submission plagiarism detection
+
+Stage 1: CANDIDATES (MinHash / LSH)
+  - Shingle every slide's text into word 5-grams
+  - MinHash signatures (NumPy, 128 permutations) banded into an LSH index
+  - Only slides from DIFFERENT submissions that share a bucket become candidates,
+    so the work grows with the number of near-duplicates, not with N²
+
+Stage 2: VERIFY (Qdrant)
+  - The stored vectors of every candidate slide are fetched in batches
+  - A candidate pair is flagged only if the cosine similarity of its two slide
+    vectors is at least VECTOR_THRESHOLD — computed per pair, so slides shared by
+    many teams are verified just like any other pair
+
+Flagged pairs are written to `plagiarism_flags` (see migrations/001_plagiarism_flags.sql).
+"""
+
+import logging
+import re
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.database import admin_supabase
+from app.celery_app import celery_app
+from app.services.lease_service import leased
+from app.services.qdrant_service import qdrant_client, COLLECTION_NAME
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+LSH_BANDS = 32          # 32 bands x 4 rows → candidate threshold ≈ Jaccard 0.42
+MIN_SHINGLES = 8        # Slides shorter than this ("Thank you!", titles) are ignored
+MAX_BUCKET_SIZE = 50    # Buckets bigger than this are template boilerplate, not plagiarism
+TEXT_THRESHOLD = 0.5    # Estimated Jaccard required to keep a candidate
+VECTOR_THRESHOLD = 0.9  # Cosine similarity required to flag a candidate
+RETRIEVE_BATCH_SIZE = 256
+SLIDE_PAGE_SIZE = 1000
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, (1 << 32) - 1, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Stage 1: MinHash / LSH
+# ---------------------------------------------------------------------------
+
+def _shingles(text: str) -> np.ndarray:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def _minhash(shingles: np.ndarray) -> np.ndarray:
+    """(a*x + b) mod p over all shingles at once, min per permutation."""
+    hashed = (np.outer(shingles, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+    return (hashed & _MAX_HASH).min(axis=0)
+
+
+def _lsh_candidates(signatures: np.ndarray, owners: List[str]) -> Dict[Tuple[int, int], float]:
+    """
+    Returns {(i, j): estimated_jaccard} for slide rows from different submissions
+    that collide in at least one LSH band.
+    """
+    rows_per_band = NUM_PERM // LSH_BANDS
+    candidates: Dict[Tuple[int, int], float] = {}
+
+    for band in range(LSH_BANDS):
+        buckets = defaultdict(list)
+        band_sigs = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        for row, sig in enumerate(band_sigs):
+            buckets[sig.tobytes()].append(row)
+
+        for members in buckets.values():
+            if len(members) < 2 or len(members) > MAX_BUCKET_SIZE:
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    i, j = members[x], members[y]
+                    if owners[i] == owners[j] or (i, j) in candidates:
+                        continue
+                    candidates[(i, j)] = float(np.mean(signatures[i] == signatures[j]))
+
+    return {pair: est for pair, est in candidates.items() if est >= TEXT_THRESHOLD}
+
+
+# ---------------------------------------------------------------------------
+# Stage 2: Qdrant verification
+# ---------------------------------------------------------------------------
+
+def _slide_vectors(slides: List[dict], rows: List[int]) -> Dict[int, np.ndarray]:
+    """{row: unit-length slide vector} for each candidate slide row that is indexed in Qdrant."""
+    row_of = {str(slides[row]["slide_id"]): row for row in rows}
+    ids = list(row_of)
+    vectors: Dict[int, np.ndarray] = {}
+
+    for start in range(0, len(ids), RETRIEVE_BATCH_SIZE):
+        points = qdrant_client.retrieve(
+            collection_name=COLLECTION_NAME,
+            ids=ids[start:start + RETRIEVE_BATCH_SIZE],
+            with_payload=False,
+            with_vectors=["text"],
+        )
+        for pt in points:
+            vec = np.asarray(pt.vector["text"], dtype=np.float32)
+            vectors[row_of[str(pt.id)]] = vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    return vectors
+
+
+# ---------------------------------------------------------------------------
+# Orchestration
+# ---------------------------------------------------------------------------
+
+def _fetch_project_slides(project_id: str) -> List[dict]:
+    """Range-paginates over all slides of the project (PostgREST caps each response)."""
+    slides = []
+    offset = 0
+    while True:
+        res = admin_supabase.table("submission_slides") \
+            .select("slide_id, submission_id, slide_number, text_content, images_ocr_text") \
+            .eq("project_id", project_id) \
+            .order("slide_id") \
+            .range(offset, offset + SLIDE_PAGE_SIZE - 1) \
+            .execute()
+        page = res.data or []
+        slides.extend(page)
+        if len(page) < SLIDE_PAGE_SIZE:
+            return slides
+        offset += SLIDE_PAGE_SIZE
+
+
+def detect_plagiarism(project_id: str) -> List[dict]:
+    """Runs both stages for a project and returns the flagged slide pairs."""
+    all_slides = _fetch_project_slides(project_id)
+
+    slides, signatures = [], []
+    for slide in all_slides:
+        text = f"{slide.get('text_content') or ''}\n{slide.get('images_ocr_text') or ''}"
+        shingles = _shingles(text)
+        if len(shingles) < MIN_SHINGLES:
+            continue
+        slides.append(slide)
+        signatures.append(_minhash(shingles))
+
+    if len(slides) < 2:
+        return []
+
+    signatures = np.vstack(signatures)
+    owners = [s["submission_id"] for s in slides]
+    candidates = _lsh_candidates(signatures, owners)
+    logger.info(
+        f"[Plagiarism] {len(slides)} slides → {len(candidates)} LSH candidate pair(s) for project {project_id}"
+    )
+    if not candidates:
+        return []
+
+    candidate_rows = sorted({row for pair in candidates for row in pair})
+    vectors = _slide_vectors(slides, candidate_rows)
+
+    flags = []
+    for (i, j), text_sim in candidates.items():
+        a, b = slides[i], slides[j]
+        if i not in vectors or j not in vectors:
+            continue
+        vector_sim = float(vectors[i] @ vectors[j])
+        if vector_sim < VECTOR_THRESHOLD:
+            continue
+        flags.append({
+            "project_id": project_id,
+            "submission_id_a": a["submission_id"],
+            "slide_id_a": a["slide_id"],
+            "slide_number_a": a.get("slide_number"),
+            "submission_id_b": b["submission_id"],
+            "slide_id_b": b["slide_id"],
+            "slide_number_b": b.get("slide_number"),
+            "text_similarity": round(text_sim, 4),
+            "vector_similarity": round(vector_sim, 4),
+            "detected_at": _now_iso()
+        })
+    return flags
+
+
+@celery_app.task(bind=True, max_retries=2, queue="embedding")
+@leased("project_id")
+def detect_plagiarism_task(self, project_id: str):
+    """
+    Runs after all submissions of a project are indexed (triggered alongside auto-categorization)
+    when the project has `plagiarism_detection_enabled`. Replaces the project's previous flags.
+    """
+    if not qdrant_client:
+        raise self.retry(countdown=5)
+
+    try:
+        flags = detect_plagiarism(project_id)
+
+        admin_supabase.table("plagiarism_flags").delete().eq("project_id", project_id).execute()
+        for start in range(0, len(flags), 500):
+            admin_supabase.table("plagiarism_flags").insert(flags[start:start + 500]).execute()
+
+        logger.info(f"[Plagiarism] Flagged {len(flags)} slide pair(s) for project {project_id}.")
+    except Exception as e:
+        logger.error(f"[Plagiarism] Detection failed for project {project_id}: {e}")
+        raise self.retry(exc=e, countdown=30)
+
+
+def queue_plagiarism_detection(project_id: str):
+    """Queues plagiarism detection if the project has it enabled."""
+    try:
+        project_res = admin_supabase.table("projects") \
+            .select("plagiarism_detection_enabled") \
+            .eq("project_id", project_id) \
+            .single() \
+            .execute()
+        if project_res.data and project_res.data.get("plagiarism_detection_enabled"):
+            celery_app.send_task(
+                "app.services.plagiarism_service.detect_plagiarism_task",
+                args=[project_id],
+                queue="embedding"
+            )
+    except Exception as e:
+        logger.error(f"Failed to queue plagiarism detection for project {project_id}: {e}")
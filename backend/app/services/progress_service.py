@@ -0,0 +1,139 @@
+"""
+progress_service.py — Push-based pipeline progress
+
+Workers record stage transitions here instead of dashboards counting rows in Postgres:
+
+  - COUNTERS   : one Redis set per (project, stage). SADD is idempotent, so a Celery retry
+                 never counts a submission twice, and SCARD is the stage counter
+  - THROUGHPUT : timestamps of the last RATE_WINDOW completions per stage; the measured
+                 rate drives the ETA
+  - PUB/SUB    : every transition publishes a delta on `hackeval:progress:{project_id}`,
+                 which the SSE endpoint relays to connected dashboards
+
+Stages: extracted → embedded → categorized → evaluated, plus failed.
+"""
+
+import json
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from app.services.redis_service import redis_client, KEY_PREFIX, PROJECT_STATE_TTL_SECONDS, REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("extracted", "embedded", "categorized", "evaluated", "failed")
+RATE_WINDOW = 50  # completions kept per stage for the throughput estimate
+_ETA_STAGES = ("extracted", "embedded", "evaluated")
+
+
+def _key(project_id: str, *parts: str) -> str:
+    return ":".join((KEY_PREFIX, "progress", project_id) + parts)
+
+
+def progress_channel(project_id: str) -> str:
+    return _key(project_id)
+
+
+def reset_progress(project_id: str, total: int, keep_stages: Iterable[str] = ()):
+    """Starts a new run for the project: sets the submission total and clears the stage counters."""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        for stage in STAGES:
+            if stage not in keep_stages:
+                pipe.delete(_key(project_id, stage), _key(project_id, stage, "times"))
+        pipe.set(_key(project_id, "total"), total, ex=PROJECT_STATE_TTL_SECONDS)
+        pipe.execute()
+        _publish(project_id, {"event": "reset", "total": total})
+    except Exception as e:
+        logger.warning(f"[Progress] Could not reset progress for project {project_id}: {e}")
+
+
+def record_stage(project_id: str, stage: str, submission_ids: Iterable[str]):
+    """Marks submissions as having reached `stage` and publishes the new counts. Never raises."""
+    submission_ids = [str(s) for s in submission_ids if s]
+    if redis_client is None or not project_id or not submission_ids:
+        return
+    try:
+        now = time.time()
+        stage_key, times_key = _key(project_id, stage), _key(project_id, stage, "times")
+        pipe = redis_client.pipeline()
+        pipe.sadd(stage_key, *submission_ids)
+        pipe.expire(stage_key, PROJECT_STATE_TTL_SECONDS)
+        pipe.lpush(times_key, *([now] * len(submission_ids)))
+        pipe.ltrim(times_key, 0, RATE_WINDOW - 1)
+        pipe.expire(times_key, PROJECT_STATE_TTL_SECONDS)
+        pipe.execute()
+        _publish(project_id, {"event": "stage", "stage": stage, "submission_ids": submission_ids})
+    except Exception as e:
+        logger.warning(f"[Progress] Could not record '{stage}' for project {project_id}: {e}")
+
+
+def _publish(project_id: str, delta: Dict):
+    delta["snapshot"] = get_progress_snapshot(project_id)
+    redis_client.publish(progress_channel(project_id), json.dumps(delta))
+
+
+def _stage_rate(project_id: str, stage: str) -> Optional[float]:
+    """Completions per second over the recent window, None until there are two samples."""
+    stamps = [float(t) for t in redis_client.lrange(_key(project_id, stage, "times"), 0, -1)]
+    if len(stamps) < 2 or max(stamps) - min(stamps) <= 0:
+        return None
+    return (len(stamps) - 1) / (max(stamps) - min(stamps))
+
+
+def get_progress_snapshot(project_id: str) -> Optional[Dict]:
+    """
+    Current counts + ETA, or None when this project has no run recorded in Redis (or Redis is
+    unavailable). Stages are pipelined, so the ETA is the slowest stage's remaining work at its
+    measured rate.
+    """
+    if redis_client is None:
+        return None
+    try:
+        pipe = redis_client.pipeline()
+        pipe.get(_key(project_id, "total"))
+        for stage in STAGES:
+            pipe.scard(_key(project_id, stage))
+        for stage in _ETA_STAGES:
+            # Failed submissions that never reached this stage (some fail after reaching it)
+            pipe.sdiff(_key(project_id, "failed"), _key(project_id, stage))
+        total, *rest = pipe.execute()
+        if total is None:
+            return None
+        total = int(total)
+        counts = dict(zip(STAGES, rest[:len(STAGES)]))
+        failed_before = {stage: len(ids) for stage, ids in zip(_ETA_STAGES, rest[len(STAGES):])}
+
+        eta_seconds, rate = 0.0, None
+        for stage in _ETA_STAGES:
+            # A stage with no samples yet is assumed to keep up with the one before it
+            rate = _stage_rate(project_id, stage) or rate
+            remaining = max(0, total - failed_before[stage] - counts[stage])
+            if not remaining:
+                continue
+            if not rate:
+                eta_seconds = None  # nothing measured yet
+                break
+            eta_seconds = max(eta_seconds, remaining / rate)
+    except Exception as e:
+        logger.warning(f"[Progress] Could not read progress for project {project_id}: {e}")
+        return None
+
+    return {
+        "total_submissions": total,
+        "extraction_complete": counts["extracted"],
+        "embedding_complete": counts["embedded"],
+        "categorization_complete": counts["categorized"],
+        "evaluation_complete": counts["evaluated"],
+        "failed": counts["failed"],
+        "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+    }
+
+
+def get_async_redis():
+    """Per-connection asyncio client for pub/sub subscribers (SSE streams)."""
+    import redis.asyncio as aioredis
+    return aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
@@ -1,6 +1,6 @@
 
 from fastapi import HTTPException
-from app.database import admin_supabase
+from app.database import admin_supabase, db_execute, run_db
 from app.schemas import ProjectCreateRequest
 import re
 
@@ -14,7 +14,7 @@ async def create_project_in_db(user, project_data: ProjectCreateRequest):
     
     # Check 1: Project Name Uniqueness for this user
     # Note: 'eq' on 'project_name' might need exact match. 
-    existing_projects = admin_supabase.table("projects").select("project_id").eq("owner_user_id", user_id).eq("project_name", project_data.project_name).execute()
+    existing_projects = await db_execute(admin_supabase.table("projects").select("project_id").eq("owner_user_id", user_id).eq("project_name", project_data.project_name))
     if existing_projects.data:
          raise HTTPException(status_code=400, detail=f"A project with the name '{project_data.project_name}' already exists.")
 
@@ -43,13 +43,14 @@ async def create_project_in_db(user, project_data: ProjectCreateRequest):
             "status": "draft",
             "submission_deadline": project_data.submission_deadline.isoformat() if project_data.submission_deadline else None,
             "auto_categorization_enabled": project_data.auto_categorization_enabled,
-            "plagiarism_detection_enabled": project_data.plagiarism_detection_enabled
+            "plagiarism_detection_enabled": project_data.plagiarism_detection_enabled,
+            "max_score": project_data.max_score
             # description, theme_desc are not in the schema provided by user, so skipping them or check if schema has jsonb?
             # User schema didn't show 'description' or 'track_mode' columns. 
             # I will assume standard columns provided in schema request.
         }
         
-        project_res = admin_supabase.table("projects").insert(project_payload).execute()
+        project_res = await db_execute(admin_supabase.table("projects").insert(project_payload))
         if not project_res.data:
              raise HTTPException(status_code=500, detail="Failed to create project in database.")
         
@@ -66,12 +67,12 @@ async def create_project_in_db(user, project_data: ProjectCreateRequest):
                 } for ps in project_data.problem_statements
             ]
             try:
-                ps_res = admin_supabase.table("problem_statements").insert(ps_payload).execute()
+                ps_res = await db_execute(admin_supabase.table("problem_statements").insert(ps_payload))
                 # Run embedding generation for these problem statements
                 try:
                     from app.services.embedding_service import embed_problem_statements
                     if ps_res.data:
-                        embed_problem_statements(project_id, ps_res.data)
+                        await run_db(embed_problem_statements, project_id, ps_res.data)
                 except Exception as emb_e:
                     print(f"[Project Create] Embedding workflow failed: {emb_e}")
             except Exception as e:
@@ -88,7 +89,7 @@ async def create_project_in_db(user, project_data: ProjectCreateRequest):
                 } for sc in project_data.scoring_criteria
             ]
             try:
-                admin_supabase.table("scoring_criteria").insert(sc_payload).execute()
+                await db_execute(admin_supabase.table("scoring_criteria").insert(sc_payload))
             except Exception as e:
                 print(f"[Project Create] Skipping scoring_criteria insert (table may not exist): {e}")
 
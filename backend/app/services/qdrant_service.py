@@ -1,7 +1,21 @@
 import os
 import logging
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
+from qdrant_client.http.models import (
+    Distance,
+    VectorParams,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    QuantizationSearchParams,
+    SearchParams,
+    Disabled,
+    SparseVectorParams,
+    Modifier,
+)
 from qdrant_client.http.exceptions import UnexpectedResponse
 
 logger = logging.getLogger(__name__)
@@ -10,6 +24,20 @@ logger = logging.getLogger(__name__)
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")
 
+# Vector index tuning — 'scalar' (int8), 'binary' or 'none'
+QUANTIZATION_MODES = ("scalar", "binary", "none")
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "scalar").strip().lower()
+if QDRANT_QUANTIZATION not in QUANTIZATION_MODES:
+    # An unknown mode would never match the collection and re-migrate it on every startup
+    logger.warning(f"[Qdrant] Unknown QDRANT_QUANTIZATION '{QDRANT_QUANTIZATION}', using 'none' (expected one of {QUANTIZATION_MODES})")
+    QDRANT_QUANTIZATION = "none"
+QDRANT_QUANTIZATION_QUANTILE = float(os.getenv("QDRANT_QUANTIZATION_QUANTILE", "0.99"))
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "128"))
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "64"))
+
 # We initialize a global client instance
 try:
     if QDRANT_API_KEY:
@@ -22,6 +50,100 @@ except Exception as e:
     qdrant_client = None
 
 COLLECTION_NAME = "slide_intelligence"
+VECTOR_SIZE = 384
+
+# Sparse keyword vectors for hybrid slide search (see search_service.py). Kept in their own
+# collection so existing dense collections don't have to be recreated; point ids match.
+KEYWORD_COLLECTION_NAME = "slide_keywords"
+KEYWORD_VECTOR_NAME = "bm25"
+
+
+def get_quantization_config(mode: str = None):
+    """
+    Returns the quantization config for the configured mode.
+    Quantized vectors are kept in RAM while the original float32 vectors stay on disk
+    and are only read back for rescoring.
+    """
+    mode = (mode or QDRANT_QUANTIZATION).lower()
+    if mode == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=QDRANT_QUANTIZATION_QUANTILE,
+                always_ram=True,
+            )
+        )
+    if mode == "binary":
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
+
+def get_hnsw_config(m: int = None, ef_construct: int = None) -> HnswConfigDiff:
+    return HnswConfigDiff(
+        m=m or QDRANT_HNSW_M,
+        ef_construct=ef_construct or QDRANT_HNSW_EF_CONSTRUCT,
+    )
+
+
+def get_search_params(exact: bool = False) -> SearchParams:
+    """
+    Search params for every query against the collection.
+    Searches run on the in-RAM quantized vectors and the top candidates
+    (limit * oversampling) are rescored with the original vectors.
+    """
+    quantization = None
+    if QDRANT_QUANTIZATION in ("scalar", "binary"):
+        quantization = QuantizationSearchParams(
+            ignore=False,
+            rescore=QDRANT_RESCORE,
+            oversampling=QDRANT_OVERSAMPLING,
+        )
+    return SearchParams(hnsw_ef=QDRANT_HNSW_EF, exact=exact, quantization=quantization)
+
+
+def _quantization_mode_of(quantization_cfg) -> str:
+    """Maps an existing collection's quantization config back to our mode names."""
+    if quantization_cfg is None:
+        return "none"
+    if getattr(quantization_cfg, "scalar", None) is not None:
+        return "scalar"
+    if getattr(quantization_cfg, "binary", None) is not None:
+        return "binary"
+    return "other"
+
+
+def _migrate_index_config(info):
+    """
+    Brings an existing collection in line with the configured quantization / HNSW settings.
+    Both are updated in place — Qdrant rebuilds the quantized vectors and the HNSW graph
+    in the background, so no points need to be re-uploaded.
+    """
+    params = info.config
+    current_mode = _quantization_mode_of(params.quantization_config)
+    hnsw = params.hnsw_config
+    wanted_quantization = get_quantization_config()
+
+    quantization_changed = current_mode != QDRANT_QUANTIZATION
+    if not quantization_changed and current_mode == "scalar":
+        quantile = params.quantization_config.scalar.quantile
+        quantization_changed = quantile is None or abs(quantile - QDRANT_QUANTIZATION_QUANTILE) > 1e-9
+    hnsw_changed = hnsw.m != QDRANT_HNSW_M or hnsw.ef_construct != QDRANT_HNSW_EF_CONSTRUCT
+
+    if not quantization_changed and not hnsw_changed:
+        return
+
+    logger.info(
+        f"[Qdrant] Migrating '{COLLECTION_NAME}': quantization {current_mode} → {QDRANT_QUANTIZATION} "
+        f"(quantile {QDRANT_QUANTIZATION_QUANTILE}), "
+        f"hnsw m={hnsw.m}/ef_construct={hnsw.ef_construct} → m={QDRANT_HNSW_M}/ef_construct={QDRANT_HNSW_EF_CONSTRUCT}"
+    )
+    qdrant_client.update_collection(
+        collection_name=COLLECTION_NAME,
+        hnsw_config=get_hnsw_config() if hnsw_changed else None,
+        quantization_config=(wanted_quantization or Disabled.DISABLED) if quantization_changed else None,
+    )
 
 
 def init_qdrant_collection():
@@ -39,21 +161,24 @@ def init_qdrant_collection():
             if isinstance(vectors_cfg, dict) and "text" in vectors_cfg:
                 logger.info(f"[Qdrant] Collection '{COLLECTION_NAME}' exists with correct schema.")
                 needs_create = False
+                _migrate_index_config(info)
             else:
                 logger.warning("[Qdrant] Wrong vector schema. Deleting and recreating...")
                 qdrant_client.delete_collection(COLLECTION_NAME)
 
         if needs_create:
-            logger.info(f"[Qdrant] Creating collection '{COLLECTION_NAME}'...")
+            logger.info(f"[Qdrant] Creating collection '{COLLECTION_NAME}' (quantization={QDRANT_QUANTIZATION})...")
             qdrant_client.create_collection(
                 collection_name=COLLECTION_NAME,
                 vectors_config={
                     "text": VectorParams(
-                        size=384,
+                        size=VECTOR_SIZE,
                         distance=Distance.COSINE,
                         on_disk=True
                     )
-                }
+                },
+                hnsw_config=get_hnsw_config(),
+                quantization_config=get_quantization_config(),
             )
             logger.info(f"[Qdrant] Collection '{COLLECTION_NAME}' created successfully.")
 
@@ -75,4 +200,66 @@ def init_qdrant_collection():
     except UnexpectedResponse as e:
         logger.error(f"[Qdrant] Error communicating with Qdrant server: {e}")
     except Exception as e:
-        logger.error(f"[Qdrant] Unexpected error during collection init: {e}")
\ No newline at end of file
+        logger.error(f"[Qdrant] Unexpected error during collection init: {e}")
+
+    init_keyword_collection()
+
+
+def init_keyword_collection():
+    """Creates the sparse keyword collection; Qdrant applies the IDF part of BM25 at query time."""
+    if qdrant_client is None:
+        return
+    try:
+        if not qdrant_client.collection_exists(KEYWORD_COLLECTION_NAME):
+            logger.info(f"[Qdrant] Creating collection '{KEYWORD_COLLECTION_NAME}'...")
+            qdrant_client.create_collection(
+                collection_name=KEYWORD_COLLECTION_NAME,
+                vectors_config={},
+                sparse_vectors_config={KEYWORD_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+            )
+        from qdrant_client.http.models import PayloadSchemaType
+        for field in ("project_id", "submission_id"):
+            try:
+                qdrant_client.create_payload_index(
+                    collection_name=KEYWORD_COLLECTION_NAME,
+                    field_name=field,
+                    field_schema=PayloadSchemaType.KEYWORD,
+                )
+            except Exception as idx_e:
+                logger.debug(f"[Qdrant] Index for '{KEYWORD_COLLECTION_NAME}.{field}' skipped: {idx_e}")
+    except Exception as e:
+        logger.error(f"[Qdrant] Could not initialize '{KEYWORD_COLLECTION_NAME}': {e}")
+
+
+def find_similar_submissions(project_id: str, submission_id: str, limit: int = 5) -> list:
+    """
+    Nearest teams to a submission, using its persisted `granularity: submission` centroid point
+    as the query — a single search, no slide vectors are touched.
+    """
+    if qdrant_client is None:
+        return []
+
+    result = qdrant_client.query_points(
+        collection_name=COLLECTION_NAME,
+        query=str(submission_id),  # search by the stored point's own vector
+        using="text",
+        query_filter={
+            "must": [
+                {"key": "granularity", "match": {"value": "submission"}},
+                {"key": "project_id", "match": {"value": project_id}}
+            ]
+        },
+        search_params=get_search_params(),
+        with_payload=["submission_id", "team_name", "slide_count"],
+        limit=limit,
+    )
+    return [
+        {
+            "submission_id": pt.payload.get("submission_id"),
+            "team_name": pt.payload.get("team_name"),
+            "slide_count": pt.payload.get("slide_count"),
+            "similarity": round(float(pt.score), 4),
+        }
+        for pt in result.points
+        if pt.payload.get("submission_id") != submission_id
+    ]
@@ -0,0 +1,70 @@
+import os
+import logging
+from typing import List
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Same Redis instance as the Celery broker unless configured otherwise
+REDIS_URL = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+
+# We initialize a global client instance (connections are opened lazily from its pool)
+try:
+    redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+except Exception as e:
+    logger.error(f"[Redis] Failed to initialize Redis client: {e}")
+    redis_client = None
+
+KEY_PREFIX = "hackeval"
+PROJECT_STATE_TTL_SECONDS = 7 * 24 * 3600
+
+
+# ---------------------------------------------------------------------------
+# Categorization barrier
+# ---------------------------------------------------------------------------
+# Each project keeps a Redis set of submissions that still have to finish
+# extraction + embedding. Every submission leaves the set exactly once (SREM is
+# idempotent, so Celery retries cannot double-count), and whichever call empties
+# the set is the single one that triggers auto-categorization.
+
+_SETTLE_SCRIPT = """
+local removed = redis.call('SREM', KEYS[1], ARGV[1])
+if removed == 1 and redis.call('SCARD', KEYS[1]) == 0 then
+    return 1
+end
+return 0
+"""
+
+
+def _awaiting_key(project_id: str) -> str:
+    return f"{KEY_PREFIX}:project:{project_id}:awaiting_categorization"
+
+
+def register_awaiting_categorization(project_id: str, submission_ids: List[str], reset: bool = False):
+    """Adds submissions to the project's remaining-work set. `reset` drops any previous run first."""
+    if redis_client is None:
+        logger.error("[Redis] Client is not initialized. Categorization barrier is disabled.")
+        return
+    if not submission_ids and not reset:
+        return
+
+    key = _awaiting_key(project_id)
+    pipe = redis_client.pipeline()
+    if reset:
+        pipe.delete(key)
+    if submission_ids:
+        pipe.sadd(key, *submission_ids)
+        pipe.expire(key, PROJECT_STATE_TTL_SECONDS)
+    pipe.execute()
+
+
+def settle_submission(project_id: str, submission_id: str) -> bool:
+    """
+    Marks a submission as done with indexing (embedded, or failed for good).
+    Returns True for exactly one caller per run — the one that settled the last submission.
+    """
+    if redis_client is None:
+        logger.error("[Redis] Client is not initialized. Categorization barrier is disabled.")
+        return False
+    return bool(redis_client.eval(_SETTLE_SCRIPT, 1, _awaiting_key(project_id), submission_id))
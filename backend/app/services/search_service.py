@@ -0,0 +1,283 @@
+"""
+search_service.py — Semantic slide search within a project
+
+  - DENSE   : the query is embedded with the same model as the slides (all-MiniLM-L6-v2)
+              and searched against `granularity: slide` points filtered to the project
+  - SPARSE  : optionally, a BM25 keyword vector of the query is searched against
+              `slide_keywords` and both rankings are merged with reciprocal rank fusion,
+              so exact terms (API names, acronyms) the embedding glosses over still rank
+  - RESULTS : hits are grouped per team, with a text snippet and match offsets for
+              highlighting, fetched from `submission_slides`
+
+Query embeddings are memoized in-process; whole responses are cached in Redis for
+SEARCH_CACHE_TTL seconds, so repeated browsing never touches the model or Qdrant.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import zlib
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.database import admin_supabase
+from app.services.qdrant_service import (
+    qdrant_client,
+    COLLECTION_NAME,
+    KEYWORD_COLLECTION_NAME,
+    KEYWORD_VECTOR_NAME,
+    get_search_params,
+)
+from app.services.redis_service import redis_client, KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "120"))
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "60"))   # per ranking, before fusion
+SEARCH_HITS_PER_TEAM = 3
+SEARCH_SNIPPET_CHARS = 240
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+BM25_AVG_SLIDE_TOKENS = 80  # slides are short and similar in length; a constant keeps indexing stateless
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# ---------------------------------------------------------------------------
+# Query / keyword vectors
+# ---------------------------------------------------------------------------
+
+def _tokens(text: str) -> List[str]:
+    return [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+def _term_index(term: str) -> int:
+    return zlib.crc32(term.encode()) & 0x7FFFFFFF
+
+
+def keyword_vector(text: str, query: bool = False) -> Optional[Dict[str, list]]:
+    """
+    Sparse BM25 vector ({indices, values}) of a text. Documents carry the saturated term
+    frequency; queries weigh each term once. The IDF factor is applied by Qdrant.
+    """
+    counts = Counter(_tokens(text))
+    if not counts:
+        return None
+    length = sum(counts.values())
+    weights: Dict[int, float] = {}
+    for term, tf in counts.items():
+        if query:
+            value = 1.0
+        else:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / BM25_AVG_SLIDE_TOKENS)
+            value = tf * (BM25_K1 + 1) / (tf + norm)
+        idx = _term_index(term)
+        weights[idx] = weights.get(idx, 0.0) + value  # crc collisions just add up
+    return {"indices": list(weights), "values": list(weights.values())}
+
+
+def slide_keyword_text(slide: Dict[str, Any]) -> str:
+    return f"{slide.get('text_content') or ''}\n{slide.get('images_ocr_text') or ''}"
+
+
+def index_slide_keywords(project_id: str, submission_id: str, slides: List[Dict[str, Any]]):
+    """Upserts the keyword vectors of extracted slides (point id = slide_id)."""
+    from qdrant_client.http.models import PointStruct, SparseVector
+    points = []
+    for slide in slides:
+        vector = keyword_vector(slide_keyword_text(slide))
+        if vector is None:
+            continue
+        points.append(PointStruct(
+            id=str(slide["slide_id"]),
+            vector={KEYWORD_VECTOR_NAME: SparseVector(**vector)},
+            payload={
+                "project_id": project_id,
+                "submission_id": submission_id,
+                "slide_number": slide.get("slide_number"),
+            },
+        ))
+    if points:
+        qdrant_client.upsert(collection_name=KEYWORD_COLLECTION_NAME, points=points)
+
+
+@lru_cache(maxsize=2048)
+def _embed_query(query: str) -> Tuple[float, ...]:
+    # Same model instance as slide ingestion (imported lazily: embedding_service imports this module)
+    from app.services.embedding_service import get_model
+    return tuple(get_model().encode(query, show_progress_bar=False).tolist())
+
+
+def normalize_query(q: str) -> str:
+    return " ".join((q or "").lower().split())
+
+
+# ---------------------------------------------------------------------------
+# Retrieval
+# ---------------------------------------------------------------------------
+
+def _dense_hits(project_id: str, query: str, limit: int) -> list:
+    result = qdrant_client.query_points(
+        collection_name=COLLECTION_NAME,
+        query=list(_embed_query(query)),
+        using="text",
+        query_filter={
+            "must": [
+                {"key": "granularity", "match": {"value": "slide"}},
+                {"key": "project_id", "match": {"value": project_id}}
+            ]
+        },
+        search_params=get_search_params(),
+        with_payload=["submission_id", "slide_number", "team_name"],
+        limit=limit,
+    )
+    return result.points
+
+
+def _keyword_hits(project_id: str, query: str, limit: int) -> list:
+    from qdrant_client.http.models import SparseVector
+    vector = keyword_vector(query, query=True)
+    if vector is None:
+        return []
+    try:
+        result = qdrant_client.query_points(
+            collection_name=KEYWORD_COLLECTION_NAME,
+            query=SparseVector(**vector),
+            using=KEYWORD_VECTOR_NAME,
+            query_filter={"must": [{"key": "project_id", "match": {"value": project_id}}]},
+            with_payload=["submission_id", "slide_number"],
+            limit=limit,
+        )
+        return result.points
+    except Exception as e:
+        # Keyword index missing / unavailable: dense results alone are still useful
+        logger.warning(f"[Search] Keyword search failed for project {project_id}: {e}")
+        return []
+
+
+def _fuse(rankings: List[list]) -> "OrderedDict[str, Dict[str, Any]]":
+    """Reciprocal rank fusion: score = Σ 1 / (RRF_K + rank) over the rankings a point is in."""
+    fused: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, pt in enumerate(ranking):
+            entry = fused.setdefault(str(pt.id), {"score": 0.0, "payload": {}})
+            entry["score"] += 1.0 / (RRF_K + rank + 1)
+            entry["payload"].update(pt.payload or {})
+    return OrderedDict(sorted(fused.items(), key=lambda kv: kv[1]["score"], reverse=True))
+
+
+def _highlight(text: str, terms: set) -> Dict[str, Any]:
+    """
+    Best SEARCH_SNIPPET_CHARS window of `text` (the one with most query-term matches) and
+    [start, end] offsets of the matches within the snippet.
+    """
+    text = " ".join((text or "").split())
+    matches = [(m.start(), m.end()) for m in _WORD_RE.finditer(text.lower()) if m.group() in terms]
+    start = 0
+    if matches:
+        best = 0
+        for i, (m_start, _) in enumerate(matches):
+            in_window = sum(1 for s, _ in matches[i:] if s < m_start + SEARCH_SNIPPET_CHARS)
+            if in_window > best:
+                best, start = in_window, max(0, m_start - 40)
+    prefix = "…" if start else ""
+    snippet = text[start:start + SEARCH_SNIPPET_CHARS]
+    suffix = "…" if start + SEARCH_SNIPPET_CHARS < len(text) else ""
+    shift = len(prefix) - start
+    return {
+        "snippet": prefix + snippet + suffix,
+        "highlights": [[s + shift, e + shift] for s, e in matches if s >= start and e <= start + len(snippet)],
+    }
+
+
+def _cache_key(project_id: str, query: str, limit: int, hybrid: bool) -> str:
+    digest = hashlib.sha1(f"{query}|{limit}|{hybrid}".encode()).hexdigest()
+    return f"{KEY_PREFIX}:search:{project_id}:{digest}"
+
+
+def search_project_slides(project_id: str, q: str, limit: int = 10, hybrid: bool = True) -> Dict[str, Any]:
+    """
+    Teams whose slides best match `q`, best first:
+    {query, results: [{submission_id, team_name, score, hits: [{slide_number, score, snippet, highlights}]}]}
+    """
+    query = normalize_query(q)
+    key = _cache_key(project_id, query, limit, hybrid)
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(key)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            logger.warning(f"[Search] Cache read failed: {e}")
+
+    rankings = [_dense_hits(project_id, query, SEARCH_CANDIDATES)]
+    if hybrid:
+        rankings.append(_keyword_hits(project_id, query, SEARCH_CANDIDATES))
+    fused = _fuse(rankings)
+
+    # Group per team, keeping the best few slides of the top `limit` teams
+    teams: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    for slide_id, entry in fused.items():
+        sub_id = entry["payload"].get("submission_id")
+        team = teams.get(sub_id)
+        if team is None:
+            if len(teams) >= limit:
+                continue
+            team = teams[sub_id] = {
+                "submission_id": sub_id,
+                "team_name": entry["payload"].get("team_name"),
+                "score": round(entry["score"], 5),
+                "hits": [],
+            }
+        if len(team["hits"]) < SEARCH_HITS_PER_TEAM:
+            team["hits"].append({
+                "slide_id": slide_id,
+                "slide_number": entry["payload"].get("slide_number"),
+                "score": round(entry["score"], 5),
+            })
+
+    complete = True
+    slide_ids = [hit["slide_id"] for team in teams.values() for hit in team["hits"]]
+    if slide_ids:
+        try:
+            slides_res = admin_supabase.table("submission_slides") \
+                .select("slide_id, text_content, images_ocr_text") \
+                .in_("slide_id", slide_ids) \
+                .execute()
+            texts = {row["slide_id"]: slide_keyword_text(row) for row in (slides_res.data or [])}
+            terms = set(_tokens(query))
+            for team in teams.values():
+                for hit in team["hits"]:
+                    hit.update(_highlight(texts.get(hit["slide_id"], ""), terms))
+        except Exception as e:
+            # Ranked hits are still useful without snippets
+            logger.warning(f"[Search] Snippet fetch failed for project {project_id}: {e}")
+            complete = False
+
+    missing_names = [sub_id for sub_id, team in teams.items() if not team["team_name"]]
+    if missing_names:
+        # Keyword-only hits carry no team name in their payload
+        try:
+            names_res = admin_supabase.table("submissions") \
+                .select("submission_id, team_name") \
+                .in_("submission_id", missing_names) \
+                .execute()
+            for row in (names_res.data or []):
+                teams[row["submission_id"]]["team_name"] = row.get("team_name")
+        except Exception as e:
+            logger.warning(f"[Search] Team name fetch failed for project {project_id}: {e}")
+            complete = False
+
+    body = {"query": q, "results": list(teams.values())}
+    if redis_client is not None and complete:  # don't pin a degraded answer for SEARCH_CACHE_TTL
+        try:
+            redis_client.set(key, json.dumps(body), ex=SEARCH_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"[Search] Cache write failed: {e}")
+    return body
@@ -0,0 +1,374 @@
+"""
+vllm_client.py — Shared, resilient client for the Prometheus vLLM judge
+
+  - ONE pooled httpx.AsyncClient per worker process (keep-alive), living on a
+    background event loop so every Celery task reuses the same connections
+  - Jittered exponential retry on 5xx / 429 / timeouts / connection errors
+  - A circuit breaker shared by all workers through Redis: after
+    VLLM_BREAKER_THRESHOLD consecutive failed requests (each counted once, after
+    its retries are used up) the circuit opens for
+    VLLM_BREAKER_COOLDOWN seconds and callers get VLLMUnavailableError without
+    touching vLLM, so evaluation tasks can back off instead of piling on
+  - An adaptive concurrency limit shared by all workers through Redis: every
+    request holds a slot in a Redis-backed semaphore, and once per
+    VLLM_CONTROL_INTERVAL one worker re-tunes the limit (AIMD) from vLLM's
+    waiting/running request gauges on /metrics and the observed p90 latency
+
+Failures surface as VLLMError — callers must never turn them into scores.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.services.redis_service import redis_client, KEY_PREFIX
+
+logger = logging.getLogger(__name__)
+
+VLLM_TIMEOUT = float(os.getenv("VLLM_TIMEOUT", "120"))
+VLLM_MAX_CONNECTIONS = int(os.getenv("VLLM_MAX_CONNECTIONS", "64"))
+VLLM_MAX_RETRIES = int(os.getenv("VLLM_MAX_RETRIES", "4"))
+VLLM_RETRY_BASE = float(os.getenv("VLLM_RETRY_BASE", "0.5"))
+VLLM_RETRY_CAP = float(os.getenv("VLLM_RETRY_CAP", "20"))
+VLLM_BREAKER_THRESHOLD = int(os.getenv("VLLM_BREAKER_THRESHOLD", "5"))
+VLLM_BREAKER_COOLDOWN = int(os.getenv("VLLM_BREAKER_COOLDOWN", "30"))
+
+VLLM_ADAPTIVE_CONCURRENCY = os.getenv("VLLM_ADAPTIVE_CONCURRENCY", "true").lower() == "true"
+VLLM_CONCURRENCY_INITIAL = int(os.getenv("VLLM_CONCURRENCY_INITIAL", "16"))
+VLLM_CONCURRENCY_MIN = int(os.getenv("VLLM_CONCURRENCY_MIN", "2"))
+VLLM_CONCURRENCY_MAX = int(os.getenv("VLLM_CONCURRENCY_MAX", "128"))
+VLLM_TARGET_WAITING = int(os.getenv("VLLM_TARGET_WAITING", "2"))          # queued requests we tolerate
+VLLM_LATENCY_TARGET = float(os.getenv("VLLM_LATENCY_TARGET", "30"))       # p90 seconds per request
+VLLM_CONTROL_INTERVAL = float(os.getenv("VLLM_CONTROL_INTERVAL", "5"))
+VLLM_METRICS_URL = os.getenv("VLLM_METRICS_URL", "")
+
+_FAILURES_KEY = f"{KEY_PREFIX}:vllm:consecutive_failures"
+_OPEN_KEY = f"{KEY_PREFIX}:vllm:circuit_open"
+_LIMIT_KEY = f"{KEY_PREFIX}:vllm:concurrency_limit"
+_SLOTS_KEY = f"{KEY_PREFIX}:vllm:slots"
+_LATENCY_KEY = f"{KEY_PREFIX}:vllm:latencies"
+_CONTROL_LOCK_KEY = f"{KEY_PREFIX}:vllm:control_lock"
+_SLOT_TTL = VLLM_TIMEOUT + 30  # a crashed holder's slot frees itself after this
+
+
+class VLLMError(Exception):
+    """A judgement could not be obtained. `retryable` tells the task whether to try again later."""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: float = 30):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class VLLMUnavailableError(VLLMError):
+    """The circuit is open — vLLM is considered down and was not called."""
+
+
+class _MalformedResponse(Exception):
+    """A 2xx response whose body is not JSON; retried like a transport error."""
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker (Redis-backed, falls back to process-local state)
+# ---------------------------------------------------------------------------
+
+_local_state = {"failures": 0, "open_until": 0.0}
+
+
+def circuit_retry_after() -> float:
+    """Seconds until the circuit closes again, or 0 if calls are allowed."""
+    if redis_client is not None:
+        try:
+            ttl = redis_client.ttl(_OPEN_KEY)
+            return float(ttl) if ttl and ttl > 0 else 0.0
+        except Exception as e:
+            logger.warning(f"[vLLM] Breaker state unavailable: {e}")
+    return max(0.0, _local_state["open_until"] - time.monotonic())
+
+
+def _record_success():
+    if redis_client is not None:
+        try:
+            redis_client.delete(_FAILURES_KEY)
+            return
+        except Exception:
+            pass
+    _local_state["failures"] = 0
+
+
+def _record_failure():
+    failures = None
+    if redis_client is not None:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(_FAILURES_KEY)
+            pipe.expire(_FAILURES_KEY, VLLM_BREAKER_COOLDOWN * 10)
+            failures = pipe.execute()[0]
+            if failures >= VLLM_BREAKER_THRESHOLD:
+                redis_client.set(_OPEN_KEY, "1", ex=VLLM_BREAKER_COOLDOWN)
+        except Exception:
+            failures = None
+    if failures is None:
+        _local_state["failures"] += 1
+        failures = _local_state["failures"]
+        if failures >= VLLM_BREAKER_THRESHOLD:
+            _local_state["open_until"] = time.monotonic() + VLLM_BREAKER_COOLDOWN
+
+    if failures == VLLM_BREAKER_THRESHOLD:
+        logger.error(f"[vLLM] {failures} consecutive failures — circuit open for {VLLM_BREAKER_COOLDOWN}s.")
+
+
+# ---------------------------------------------------------------------------
+# Adaptive concurrency (Redis semaphore + AIMD controller)
+# ---------------------------------------------------------------------------
+
+# Slots are a sorted set of holder tokens scored by expiry time
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[4])
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_local_semaphore: Optional[asyncio.Semaphore] = None
+_controller_started = False
+
+
+def _try_acquire_slot(token: str) -> bool:
+    try:
+        return bool(redis_client.eval(
+            _ACQUIRE_SCRIPT, 2, _SLOTS_KEY, _LIMIT_KEY,
+            time.time(), token, _SLOT_TTL, VLLM_CONCURRENCY_INITIAL
+        ))
+    except Exception as e:
+        # Fail open — losing coordination is better than stalling every evaluation
+        logger.warning(f"[vLLM] Concurrency slot unavailable, proceeding without: {e}")
+        return True
+
+
+def _release_slot(token: str):
+    try:
+        redis_client.zrem(_SLOTS_KEY, token)
+    except Exception:
+        pass  # expires on its own
+
+
+@asynccontextmanager
+async def concurrency_slot():
+    """Holds one of the cluster-wide vLLM request slots for the duration of a request."""
+    global _local_semaphore
+    if not VLLM_ADAPTIVE_CONCURRENCY or redis_client is None:
+        if _local_semaphore is None:
+            _local_semaphore = asyncio.Semaphore(VLLM_CONCURRENCY_INITIAL)
+        async with _local_semaphore:
+            yield
+        return
+
+    token = uuid.uuid4().hex
+    while not await asyncio.to_thread(_try_acquire_slot, token):
+        await asyncio.sleep(random.uniform(0.05, 0.25))
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(_release_slot, token)
+
+
+def next_concurrency_limit(limit: int, waiting: Optional[float], running: Optional[float], p90_latency: Optional[float]) -> int:
+    """
+    AIMD step. Back off multiplicatively when vLLM is queueing requests or latency is over
+    target; otherwise probe upwards by one while we're actually using the current limit.
+    """
+    overloaded = (waiting is not None and waiting > VLLM_TARGET_WAITING) or \
+                 (p90_latency is not None and p90_latency > VLLM_LATENCY_TARGET)
+    if overloaded:
+        limit = int(limit * 0.75)
+    elif running is None or running >= 0.8 * limit:
+        limit += 1
+    return max(VLLM_CONCURRENCY_MIN, min(VLLM_CONCURRENCY_MAX, limit))
+
+
+def _parse_queue_gauges(metrics_text: str) -> Tuple[Optional[float], Optional[float]]:
+    """Sums vllm:num_requests_waiting / vllm:num_requests_running across label sets."""
+    waiting = running = None
+    for line in metrics_text.splitlines():
+        if line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        metric = name.split("{", 1)[0].strip()
+        try:
+            if metric == "vllm:num_requests_waiting":
+                waiting = (waiting or 0.0) + float(value)
+            elif metric == "vllm:num_requests_running":
+                running = (running or 0.0) + float(value)
+        except ValueError:
+            continue
+    return waiting, running
+
+
+def _record_latency(seconds: float):
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        pipe.lpush(_LATENCY_KEY, round(seconds, 3))
+        pipe.ltrim(_LATENCY_KEY, 0, 199)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def _p90_latency() -> Optional[float]:
+    samples = sorted(float(x) for x in (redis_client.lrange(_LATENCY_KEY, 0, -1) or []))
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+
+async def _control_step(metrics_url: str):
+    # One worker per interval adjusts the shared limit
+    if not await asyncio.to_thread(redis_client.set, _CONTROL_LOCK_KEY, "1", nx=True, ex=max(1, int(VLLM_CONTROL_INTERVAL))):
+        return
+
+    waiting = running = None
+    try:
+        response = await get_client().get(metrics_url, timeout=5.0)
+        if response.status_code == 200:
+            waiting, running = _parse_queue_gauges(response.text)
+    except httpx.HTTPError as e:
+        logger.debug(f"[vLLM] Could not scrape {metrics_url}: {e}")
+
+    p90 = await asyncio.to_thread(_p90_latency)
+    current = int(await asyncio.to_thread(redis_client.get, _LIMIT_KEY) or VLLM_CONCURRENCY_INITIAL)
+    new_limit = next_concurrency_limit(current, waiting, running, p90)
+    if new_limit != current:
+        await asyncio.to_thread(redis_client.set, _LIMIT_KEY, new_limit)
+        logger.info(f"[vLLM] Concurrency limit {current} → {new_limit} (waiting={waiting}, running={running}, p90={p90})")
+
+
+async def _control_loop(metrics_url: str):
+    while True:
+        await asyncio.sleep(VLLM_CONTROL_INTERVAL)
+        try:
+            await _control_step(metrics_url)
+        except Exception as e:
+            logger.warning(f"[vLLM] Concurrency controller step failed: {e}")
+
+
+def _ensure_controller(url: str):
+    """Starts the controller on the running loop the first time this process talks to vLLM."""
+    global _controller_started
+    if _controller_started or not VLLM_ADAPTIVE_CONCURRENCY or redis_client is None:
+        return
+    _controller_started = True
+    metrics_url = VLLM_METRICS_URL or url.split("/v1", 1)[0] + "/metrics"
+    asyncio.get_running_loop().create_task(_control_loop(metrics_url))
+
+
+# ---------------------------------------------------------------------------
+# Shared event loop + pooled client
+# ---------------------------------------------------------------------------
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Lazily starts this process's background event loop (after any Celery fork)."""
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="vllm-client-loop", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_async(coro):
+    """Runs a coroutine on the shared loop and blocks until it finishes (for sync Celery tasks)."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
+
+
+def get_client() -> httpx.AsyncClient:
+    """The pooled client. Only use it from coroutines running on the shared loop (see run_async)."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=VLLM_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=VLLM_MAX_CONNECTIONS,
+                max_keepalive_connections=VLLM_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _client
+
+
+def _is_retryable_status(status: int) -> bool:
+    return status >= 500 or status == 429
+
+
+async def chat_completion(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    POSTs a chat-completions payload with retries and the circuit breaker.
+    Returns the decoded response body or raises VLLMError.
+    """
+    retry_after = await asyncio.to_thread(circuit_retry_after)
+    if retry_after > 0:
+        raise VLLMUnavailableError("vLLM circuit is open", retry_after=retry_after)
+
+    client = get_client()
+    _ensure_controller(url)
+    last_error = None
+    for attempt in range(VLLM_MAX_RETRIES + 1):
+        if attempt:
+            # Another worker may have opened the circuit while we were backing off
+            retry_after = await asyncio.to_thread(circuit_retry_after)
+            if retry_after > 0:
+                raise VLLMUnavailableError(f"vLLM circuit opened after: {last_error}", retry_after=retry_after)
+        try:
+            async with concurrency_slot():
+                started = time.monotonic()
+                response = await client.post(url, json=payload)
+            if response.status_code < 400:
+                try:
+                    body = response.json()
+                except ValueError as e:
+                    raise _MalformedResponse(f"invalid JSON body: {e}")
+                await asyncio.to_thread(_record_success)
+                await asyncio.to_thread(_record_latency, time.monotonic() - started)
+                return body
+            if not _is_retryable_status(response.status_code):
+                # Our request is wrong — retrying won't help and vLLM itself is fine
+                raise VLLMError(f"vLLM rejected request ({response.status_code}): {response.text[:300]}", retryable=False)
+            last_error = f"HTTP {response.status_code}"
+        except (httpx.TimeoutException, httpx.TransportError, _MalformedResponse) as e:
+            last_error = f"{type(e).__name__}: {e}"
+
+        if attempt < VLLM_MAX_RETRIES:
+            # Full jitter: uniform(0, min(cap, base * 2^attempt))
+            delay = random.uniform(0, min(VLLM_RETRY_CAP, VLLM_RETRY_BASE * (2 ** attempt)))
+            logger.warning(f"[vLLM] Attempt {attempt + 1} failed ({last_error}); retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    # One breaker failure per request, once its retries are used up — a single slow request
+    # must not trip the circuit for every worker
+    await asyncio.to_thread(_record_failure)
+    retry_after = await asyncio.to_thread(circuit_retry_after)
+    if retry_after > 0:
+        raise VLLMUnavailableError(f"vLLM circuit opened after: {last_error}", retry_after=retry_after)
+    raise VLLMError(f"vLLM request failed after {VLLM_MAX_RETRIES + 1} attempts: {last_error}")
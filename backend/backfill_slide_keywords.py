@@ -0,0 +1,50 @@
+"""
+Backfills the `slide_keywords` sparse vectors used by hybrid slide search for slides that
+were embedded before keyword indexing existed. Safe to re-run (points are upserted by slide_id).
+
+Usage:
+    python backfill_slide_keywords.py                 # every project
+    python backfill_slide_keywords.py --project <id>
+"""
+import argparse
+from collections import defaultdict
+
+from app.database import admin_supabase
+from app.services.qdrant_service import init_keyword_collection
+from app.services.search_service import index_slide_keywords
+
+PAGE_SIZE = 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project", default="", help="only this project_id")
+    args = parser.parse_args()
+
+    init_keyword_collection()
+    offset, total = 0, 0
+    while True:
+        query = admin_supabase.table("submission_slides") \
+            .select("slide_id, project_id, submission_id, slide_number, text_content, images_ocr_text") \
+            .eq("qdrant_indexed", True)
+        if args.project:
+            query = query.eq("project_id", args.project)
+        rows = query.order("slide_id").range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        if not rows:
+            break
+
+        by_submission = defaultdict(list)
+        for row in rows:
+            by_submission[(row["project_id"], row["submission_id"])].append(row)
+        for (project_id, submission_id), slides in by_submission.items():
+            index_slide_keywords(project_id, submission_id, slides)
+
+        total += len(rows)
+        offset += PAGE_SIZE
+        print(f"indexed {total:,} slides")
+
+    print(f"done — {total:,} slides")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Adaptive concurrency check against the queueing mock judge.
+
+Starts mock_vllm.py in-process (MOCK_MAX_RUNNING slots), floods it through
+vllm_client.chat_completion, and prints the shared Redis concurrency limit next to
+the mock's waiting/running gauges so the AIMD controller can be watched converging.
+Needs a reachable Redis (REDIS_URL).
+
+Usage:
+    python bench_adaptive_concurrency.py --requests 2000 --workers 64
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+MOCK_PORT = int(os.getenv("MOCK_VLLM_PORT", "8012"))
+os.environ.setdefault("VLLM_CONTROL_INTERVAL", "1")
+
+import uvicorn
+
+from app.services import vllm_client
+from app.services.redis_service import redis_client
+
+URL = f"http://127.0.0.1:{MOCK_PORT}/v1/chat/completions"
+
+
+async def _worker(queue: asyncio.Queue, latencies: list):
+    while True:
+        try:
+            n = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        payload = {"model": "mock", "messages": [{"role": "user", "content": f"request {n} " * 200}], "max_tokens": 64}
+        t0 = time.perf_counter()
+        await vllm_client.chat_completion(URL, payload)
+        latencies.append(time.perf_counter() - t0)
+
+
+async def _monitor(stop: asyncio.Event):
+    metrics_url = f"http://127.0.0.1:{MOCK_PORT}/metrics"
+    while not stop.is_set():
+        text = (await vllm_client.get_client().get(metrics_url)).text
+        waiting, running = vllm_client._parse_queue_gauges(text)
+        limit = redis_client.get(vllm_client._LIMIT_KEY) or vllm_client.VLLM_CONCURRENCY_INITIAL
+        print(f"limit={limit:>4} running={running:>4.0f} waiting={waiting:>4.0f}")
+        await asyncio.sleep(1)
+
+
+async def run(args):
+    redis_client.delete(vllm_client._LIMIT_KEY, vllm_client._SLOTS_KEY, vllm_client._LATENCY_KEY)
+    queue = asyncio.Queue()
+    for n in range(args.requests):
+        queue.put_nowait(n)
+
+    latencies, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(_monitor(stop))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker(queue, latencies) for _ in range(args.workers)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await monitor
+
+    latencies.sort()
+    print(
+        f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f}/s), "
+        f"p50={latencies[len(latencies) // 2]:.3f}s p95={latencies[int(len(latencies) * 0.95)]:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=64)
+    args = parser.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config("mock_vllm:app", host="127.0.0.1", port=MOCK_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    asyncio.run(run(args))
+    server.should_exit = True
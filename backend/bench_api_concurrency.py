@@ -0,0 +1,121 @@
+"""
+Concurrent dashboard-load benchmark for async routes.
+
+Default mode runs in-process: two copies of a route that makes a blocking "PostgREST"
+call (time.sleep(--db-ms)), one calling it directly from `async def` (what the routes used
+to do) and one through app.database.run_db. A cheap /health route is hit at the same time
+to show how much the event loop is stalled for everyone else.
+
+    python bench_api_concurrency.py --requests 400 --concurrency 50 --db-ms 80
+
+With --target and --token it instead fires the same parallel load at a running backend:
+
+    python bench_api_concurrency.py --target http://localhost:8001 --token $JWT --path /projects
+"""
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")  # in-process mode never talks to it
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.database import run_db, DB_MAX_CONCURRENCY
+
+BENCH_PORT = int(os.getenv("BENCH_API_PORT", "8014"))
+
+
+def _make_app(db_seconds: float) -> FastAPI:
+    app = FastAPI()
+
+    def slow_query():
+        time.sleep(db_seconds)
+        return {"data": []}
+
+    @app.get("/blocking")
+    async def blocking():
+        return slow_query()
+
+    @app.get("/offloaded")
+    async def offloaded():
+        return await run_db(slow_query)
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    return app
+
+
+def _pct(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def _load(base: str, path: str, requests: int, concurrency: int, headers: dict, probe: bool = True):
+    latencies, probe_latencies = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency + 10)
+
+    async with httpx.AsyncClient(base_url=base, headers=headers, limits=limits, timeout=120) as client:
+        async def one():
+            async with semaphore:
+                t0 = time.perf_counter()
+                (await client.get(path)).raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        async def probe_loop(stop: asyncio.Event):
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                await client.get("/health" if probe else "/")
+                probe_latencies.append(time.perf_counter() - t0)
+                await asyncio.sleep(0.02)
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe_loop(stop))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await prober
+
+    print(
+        f"{path:<12} {requests / elapsed:7.1f} req/s  "
+        f"p50={_pct(latencies, 0.5) * 1000:7.1f}ms  p99={_pct(latencies, 0.99) * 1000:7.1f}ms  "
+        f"| other requests meanwhile p99={_pct(probe_latencies, 0.99) * 1000:7.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-ms", type=float, default=80, help="simulated PostgREST latency (in-process mode)")
+    parser.add_argument("--target", default="", help="running backend base URL")
+    parser.add_argument("--token", default="", help="bearer token for --target")
+    parser.add_argument("--path", default="/projects", help="route to load with --target")
+    args = parser.parse_args()
+
+    if args.target:
+        headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+        asyncio.run(_load(args.target, args.path, args.requests, args.concurrency, headers, probe=False))
+        return
+
+    server = uvicorn.Server(uvicorn.Config(_make_app(args.db_ms / 1000), host="127.0.0.1", port=BENCH_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.db_ms:.0f}ms per query, DB_MAX_CONCURRENCY={DB_MAX_CONCURRENCY}")
+    base = f"http://127.0.0.1:{BENCH_PORT}"
+    for path in ("/blocking", "/offloaded"):
+        asyncio.run(_load(base, path, args.requests, args.concurrency, {}))
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Prefix-cache benchmark for the Prometheus grading prompt layout.
+
+Starts mock_vllm.py in-process, grades synthetic submissions with several criteria each,
+and reports how many prompt tokens the (simulated) vLLM had to prefill versus reuse
+from its prefix cache.
+
+Usage:
+    python bench_prefix_cache.py --submissions 20 --criteria 5
+"""
+import argparse
+import asyncio
+import os
+import random
+import threading
+import time
+
+MOCK_PORT = int(os.getenv("MOCK_VLLM_PORT", "8011"))
+os.environ.setdefault("PROMETHEUS_URL", f"http://127.0.0.1:{MOCK_PORT}/v1")
+
+import httpx
+import uvicorn
+
+from app.services.evaluation_service import (
+    PROMETHEUS_URL,
+    build_prometheus_prefix,
+    build_prometheus_suffix,
+    evaluate_with_prometheus_async,
+)
+
+CRITERIA = ["Innovation", "Technical Feasibility", "Impact", "Presentation", "Completeness", "Scalability", "Design"]
+WORDS = "data model users platform scalable api latency cloud privacy dashboard pipeline team market revenue".split()
+
+
+def _synthetic_deck(rng: random.Random, slides: int) -> str:
+    return "".join(
+        f"\nSlide {n}:\n" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + "\n"
+        for n in range(1, slides + 1)
+    )
+
+
+def _criterion_first_prompt(instruction: str, response: str, criterion: str) -> str:
+    """Counter-example: criterion text ahead of the deck, so no two prompts share a prefix."""
+    return build_prometheus_suffix(criterion) + "\n" + build_prometheus_prefix(instruction, response)
+
+
+async def _grade_submission(prompts, mode: str):
+    if mode == "sequential":
+        for p in prompts:
+            await evaluate_with_prometheus_async(p, force_refresh=True)
+        return
+    remaining = list(prompts)
+    if mode == "warmup":
+        await evaluate_with_prometheus_async(remaining.pop(0), force_refresh=True)
+    await asyncio.gather(*(evaluate_with_prometheus_async(p, force_refresh=True) for p in remaining))
+
+
+async def run(args):
+    rng = random.Random(7)
+    decks = [_synthetic_deck(rng, args.slides) for _ in range(args.submissions)]
+    instruction = "Evaluate the following hackathon submission."
+    criteria = CRITERIA[:args.criteria]
+
+    scenarios = [
+        ("criterion-first, concurrent", "concurrent", _criterion_first_prompt),
+        ("shared prefix, concurrent", "concurrent", None),
+        ("shared prefix, sequential", "sequential", None),
+        ("shared prefix, warmup + concurrent", "warmup", None),
+    ]
+    base = PROMETHEUS_URL.rsplit("/v1", 1)[0]
+
+    async with httpx.AsyncClient() as client:
+        for label, mode, builder in scenarios:
+            await client.post(f"{base}/stats/reset")
+            t0 = time.perf_counter()
+            for deck in decks:
+                if builder:
+                    prompts = [builder(instruction, deck, c) for c in criteria]
+                else:
+                    prefix = build_prometheus_prefix(instruction, deck)
+                    prompts = [prefix + build_prometheus_suffix(c) for c in criteria]
+                await _grade_submission(prompts, mode)
+            elapsed = time.perf_counter() - t0
+            stats = (await client.get(f"{base}/stats")).json()
+            print(
+                f"{label:<38} prompt={stats['prompt_tokens']:>9,} cached={stats['cached_tokens']:>9,} "
+                f"re-processed={stats['reprocessed_tokens']:>9,} "
+                f"({stats['reprocessed_tokens'] / max(1, stats['prompt_tokens']):.0%}) wall={elapsed:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=20)
+    parser.add_argument("--criteria", type=int, default=5)
+    parser.add_argument("--slides", type=int, default=15)
+    args = parser.parse_args()
+
+    server = uvicorn.Server(uvicorn.Config("mock_vllm:app", host="127.0.0.1", port=MOCK_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    asyncio.run(run(args))
+    server.should_exit = True
@@ -0,0 +1,134 @@
+"""
+Recall / latency benchmark for the slide_intelligence quantization settings.
+
+Builds a synthetic slide dataset (clustered 384-d vectors, default 1M points) in a
+throwaway collection on the local Qdrant at QDRANT_URL, then compares quantized +
+rescored HNSW search against exact search.
+
+Usage:
+    python bench_qdrant_quantization.py --points 1000000 --quantization scalar
+    python bench_qdrant_quantization.py --points 200000 --quantization binary --oversampling 3
+"""
+import argparse
+import time
+
+import numpy as np
+from qdrant_client.http.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+)
+
+from app.services.qdrant_service import (
+    qdrant_client,
+    VECTOR_SIZE,
+    get_hnsw_config,
+    get_quantization_config,
+)
+
+BENCH_COLLECTION = "slide_intelligence_bench"
+
+
+def _synthetic_batches(n_points: int, batch_size: int, n_topics: int, seed: int):
+    """Slides cluster around a few hundred 'topics', like decks answering the same problem statement."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(n_topics, VECTOR_SIZE)).astype(np.float32)
+    for start in range(0, n_points, batch_size):
+        size = min(batch_size, n_points - start)
+        centers = topics[rng.integers(0, n_topics, size)]
+        vecs = centers + 0.6 * rng.normal(size=(size, VECTOR_SIZE)).astype(np.float32)
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        yield start, vecs
+
+
+def build_collection(args):
+    if qdrant_client.collection_exists(BENCH_COLLECTION):
+        qdrant_client.delete_collection(BENCH_COLLECTION)
+
+    qdrant_client.create_collection(
+        collection_name=BENCH_COLLECTION,
+        vectors_config={"text": VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=True)},
+        hnsw_config=get_hnsw_config(args.m, args.ef_construct),
+        quantization_config=get_quantization_config(args.quantization),
+    )
+
+    t0 = time.perf_counter()
+    for start, vecs in _synthetic_batches(args.points, args.batch_size, args.topics, args.seed):
+        qdrant_client.upsert(
+            collection_name=BENCH_COLLECTION,
+            points=[
+                PointStruct(id=start + i, vector={"text": v.tolist()}, payload={"granularity": "slide"})
+                for i, v in enumerate(vecs)
+            ],
+            wait=False,
+        )
+        if (start // args.batch_size) % 50 == 0:
+            print(f"  uploaded {start + len(vecs):,}/{args.points:,}")
+
+    # Wait for indexing to settle before measuring
+    while qdrant_client.get_collection(BENCH_COLLECTION).status != "green":
+        time.sleep(2)
+    print(f"Built {args.points:,} points in {time.perf_counter() - t0:.1f}s")
+
+
+def run_queries(args):
+    rng = np.random.default_rng(args.seed + 1)
+    queries = rng.normal(size=(args.queries, VECTOR_SIZE)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    approx_params = SearchParams(
+        hnsw_ef=args.hnsw_ef,
+        quantization=QuantizationSearchParams(ignore=False, rescore=args.rescore, oversampling=args.oversampling),
+    )
+    exact_params = SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+
+    recalls, latencies = [], []
+    for q in queries:
+        truth = qdrant_client.query_points(
+            collection_name=BENCH_COLLECTION, query=q.tolist(), using="text",
+            limit=args.k, search_params=exact_params, with_payload=False,
+        ).points
+
+        t0 = time.perf_counter()
+        approx = qdrant_client.query_points(
+            collection_name=BENCH_COLLECTION, query=q.tolist(), using="text",
+            limit=args.k, search_params=approx_params, with_payload=False,
+        ).points
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        truth_ids = {p.id for p in truth}
+        recalls.append(len(truth_ids & {p.id for p in approx}) / max(1, len(truth_ids)))
+
+    lat = np.array(latencies)
+    print(
+        f"quantization={args.quantization} rescore={args.rescore} oversampling={args.oversampling} "
+        f"m={args.m} ef_construct={args.ef_construct} hnsw_ef={args.hnsw_ef}"
+    )
+    print(f"  recall@{args.k}: {np.mean(recalls):.4f}")
+    print(f"  latency ms: p50={np.percentile(lat, 50):.2f} p95={np.percentile(lat, 95):.2f} p99={np.percentile(lat, 99):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--quantization", choices=["scalar", "binary", "none"], default="scalar")
+    parser.add_argument("--rescore", type=lambda v: v.lower() == "true", default=True)
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construct", type=int, default=128)
+    parser.add_argument("--hnsw-ef", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-build", action="store_true", help="Reuse the existing bench collection")
+    args = parser.parse_args()
+
+    if qdrant_client is None:
+        raise SystemExit("Qdrant client is not initialized — check QDRANT_URL.")
+    if not args.skip_build:
+        build_collection(args)
+    run_queries(args)
@@ -0,0 +1,180 @@
+"""
+Offline evaluation load test.
+
+Pushes N synthetic submissions through the evaluation judging path (context packing,
+prompt layout, LLM client with retries / circuit breaker / adaptive concurrency) against
+mock_vllm.py — started in-process unless --target points at an already running judge —
+and reports calls/sec, judge latency percentiles and end-to-end project time.
+
+The real task code paths run unchanged — evaluation_service's Supabase reads and writes are
+swapped for in-memory stand-ins, everything between the slide rows and the judgement is real.
+
+  --mode task   W simulated Celery workers, each grading one submission at a time through
+                _evaluate_criteria_concurrently (EVAL_CONCURRENCY criteria in flight,
+                prefix warm-up per EVAL_PREFIX_WARMUP), as evaluate_submission_task does
+  --mode batch  one _run_batch stream of every prompt with EVAL_BATCH_WINDOW in flight,
+                as evaluate_project_batch_task does
+
+Usage:
+    python loadtest_evaluation.py --submissions 200 --criteria 5 --workers 8
+    python loadtest_evaluation.py --mode batch --mock-config '{"latency_dist": "lognormal", "error_rate": 0.02}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+MOCK_PORT = int(os.getenv("MOCK_VLLM_PORT", "8013"))
+os.environ.setdefault("PROMETHEUS_URL", f"http://127.0.0.1:{MOCK_PORT}/v1")
+
+import httpx
+import uvicorn
+
+from app.services import evaluation_service
+from app.services.evaluation_service import (
+    PROMETHEUS_URL,
+    _build_criterion_responses,
+    _build_instruction,
+    _evaluate_criteria_concurrently,
+    _run_batch,
+)
+from app.services.vllm_client import VLLMError
+
+CRITERIA = ["Innovation", "Technical Feasibility", "Impact", "Presentation", "Completeness", "Scalability", "Design"]
+WORDS = "data model users platform scalable api latency cloud privacy dashboard pipeline team market revenue".split()
+
+
+def _synthetic_slides(rng: random.Random, submission_id: str, count: int) -> list:
+    return [
+        {
+            "submission_id": submission_id,
+            "slide_number": n,
+            "text_content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))),
+            "images_ocr_text": "",
+            "complexity_score": rng.random(),
+        }
+        for n in range(1, count + 1)
+    ]
+
+
+def _criteria(count: int) -> list:
+    return [
+        {"criterion_id": f"crit-{i}", "criterion_name": name, "description": None, "weight": 1}
+        for i, name in enumerate(CRITERIA[:count])
+    ]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies, self.failures, self.submission_times = [], 0, []
+
+    def install(self, decks: dict):
+        """Points evaluation_service at the synthetic decks and times every judge call."""
+        judge = evaluation_service.evaluate_with_prometheus_async
+
+        async def _timed_judge(prompt: str, force_refresh: bool = False):
+            t0 = time.perf_counter()
+            try:
+                result = await judge(prompt, force_refresh=force_refresh)
+            except VLLMError:
+                self.failures += 1
+                raise
+            self.latencies.append(time.perf_counter() - t0)
+            return result
+
+        evaluation_service.evaluate_with_prometheus_async = _timed_judge
+        evaluation_service._fetch_slides_by_submission = lambda ids: {i: decks[i] for i in ids}
+        evaluation_service._save_criterion_result = lambda *args, **kwargs: None
+        evaluation_service._write_score_rows = lambda rows: None
+        evaluation_service._finish_batch_submissions = lambda project_id, ids: None
+
+
+async def _run_task_mode(decks: dict, criteria: list, workers: int, rec: Recorder):
+    queue = asyncio.Queue()
+    for sub_id in decks:
+        queue.put_nowait(sub_id)
+    instruction = _build_instruction()
+
+    async def _worker():
+        while not queue.empty():
+            sub_id = queue.get_nowait()
+            t0 = time.perf_counter()
+            responses = _build_criterion_responses(sub_id, decks[sub_id], criteria)
+            try:
+                await _evaluate_criteria_concurrently(sub_id, criteria, instruction, responses, force_refresh=True)
+            except VLLMError:
+                pass  # the real task would retry later; counted as failures
+            rec.submission_times.append(time.perf_counter() - t0)
+
+    await asyncio.gather(*(_worker() for _ in range(workers)))
+
+
+async def _run_batch_mode(decks: dict, criteria: list, rec: Recorder):
+    submissions = [{"submission_id": sub_id} for sub_id in decks]
+    try:
+        await _run_batch("loadtest", submissions, criteria, {}, {}, force_refresh=True)
+    except VLLMError:
+        pass  # the real task stops feeding the judge and retries later; counted as failures
+
+
+def _pct(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+async def run(args):
+    rng = random.Random(11)
+    decks = {f"sub-{n}": _synthetic_slides(rng, f"sub-{n}", args.slides) for n in range(args.submissions)}
+    criteria = _criteria(args.criteria)
+    base = PROMETHEUS_URL.rsplit("/v1", 1)[0]
+
+    async with httpx.AsyncClient() as client:
+        await client.post(f"{base}/stats/reset")
+        if args.mock_config:
+            await client.post(f"{base}/config", json=json.loads(args.mock_config))
+
+        rec = Recorder()
+        rec.install(decks)
+        t0 = time.perf_counter()
+        if args.mode == "batch":
+            await _run_batch_mode(decks, criteria, rec)
+        else:
+            await _run_task_mode(decks, criteria, args.workers, rec)
+        elapsed = time.perf_counter() - t0
+        stats = (await client.get(f"{base}/stats")).json()
+
+    calls = len(rec.latencies)
+    print(f"mode={args.mode} submissions={args.submissions} criteria={len(criteria)} workers={args.workers}")
+    print(f"  judgements   {calls:,} ok, {rec.failures:,} failed")
+    print(f"  throughput   {calls / elapsed:.1f} calls/s")
+    print(f"  latency      p50={_pct(rec.latencies, 0.5):.3f}s p95={_pct(rec.latencies, 0.95):.3f}s max={max(rec.latencies, default=0):.3f}s")
+    if rec.submission_times:
+        print(f"  submission   p50={_pct(rec.submission_times, 0.5):.2f}s p95={_pct(rec.submission_times, 0.95):.2f}s")
+    print(f"  project      {elapsed:.2f}s end-to-end")
+    print(f"  judge        {stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--submissions", type=int, default=100)
+    parser.add_argument("--criteria", type=int, default=5)
+    parser.add_argument("--slides", type=int, default=15)
+    parser.add_argument("--workers", type=int, default=4, help="simulated Celery worker concurrency (task mode)")
+    parser.add_argument("--mode", choices=["task", "batch"], default="task")
+    parser.add_argument("--mock-config", default="", help="JSON overrides posted to the mock's /config")
+    parser.add_argument("--target", action="store_true", help="use the judge at PROMETHEUS_URL instead of starting the mock")
+    args = parser.parse_args()
+
+    server = None
+    if not args.target:
+        server = uvicorn.Server(uvicorn.Config("mock_vllm:app", host="127.0.0.1", port=MOCK_PORT, log_level="warning"))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+
+    asyncio.run(run(args))
+    if server:
+        server.should_exit = True
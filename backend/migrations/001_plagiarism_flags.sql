@@ -0,0 +1,19 @@
+-- Flagged near-duplicate slide pairs between two submissions of the same project.
+-- Written by app.services.plagiarism_service.detect_plagiarism_task.
+create table if not exists public.plagiarism_flags (
+    flag_id uuid primary key default gen_random_uuid(),
+    project_id uuid not null references public.projects(project_id) on delete cascade,
+    submission_id_a uuid not null references public.submissions(submission_id) on delete cascade,
+    slide_id_a uuid not null,
+    slide_number_a integer,
+    submission_id_b uuid not null references public.submissions(submission_id) on delete cascade,
+    slide_id_b uuid not null,
+    slide_number_b integer,
+    text_similarity numeric(5, 4) not null,
+    vector_similarity numeric(5, 4) not null,
+    detected_at timestamptz not null default now()
+);
+
+create index if not exists plagiarism_flags_project_idx on public.plagiarism_flags (project_id);
+create index if not exists plagiarism_flags_submission_a_idx on public.plagiarism_flags (submission_id_a);
+create index if not exists plagiarism_flags_submission_b_idx on public.plagiarism_flags (submission_id_b);
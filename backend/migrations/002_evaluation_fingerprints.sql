@@ -0,0 +1,17 @@
+-- One score per (submission, criterion), tagged with the fingerprint of everything the
+-- judgement depended on. Written by app.services.evaluation_service (upserts on the
+-- unique key); rows whose fingerprint still matches are skipped on re-evaluation.
+alter table public.evaluation_scores add column if not exists fingerprint text;
+alter table public.evaluation_scores add column if not exists updated_at timestamptz not null default now();
+
+-- Retried tasks used to insert duplicates — keep the newest row of each pair
+delete from public.evaluation_scores a
+using public.evaluation_scores b
+where a.submission_id = b.submission_id
+  and a.criterion_id = b.criterion_id
+  and a.ctid < b.ctid;
+
+alter table public.evaluation_scores
+    drop constraint if exists evaluation_scores_submission_criterion_key;
+alter table public.evaluation_scores
+    add constraint evaluation_scores_submission_criterion_key unique (submission_id, criterion_id);
@@ -0,0 +1,85 @@
+-- One page of a project's submissions with everything the project dashboard shows,
+-- computed in a single grouped query instead of one slide count request per submission.
+-- Called by GET /projects/{id}/details via admin_supabase.rpc(...).
+create or replace function public.project_submission_summaries(
+    p_project_id uuid,
+    p_limit integer default 500,
+    p_offset integer default 0
+)
+returns table (
+    submission_id uuid,
+    team_name text,
+    drive_file_name text,
+    drive_file_url text,
+    file_size_bytes bigint,
+    processing_status text,
+    detected_problem_statement_id uuid,
+    created_at timestamptz,
+    updated_at timestamptz,
+    slide_count integer,
+    latest_job_type text,
+    latest_job_status text,
+    aggregate_score numeric,
+    scored_criteria integer,
+    total_count bigint
+)
+language sql
+stable
+as $$
+    with page as (
+        select s.*, count(*) over () as total_count
+        from public.submissions s
+        where s.project_id = p_project_id
+        order by s.created_at desc, s.submission_id
+        limit p_limit offset p_offset
+    ),
+    slide_counts as (
+        select sl.submission_id, count(*)::integer as slide_count
+        from public.submission_slides sl
+        where sl.submission_id in (select page.submission_id from page)
+        group by sl.submission_id
+    ),
+    latest_jobs as (
+        -- The furthest pipeline stage reached: extraction → embedding → evaluation
+        select distinct on (j.submission_id) j.submission_id, j.job_type, j.status
+        from public.processing_jobs j
+        where j.submission_id in (select page.submission_id from page)
+        order by j.submission_id,
+                 case j.job_type when 'evaluation' then 3 when 'embedding' then 2 else 1 end desc
+    ),
+    scores as (
+        -- Weighted mean on the 1-5 rubric scale
+        select e.submission_id,
+               round(sum(e.score * coalesce(c.weight, 1)) / nullif(sum(coalesce(c.weight, 1)), 0), 2) as aggregate_score,
+               count(*)::integer as scored_criteria
+        from public.evaluation_scores e
+        join public.scoring_criteria c on c.criterion_id = e.criterion_id
+        where e.submission_id in (select page.submission_id from page)
+        group by e.submission_id
+    )
+    select page.submission_id,
+           page.team_name::text,
+           page.drive_file_name::text,
+           page.drive_file_url::text,
+           page.file_size_bytes::bigint,
+           page.processing_status::text,
+           page.detected_problem_statement_id,
+           page.created_at,
+           page.updated_at,
+           coalesce(slide_counts.slide_count, 0),
+           latest_jobs.job_type::text,
+           latest_jobs.status::text,
+           scores.aggregate_score,
+           coalesce(scores.scored_criteria, 0),
+           page.total_count
+    from page
+    left join slide_counts on slide_counts.submission_id = page.submission_id
+    left join latest_jobs on latest_jobs.submission_id = page.submission_id
+    left join scores on scores.submission_id = page.submission_id
+    order by page.created_at desc, page.submission_id;
+$$;
+
+create index if not exists submissions_project_created_idx on public.submissions (project_id, created_at desc);
+create index if not exists submission_slides_submission_idx on public.submission_slides (submission_id);
+create index if not exists processing_jobs_submission_idx on public.processing_jobs (submission_id);
+create index if not exists evaluation_scores_submission_idx on public.evaluation_scores (submission_id);
@@ -0,0 +1,216 @@
+-- Materialized weighted leaderboard.
+--
+-- leaderboard_entries holds one row per scored submission with its weighted total and
+-- per-criterion points, kept current by statement-level triggers: a score upsert only
+-- recomputes the submissions it touched, a rubric change recomputes its project.
+-- Every change bumps projects.leaderboard_version, which GET /projects/{id}/leaderboard
+-- uses as its ETag / cache key.
+--
+-- Points: a 1-5 rubric score is worth (score / 5) * weight% of LEADERBOARD_MAX_SCORE (10),
+-- so with weights summing to 100 the total is out of 10.
+
+alter table public.projects add column if not exists leaderboard_version bigint not null default 0;
+
+create table if not exists public.leaderboard_entries (
+    submission_id uuid primary key references public.submissions(submission_id) on delete cascade,
+    project_id uuid not null references public.projects(project_id) on delete cascade,
+    total_score numeric(8, 4) not null default 0,
+    criteria_scores jsonb not null default '{}'::jsonb,
+    scored_criteria integer not null default 0,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists leaderboard_entries_rank_idx
+    on public.leaderboard_entries (project_id, total_score desc, submission_id desc);
+
+create or replace function public.refresh_leaderboard_entries(p_submission_ids uuid[])
+returns void
+language sql
+as $$
+    insert into public.leaderboard_entries as l
+        (submission_id, project_id, total_score, criteria_scores, scored_criteria, updated_at)
+    select s.submission_id,
+           s.project_id,
+           coalesce(sum(e.score / 5.0 * c.weight / 100.0 * 10), 0),
+           coalesce(
+               jsonb_object_agg(c.criterion_name, round(e.score / 5.0 * c.weight / 100.0 * 10, 4))
+                   filter (where c.criterion_id is not null),
+               '{}'::jsonb
+           ),
+           count(c.criterion_id),
+           now()
+    from public.submissions s
+    left join public.evaluation_scores e on e.submission_id = s.submission_id
+    left join public.scoring_criteria c on c.criterion_id = e.criterion_id
+    where s.submission_id = any(p_submission_ids)
+    group by s.submission_id, s.project_id
+    on conflict (submission_id) do update
+        set total_score = excluded.total_score,
+            criteria_scores = excluded.criteria_scores,
+            scored_criteria = excluded.scored_criteria,
+            updated_at = excluded.updated_at;
+
+    update public.projects
+    set leaderboard_version = leaderboard_version + 1
+    where project_id in (
+        select distinct s.project_id from public.submissions s where s.submission_id = any(p_submission_ids)
+    );
+$$;
+
+-- Score changes → recompute only the touched submissions
+create or replace function public.leaderboard_scores_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform public.refresh_leaderboard_entries(array(select distinct submission_id from changed_scores));
+    return null;
+end;
+$$;
+
+drop trigger if exists evaluation_scores_leaderboard_insert on public.evaluation_scores;
+create trigger evaluation_scores_leaderboard_insert
+    after insert on public.evaluation_scores
+    referencing new table as changed_scores
+    for each statement execute function public.leaderboard_scores_changed();
+
+drop trigger if exists evaluation_scores_leaderboard_update on public.evaluation_scores;
+create trigger evaluation_scores_leaderboard_update
+    after update on public.evaluation_scores
+    referencing new table as changed_scores
+    for each statement execute function public.leaderboard_scores_changed();
+
+drop trigger if exists evaluation_scores_leaderboard_delete on public.evaluation_scores;
+create trigger evaluation_scores_leaderboard_delete
+    after delete on public.evaluation_scores
+    referencing old table as changed_scores
+    for each statement execute function public.leaderboard_scores_changed();
+
+-- Rubric changes (weights, names) → recompute the project
+create or replace function public.leaderboard_criteria_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform public.refresh_leaderboard_entries(array(
+        select s.submission_id
+        from public.submissions s
+        join public.leaderboard_entries l on l.submission_id = s.submission_id
+        where s.project_id in (select distinct project_id from changed_criteria)
+    ));
+    return null;
+end;
+$$;
+
+drop trigger if exists scoring_criteria_leaderboard_insert on public.scoring_criteria;
+create trigger scoring_criteria_leaderboard_insert
+    after insert on public.scoring_criteria
+    referencing new table as changed_criteria
+    for each statement execute function public.leaderboard_criteria_changed();
+
+drop trigger if exists scoring_criteria_leaderboard_update on public.scoring_criteria;
+create trigger scoring_criteria_leaderboard_update
+    after update on public.scoring_criteria
+    referencing new table as changed_criteria
+    for each statement execute function public.leaderboard_criteria_changed();
+
+drop trigger if exists scoring_criteria_leaderboard_delete on public.scoring_criteria;
+create trigger scoring_criteria_leaderboard_delete
+    after delete on public.scoring_criteria
+    referencing old table as changed_criteria
+    for each statement execute function public.leaderboard_criteria_changed();
+
+-- Team names and problem statement assignment are joined at read time; only the version moves
+create or replace function public.leaderboard_submission_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.projects
+    set leaderboard_version = leaderboard_version + 1
+    where project_id = new.project_id;
+    return null;
+end;
+$$;
+
+drop trigger if exists submissions_leaderboard_update on public.submissions;
+create trigger submissions_leaderboard_update
+    after update of team_name, drive_file_name, drive_file_url, detected_problem_statement_id on public.submissions
+    for each row
+    when (old.team_name is distinct from new.team_name
+          or old.drive_file_name is distinct from new.drive_file_name
+          or old.drive_file_url is distinct from new.drive_file_url
+          or old.detected_problem_statement_id is distinct from new.detected_problem_statement_id)
+    execute function public.leaderboard_submission_changed();
+
+-- One ranked page. Ranks are over the (optionally problem-statement filtered) board;
+-- pagination is keyset on (total_score, submission_id) descending.
+create or replace function public.project_leaderboard(
+    p_project_id uuid,
+    p_statement_id uuid default null,
+    p_limit integer default 100,
+    p_after_score numeric default null,
+    p_after_id uuid default null
+)
+returns table (
+    submission_id uuid,
+    team_name text,
+    drive_file_name text,
+    drive_file_url text,
+    detected_problem_statement_id uuid,
+    total_score numeric,
+    criteria_scores jsonb,
+    scored_criteria integer,
+    rank bigint,
+    ai_feedback text,
+    total_count bigint
+)
+language sql
+stable
+as $$
+    with ranked as (
+        select l.submission_id,
+               s.team_name::text as team_name,
+               s.drive_file_name::text as drive_file_name,
+               s.drive_file_url::text as drive_file_url,
+               s.detected_problem_statement_id,
+               l.total_score,
+               l.criteria_scores,
+               l.scored_criteria,
+               rank() over (order by l.total_score desc) as rank,
+               count(*) over () as total_count
+        from public.leaderboard_entries l
+        join public.submissions s on s.submission_id = l.submission_id
+        where l.project_id = p_project_id
+          and (p_statement_id is null or s.detected_problem_statement_id = p_statement_id)
+    ),
+    page as (
+        select *
+        from ranked
+        where p_after_score is null
+           or (ranked.total_score, ranked.submission_id) < (p_after_score, p_after_id)
+        order by ranked.total_score desc, ranked.submission_id desc
+        limit p_limit
+    )
+    select page.submission_id,
+           page.team_name,
+           page.drive_file_name,
+           page.drive_file_url,
+           page.detected_problem_statement_id,
+           page.total_score,
+           page.criteria_scores,
+           page.scored_criteria,
+           page.rank,
+           (
+               select string_agg(c.criterion_name || ': ' || e.feedback, E'\n\n' order by c.criterion_name)
+               from public.evaluation_scores e
+               join public.scoring_criteria c on c.criterion_id = e.criterion_id
+               where e.submission_id = page.submission_id
+           ),
+           page.total_count
+    from page
+    order by page.total_score desc, page.submission_id desc;
+$$;
+
+-- Backfill boards for scores written before this migration
+select public.refresh_leaderboard_entries(array(select distinct submission_id from public.evaluation_scores));
@@ -0,0 +1,14 @@
+-- One job row per (submission, job_type), so the API can create/requeue a whole project's
+-- jobs in a single upsert (see app/routes/projects.py::_queue_extraction).
+
+-- Racing select-then-insert paths could leave duplicates — keep the newest row of each pair
+delete from public.processing_jobs a
+using public.processing_jobs b
+where a.submission_id = b.submission_id
+  and a.job_type = b.job_type
+  and a.ctid < b.ctid;
+
+alter table public.processing_jobs
+    drop constraint if exists processing_jobs_submission_job_type_key;
+alter table public.processing_jobs
+    add constraint processing_jobs_submission_job_type_key unique (submission_id, job_type);
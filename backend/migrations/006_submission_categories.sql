@@ -0,0 +1,22 @@
+-- Writes auto-categorization results for many submissions in one call, touching only the
+-- category columns. Called by app.services.embedding_service._bulk_update_submissions;
+-- p_rows is a JSON array of {submission_id, detected_problem_statement_id, detection_confidence}.
+create or replace function public.set_submission_categories(p_rows jsonb)
+returns integer
+language sql
+as $$
+    with updated as (
+        update public.submissions s
+        set detected_problem_statement_id = r.detected_problem_statement_id,
+            detection_confidence = r.detection_confidence,
+            updated_at = now()
+        from jsonb_to_recordset(p_rows) as r(
+            submission_id uuid,
+            detected_problem_statement_id uuid,
+            detection_confidence double precision
+        )
+        where s.submission_id = r.submission_id
+        returning 1
+    )
+    select count(*)::integer from updated;
+$$;
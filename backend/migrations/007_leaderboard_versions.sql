@@ -0,0 +1,104 @@
+-- Leaderboard version off the project row, and the score scale from the project.
+--
+-- 004 bumped projects.leaderboard_version on every score write, so all concurrent writers of
+-- a project queued on its row lock (alongside status updates of the project itself). The
+-- version now lives in its own leaderboard_versions row and is bumped at most once per
+-- transaction: a bulk score upsert or a bulk categorization is one bump, however many rows
+-- it touches. GET /projects/{id}/leaderboard still uses it as its ETag / cache key.
+--
+-- Points: a 1-5 rubric score is worth (score / 5) * weight% of projects.max_score (the
+-- "score out of" chosen with the rubric, 10 unless set), so with weights summing to 100 the
+-- total is out of max_score.
+
+alter table public.projects add column if not exists max_score numeric(8, 2) not null default 10;
+
+create table if not exists public.leaderboard_versions (
+    project_id uuid primary key references public.projects(project_id) on delete cascade,
+    version bigint not null default 0,
+    bumped_txid bigint,
+    updated_at timestamptz not null default now()
+);
+
+insert into public.leaderboard_versions (project_id, version)
+select project_id, leaderboard_version from public.projects
+on conflict (project_id) do nothing;
+
+alter table public.projects drop column if exists leaderboard_version;
+
+create or replace function public.bump_leaderboard_version(p_project_ids uuid[])
+returns void
+language sql
+as $$
+    insert into public.leaderboard_versions as v (project_id, version, bumped_txid, updated_at)
+    select distinct p, 1, txid_current(), now()
+    from unnest(p_project_ids) as p
+    where p is not null
+    on conflict (project_id) do update
+        set version = v.version + 1,
+            bumped_txid = excluded.bumped_txid,
+            updated_at = excluded.updated_at
+        where v.bumped_txid is distinct from excluded.bumped_txid;
+$$;
+
+create or replace function public.refresh_leaderboard_entries(p_submission_ids uuid[])
+returns void
+language sql
+as $$
+    insert into public.leaderboard_entries as l
+        (submission_id, project_id, total_score, criteria_scores, scored_criteria, updated_at)
+    select s.submission_id,
+           s.project_id,
+           coalesce(sum(e.score / 5.0 * c.weight / 100.0 * p.max_score), 0),
+           coalesce(
+               jsonb_object_agg(c.criterion_name, round(e.score / 5.0 * c.weight / 100.0 * p.max_score, 4))
+                   filter (where c.criterion_id is not null),
+               '{}'::jsonb
+           ),
+           count(c.criterion_id),
+           now()
+    from public.submissions s
+    join public.projects p on p.project_id = s.project_id
+    left join public.evaluation_scores e on e.submission_id = s.submission_id
+    left join public.scoring_criteria c on c.criterion_id = e.criterion_id
+    where s.submission_id = any(p_submission_ids)
+    group by s.submission_id, s.project_id, p.max_score
+    on conflict (submission_id) do update
+        set total_score = excluded.total_score,
+            criteria_scores = excluded.criteria_scores,
+            scored_criteria = excluded.scored_criteria,
+            updated_at = excluded.updated_at;
+
+    select public.bump_leaderboard_version(array(
+        select distinct s.project_id from public.submissions s where s.submission_id = any(p_submission_ids)
+    ));
+$$;
+
+create or replace function public.leaderboard_submission_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform public.bump_leaderboard_version(array[new.project_id]);
+    return null;
+end;
+$$;
+
+-- A new scale → recompute the project's board
+create or replace function public.leaderboard_project_changed()
+returns trigger
+language plpgsql
+as $$
+begin
+    perform public.refresh_leaderboard_entries(array(
+        select l.submission_id from public.leaderboard_entries l where l.project_id = new.project_id
+    ));
+    return null;
+end;
+$$;
+
+drop trigger if exists projects_leaderboard_update on public.projects;
+create trigger projects_leaderboard_update
+    after update of max_score on public.projects
+    for each row
+    when (old.max_score is distinct from new.max_score)
+    execute function public.leaderboard_project_changed();
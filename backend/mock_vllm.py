@@ -0,0 +1,266 @@
+"""
+mock_vllm.py — Local OpenAI-compatible stand-in for the Prometheus vLLM judge.
+
+Simulates vLLM's automatic prefix caching: prompts are split into 16-token blocks,
+each block hashed together with everything before it, and a request only reuses the
+blocks that a previous request has FINISHED prefilling. Latency is proportional to
+the uncached prompt tokens plus the generated tokens.
+
+Only MOCK_MAX_RUNNING requests are processed at once; the rest queue (up to
+MOCK_MAX_WAITING, then 503), and GET /metrics exposes vllm:num_requests_waiting /
+vllm:num_requests_running in the Prometheus text format vLLM itself uses.
+
+Service time can be drawn from a latency distribution (MOCK_LATENCY_DIST: fixed,
+lognormal, exponential) and failures injected at configurable rates: 500s, hung
+requests and judgements without a score. All knobs can be changed at runtime with
+POST /config.
+
+Run:
+    MOCK_ERROR_RATE=0.02 uvicorn mock_vllm:app --port 8001
+    PROMETHEUS_URL=http://localhost:8001/v1 celery -A app.celery_app worker -Q evaluation
+
+GET /stats reports prompt tokens processed vs served from the prefix cache.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+BLOCK_SIZE = 16
+CACHE_BLOCKS = int(os.getenv("MOCK_CACHE_BLOCKS", "20000"))
+PREFILL_MS_PER_1K_TOKENS = float(os.getenv("MOCK_PREFILL_MS_PER_1K", "40"))
+DECODE_MS_PER_TOKEN = float(os.getenv("MOCK_DECODE_MS_PER_TOKEN", "0.5"))
+FEEDBACK_WORDS = int(os.getenv("MOCK_FEEDBACK_WORDS", "60"))
+
+
+def _default_config() -> dict:
+    return {
+        "max_running": int(os.getenv("MOCK_MAX_RUNNING", "8")),
+        "max_waiting": int(os.getenv("MOCK_MAX_WAITING", "0")),         # 0 = unbounded queue
+        "base_ms": float(os.getenv("MOCK_BASE_MS", "0")),               # fixed per-request overhead
+        "latency_dist": os.getenv("MOCK_LATENCY_DIST", "fixed"),        # fixed | lognormal | exponential
+        "latency_sigma": float(os.getenv("MOCK_LATENCY_SIGMA", "0.5")),  # lognormal spread
+        "error_rate": float(os.getenv("MOCK_ERROR_RATE", "0")),         # HTTP 500
+        "hang_rate": float(os.getenv("MOCK_HANG_RATE", "0")),           # stall for hang_seconds first
+        "hang_seconds": float(os.getenv("MOCK_HANG_SECONDS", "120")),
+        "malformed_rate": float(os.getenv("MOCK_MALFORMED_RATE", "0")),  # judgement without [RESULT]
+    }
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(text: str) -> list:
+    """Rough word/punctuation tokenizer — good enough to compare prompt layouts."""
+    return _TOKEN_RE.findall(text)
+
+
+class PrefixCache:
+    """LRU of block hashes, chained so a block only matches after an identical prefix."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.blocks = OrderedDict()
+
+    def _block_hashes(self, tokens: list) -> list:
+        hashes, running = [], hashlib.sha256()
+        full_blocks = len(tokens) // BLOCK_SIZE
+        for b in range(full_blocks):
+            running.update("\x00".join(tokens[b * BLOCK_SIZE:(b + 1) * BLOCK_SIZE]).encode())
+            hashes.append(running.copy().hexdigest())
+        return hashes
+
+    def lookup(self, tokens: list) -> int:
+        """Number of leading tokens already cached."""
+        cached = 0
+        for h in self._block_hashes(tokens):
+            if h not in self.blocks:
+                break
+            self.blocks.move_to_end(h)
+            cached += BLOCK_SIZE
+        return cached
+
+    def insert(self, tokens: list):
+        for h in self._block_hashes(tokens):
+            self.blocks[h] = True
+            self.blocks.move_to_end(h)
+        while len(self.blocks) > self.capacity:
+            self.blocks.popitem(last=False)
+
+
+app = FastAPI(title="Mock vLLM")
+app.state.config = _default_config()
+app.state.rng = random.Random(int(os.getenv("MOCK_SEED", "0")))
+app.state.gauges = {"waiting": 0, "running": 0}
+_scheduler = asyncio.Condition()
+
+
+def _reset_state():
+    app.state.cache = PrefixCache(CACHE_BLOCKS)
+    app.state.stats = {
+        "requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+        "errors": 0, "rejected": 0, "hung": 0, "malformed": 0,
+    }
+    app.state.latencies = []
+
+
+_reset_state()
+
+
+def _prompt_text(body: dict) -> str:
+    if "messages" in body:
+        return "\n".join(m.get("content", "") for m in body["messages"])
+    return body.get("prompt", "")
+
+
+def _fake_judgement(prompt: str, body: dict) -> str:
+    """Deterministic judgement in the shape the request's guided decoding asks for."""
+    digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+    score = digest % 5 + 1
+    # Leave room for the score within max_tokens, like a grammar-constrained vLLM would
+    words = max(1, min(FEEDBACK_WORDS, int(body.get("max_tokens", 1024)) - 8) // 5)
+    feedback = " ".join(["The response addresses the rubric."] * words)
+    if body.get("guided_json"):
+        return json.dumps({"feedback": feedback, "score": score})
+    return f"Feedback: {feedback} [RESULT] {score}"
+
+
+def _latency_factor(config: dict) -> float:
+    rng = app.state.rng
+    if config["latency_dist"] == "lognormal":
+        return rng.lognormvariate(0.0, config["latency_sigma"])
+    if config["latency_dist"] == "exponential":
+        return rng.expovariate(1.0)
+    return 1.0
+
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def _acquire_slot():
+    async with _scheduler:
+        await _scheduler.wait_for(lambda: app.state.gauges["running"] < app.state.config["max_running"])
+        app.state.gauges["running"] += 1
+
+
+async def _release_slot():
+    async with _scheduler:
+        app.state.gauges["running"] -= 1
+        _scheduler.notify_all()
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = _prompt_text(body)
+    tokens = tokenize(prompt)
+    config, gauges, stats, rng = app.state.config, app.state.gauges, app.state.stats, app.state.rng
+    started = time.perf_counter()
+
+    if config["max_waiting"] and gauges["waiting"] >= config["max_waiting"]:
+        stats["rejected"] += 1
+        return JSONResponse({"error": {"message": "Too many queued requests"}}, status_code=503)
+
+    gauges["waiting"] += 1
+    try:
+        await _acquire_slot()
+    finally:
+        gauges["waiting"] -= 1
+    try:
+        if rng.random() < config["hang_rate"]:
+            stats["hung"] += 1
+            await asyncio.sleep(config["hang_seconds"])
+        if rng.random() < config["error_rate"]:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "Injected failure"}}, status_code=500)
+
+        cache = app.state.cache
+        cached = cache.lookup(tokens)
+        uncached = len(tokens) - cached
+        factor = _latency_factor(config)
+
+        # Prefill only the uncached part; blocks become reusable once prefill is done
+        await asyncio.sleep((config["base_ms"] + uncached / 1000 * PREFILL_MS_PER_1K_TOKENS) * factor / 1000)
+        cache.insert(tokens)
+
+        content = _fake_judgement(prompt, body)
+        if rng.random() < config["malformed_rate"]:
+            stats["malformed"] += 1
+            content = content.split("[RESULT]")[0].strip()
+        completion_tokens = min(len(tokenize(content)), int(body.get("max_tokens", 1024)))
+        await asyncio.sleep(completion_tokens * DECODE_MS_PER_TOKEN * factor / 1000)
+    finally:
+        await _release_slot()
+
+    stats["requests"] += 1
+    stats["prompt_tokens"] += len(tokens)
+    stats["cached_tokens"] += cached
+    stats["completion_tokens"] += completion_tokens
+    app.state.latencies.append(time.perf_counter() - started)
+
+    return {
+        "id": f"mock-{stats['requests']}",
+        "object": "chat.completion",
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": len(tokens),
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(tokens) + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        },
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    gauges = app.state.gauges
+    return (
+        "# TYPE vllm:num_requests_running gauge\n"
+        f'vllm:num_requests_running{{model_name="mock"}} {gauges["running"]}\n'
+        "# TYPE vllm:num_requests_waiting gauge\n"
+        f'vllm:num_requests_waiting{{model_name="mock"}} {gauges["waiting"]}\n'
+    )
+
+
+@app.get("/stats")
+async def get_stats():
+    stats = dict(app.state.stats)
+    stats["reprocessed_tokens"] = stats["prompt_tokens"] - stats["cached_tokens"]
+    stats["latency_p50"] = _percentile(app.state.latencies, 0.5)
+    stats["latency_p95"] = _percentile(app.state.latencies, 0.95)
+    return stats
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    _reset_state()
+    return {"status": "reset"}
+
+
+@app.get("/config")
+async def get_config():
+    return app.state.config
+
+
+@app.post("/config")
+async def update_config(request: Request):
+    """Merge runtime overrides, e.g. {"error_rate": 0.05, "latency_dist": "lognormal"}."""
+    updates = await request.json()
+    unknown = set(updates) - set(app.state.config)
+    if unknown:
+        return JSONResponse({"error": f"Unknown setting(s): {sorted(unknown)}"}, status_code=400)
+    app.state.config.update(updates)
+    async with _scheduler:
+        _scheduler.notify_all()  # max_running may have grown
+    return app.state.config
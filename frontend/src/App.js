@@ -122,12 +122,12 @@ function App() {
             {currentPage === 'create-project' && user && (
                 <CreateProjectPage
                     onBack={() => setCurrentPage('home')}
-                    onLaunch={() => setCurrentPage('processing')}
+                    onLaunch={(id) => { setSelectedProjectId(id); setCurrentPage('processing'); }}
                     user={user}
                 />
             )}
-            {currentPage === 'processing' && user && (
-                <ProcessingPage onComplete={() => setCurrentPage('home')} />
+            {currentPage === 'processing' && user && selectedProjectId && (
+                <ProcessingPage projectId={selectedProjectId} onComplete={() => setCurrentPage('home')} />
             )}
         </div>
     );
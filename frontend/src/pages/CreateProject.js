@@ -431,7 +431,7 @@ const CreateProjectPage = ({ onBack, onLaunch }) => {
             await startScan(token, project.project_id);
             setLaunchStep('processing');
             await startProcessing(token, project.project_id);
-            onLaunch();
+            onLaunch(project.project_id);
         } catch (error) {
             alert(`Launch failed: ${error.message}`);
         } finally {
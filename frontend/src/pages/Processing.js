@@ -1,15 +1,17 @@
 import React, { useState, useEffect, useRef } from 'react';
 import {
     Activity, Terminal, Database, FileText, AlertTriangle,
-    Pause, Square, Cpu, Check, Loader2, ScanLine, BrainCircuit, Play
+    Pause, Square, Clock, Check, Loader2, ScanLine, BrainCircuit, Play
 } from 'lucide-react';
+import { supabase } from '../services/auth';
+import { subscribeToProgress } from '../services/api';
 
 // --- SUB-COMPONENT: Processing Orbit (The Visual Tracker) ---
 const ProcessingOrbit = ({ stage, progress }) => {
     const steps = [
         { id: 0, label: "Ingesting", icon: Database },
-        { id: 1, label: "Visualizing", icon: ScanLine },
-        { id: 2, label: "Chunking", icon: FileText },
+        { id: 1, label: "Embedding", icon: ScanLine },
+        { id: 2, label: "Categorizing", icon: FileText },
         { id: 3, label: "Evaluating", icon: BrainCircuit }
     ];
 
@@ -121,9 +123,9 @@ const InterimStats = ({ stats }) => (
     <div className="grid grid-cols-2 md:grid-cols-4 gap-4">
         {[
             { label: "PPTs Scanned", value: stats.scanned, icon: FileText },
-            { label: "AI Flags", value: stats.flags, icon: AlertTriangle, color: "text-yellow-400" },
-            { label: "Avg. Score", value: stats.avgScore, icon: Activity },
-            { label: "Sys. Health", value: "99.8%", icon: Cpu, color: "text-green-400" },
+            { label: "Failed", value: stats.failed, icon: AlertTriangle, color: "text-yellow-400" },
+            { label: "Evaluated", value: stats.evaluated, icon: Activity },
+            { label: "ETA", value: stats.eta, icon: Clock, color: "text-green-400" },
         ].map((stat, i) => (
             <div key={i} className="bg-white/5 border border-white/10 p-4 rounded-xl flex items-center space-x-4">
                 <div className={`p-2 bg-white/5 rounded-lg ${stat.color || 'text-white'}`}>
@@ -140,79 +142,90 @@ const InterimStats = ({ stats }) => (
 
 // --- MAIN PAGE COMPONENT ---
 
-const ProcessingPage = ({ onComplete }) => {
+// Pipeline stages in order, as counted by the backend progress snapshot
+const STAGE_FIELDS = ['extraction_complete', 'embedding_complete', 'categorization_complete', 'evaluation_complete'];
+const STAGE_LOG = {
+    extracted: { verb: 'extracted', type: 'info' },
+    embedded: { verb: 'embedded', type: 'info' },
+    categorized: { verb: 'categorized', type: 'info' },
+    evaluated: { verb: 'evaluated', type: 'success' },
+    failed: { verb: 'failed', type: 'error' },
+};
+
+const formatEta = (seconds) => {
+    if (seconds === null || seconds === undefined) return '—';
+    if (seconds < 60) return `${seconds}s`;
+    return `${Math.floor(seconds / 60)}m ${seconds % 60}s`;
+};
+
+const ProcessingPage = ({ projectId, onComplete }) => {
     // --- STATE ---
     const [progress, setProgress] = useState(0);
     const [stage, setStage] = useState(0);
     const [isPaused, setIsPaused] = useState(false);
     const [logs, setLogs] = useState([]);
-    const [stats, setStats] = useState({ scanned: 0, flags: 0, avgScore: 0 });
-    const [skeletonCards, setSkeletonCards] = useState([1, 2, 3]); // Placeholder IDs
+    const [stats, setStats] = useState({ scanned: 0, failed: 0, evaluated: 0, eta: '—' });
+    const [skeletonCards, setSkeletonCards] = useState([]); // Recently evaluated submission ids
+    const onCompleteRef = useRef(onComplete);
+    const completedRef = useRef(false);
 
-    // --- SIMULATION LOGIC ---
     useEffect(() => {
-        if (isPaused) return;
-
-        const timer = setInterval(() => {
-            setProgress((prev) => {
-                if (prev >= 100) {
-                    clearInterval(timer);
-                    if (onComplete) onComplete();
-                    return 100;
-                }
+        onCompleteRef.current = onComplete;
+    }, [onComplete]);
 
-                // Logic to switch stages based on progress percentage
-                const newProgress = prev + (Math.random() * 1.5); // Random increment
-                if (newProgress > 25 && stage === 0) setStage(1);
-                if (newProgress > 50 && stage === 1) setStage(2);
-                if (newProgress > 75 && stage === 2) setStage(3);
-
-                // Simulation: Add Logs randomly
-                if (Math.random() > 0.7) addRandomLog(newProgress);
-
-                // Simulation: Update Stats randomly
-                if (Math.random() > 0.85) updateRandomStats();
-
-                // Simulation: "Process" a card every ~20%
-                if (Math.floor(newProgress) % 20 === 0 && Math.floor(newProgress) !== Math.floor(prev)) {
-                    setSkeletonCards(curr => [...curr, curr.length + 1]);
+    // --- LIVE PROGRESS (SSE) ---
+    useEffect(() => {
+        if (isPaused || !projectId) return;
+        let unsubscribe = null;
+        let cancelled = false;
+
+        const addLog = (msg, type = 'info') => {
+            const time = new Date().toLocaleTimeString('en-US', { hour12: false });
+            setLogs(prev => [...prev.slice(-20), { time, msg, type }]); // Keep last 20
+        };
+
+        const onProgress = (snapshot, delta) => {
+            if (delta?.event === 'reset') addLog(`Run started: ${delta.total} submission(s) queued.`);
+            if (delta?.event === 'stage' && STAGE_LOG[delta.stage]) {
+                const { verb, type } = STAGE_LOG[delta.stage];
+                addLog(`${delta.submission_ids.length} submission(s) ${verb}.`, type);
+                if (delta.stage === 'evaluated') {
+                    setSkeletonCards(curr => [...curr, ...delta.submission_ids].slice(-12));
                 }
-
-                return newProgress;
+            }
+            if (!snapshot || !snapshot.total_submissions) return;
+
+            const total = snapshot.total_submissions;
+            const failed = snapshot.failed || 0;
+            // Each stage is a quarter of the ring; failed submissions count as done everywhere
+            const fractions = STAGE_FIELDS.map(f => Math.min(1, ((snapshot[f] || 0) + failed) / total));
+            const current = fractions.findIndex(f => f < 1);
+            setProgress(fractions.reduce((a, f) => a + f, 0) / STAGE_FIELDS.length * 100);
+            setStage(current === -1 ? STAGE_FIELDS.length : current);
+            setStats({
+                scanned: snapshot.extraction_complete || 0,
+                failed,
+                evaluated: snapshot.evaluation_complete || 0,
+                eta: formatEta(snapshot.eta_seconds),
             });
-        }, 100); // Speed of update
-
-        return () => clearInterval(timer);
-    }, [isPaused, stage, onComplete]);
-
-    // Helper: Generate fake logs
-    const addRandomLog = (currentProg) => {
-        const time = new Date().toLocaleTimeString('en-US', { hour12: false });
-        const logTemplates = [
-            { msg: `Vectorizing Slide ${Math.floor(Math.random() * 10) + 1}...`, type: 'info' },
-            { msg: `Team_${Math.floor(Math.random() * 100)}: Architecture verified.`, type: 'success' },
-            { msg: `RAG Retrieval: Found 3 matching citations.`, type: 'info' },
-            { msg: `Analysing revenue model feasibility...`, type: 'info' },
-            { msg: `Warning: High probability of generic LLM text detected.`, type: 'flag' },
-            { msg: `Token limit optimized for Gemini Flash.`, type: 'info' }
-        ];
-
-        // Choose log based on stage
-        let validLogs = logTemplates;
-        if (currentProg < 25) validLogs = [{ msg: `Ingesting PDF Buffer...`, type: 'info' }];
-
-        const randomLog = validLogs[Math.floor(Math.random() * validLogs.length)];
-        setLogs(prev => [...prev.slice(-20), { time, ...randomLog }]); // Keep last 20
-    };
-
-    // Helper: Update stats
-    const updateRandomStats = () => {
-        setStats(prev => ({
-            scanned: prev.scanned + 1,
-            flags: Math.random() > 0.8 ? prev.flags + 1 : prev.flags,
-            avgScore: (7 + Math.random() * 2).toFixed(1)
-        }));
-    };
+            if (current === -1 && !completedRef.current) {
+                completedRef.current = true;
+                addLog('All submissions processed.', 'success');
+                setTimeout(() => onCompleteRef.current && onCompleteRef.current(), 1500);
+            }
+        };
+
+        (async () => {
+            const { data: { session } } = await supabase.auth.getSession();
+            if (!session || cancelled) return;
+            unsubscribe = subscribeToProgress(session.access_token, projectId, onProgress);
+        })();
+
+        return () => {
+            cancelled = true;
+            if (unsubscribe) unsubscribe();
+        };
+    }, [isPaused, projectId]);
 
     return (
         <div className="min-h-screen bg-[#050505] text-white font-sans selection:bg-white/20 flex flex-col p-6 lg:p-12">
@@ -2,10 +2,10 @@ import React, { useState, useEffect, useCallback } from 'react';
 import {
     ArrowLeft, RefreshCw, FileText, CheckCircle2, XCircle,
     Loader2, ChevronRight, Database, Layers,
-    HardDrive, ExternalLink, RotateCcw, Activity, FolderOpen
+    HardDrive, ExternalLink, RotateCcw, Activity, FolderOpen, Search
 } from 'lucide-react';
 import { supabase } from '../services/auth';
-import { getProjectDetails, reEvaluate } from '../services/api';
+import { getProjectDetails, reEvaluate, searchSlides } from '../services/api';
 
 // ─── Status badge helper ────────────────────────────────────────────────────
 const StatusBadge = ({ status }) => {
@@ -209,6 +209,9 @@ const ProjectDetail = ({ projectId, onBack, onReEvaluate }) => {
                     <StatCard icon={HardDrive} label="Total Size" value={`${totalMB} MB`} />
                 </div>
 
+                {/* ── Slide search ── */}
+                <SlideSearch projectId={projectId} />
+
                 {/* ── Submissions table ── */}
                 <div className="bg-[#0A0A0A] border border-white/10 rounded-3xl overflow-hidden">
                     {/* Table header */}
@@ -327,14 +330,22 @@ const SubmissionDetail = ({ submissionId, status }) => {
             try {
                 const { data: { session } } = await supabase.auth.getSession();
                 if (!session) return;
-                const resp = await fetch(
-                    `${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/submissions/${submissionId}/slides`,
-                    { headers: { 'Authorization': `Bearer ${session.access_token}` } }
-                );
-                if (resp.ok) {
+                // Only the columns the preview renders; large decks arrive in pages
+                const base = `${process.env.REACT_APP_API_URL || 'http://localhost:8000'}/submissions/${submissionId}/slides`
+                    + '?fields=slide_id,slide_number,complexity_score,text_content&limit=200';
+                const all = [];
+                let cursor = null;
+                do {
+                    const resp = await fetch(
+                        cursor === null ? base : `${base}&after=${cursor}`,
+                        { headers: { 'Authorization': `Bearer ${session.access_token}` } }
+                    );
+                    if (!resp.ok) break;
                     const d = await resp.json();
-                    setSlides(d.slides || []);
-                }
+                    all.push(...(d.slides || []));
+                    cursor = d.next_cursor ?? null;
+                } while (cursor !== null);
+                setSlides(all);
             } catch (e) {
                 console.error(e);
             } finally {
@@ -401,4 +412,87 @@ const SubmissionDetail = ({ submissionId, status }) => {
     );
 };
 
+// ─── Slide search: teams whose slides best match a query ─────────────────────
+const Highlighted = ({ text, highlights }) => {
+    // `highlights` are [start, end] offsets into `text`, in order
+    const parts = [];
+    let pos = 0;
+    (highlights || []).forEach(([start, end], i) => {
+        if (start > pos) parts.push(<span key={`t${i}`}>{text.slice(pos, start)}</span>);
+        parts.push(<mark key={`m${i}`} className="bg-white/20 text-white rounded px-0.5">{text.slice(start, end)}</mark>);
+        pos = end;
+    });
+    parts.push(<span key="rest">{text.slice(pos)}</span>);
+    return <>{parts}</>;
+};
+
+const SlideSearch = ({ projectId }) => {
+    const [query, setQuery] = useState('');
+    const [results, setResults] = useState(null);
+    const [searching, setSearching] = useState(false);
+    const [error, setError] = useState('');
+
+    const runSearch = async (e) => {
+        e.preventDefault();
+        if (!query.trim()) return;
+        setSearching(true);
+        setError('');
+        try {
+            const { data: { session } } = await supabase.auth.getSession();
+            if (!session) return;
+            const data = await searchSlides(session.access_token, projectId, query.trim());
+            setResults(data.results || []);
+        } catch (err) {
+            setError(err.message);
+        } finally {
+            setSearching(false);
+        }
+    };
+
+    return (
+        <div className="mb-10 bg-[#0A0A0A] border border-white/10 rounded-3xl overflow-hidden">
+            <form onSubmit={runSearch} className="px-6 py-4 flex items-center gap-3 border-b border-white/5">
+                <Search className="w-4 h-4 text-gray-500 shrink-0" />
+                <input
+                    value={query}
+                    onChange={e => setQuery(e.target.value)}
+                    placeholder="Search slides across every team…"
+                    className="flex-1 bg-transparent text-sm placeholder-gray-600 focus:outline-none"
+                />
+                {searching && <Loader2 className="w-4 h-4 animate-spin text-gray-500" />}
+            </form>
+
+            {error && <p className="px-6 py-4 text-sm text-red-400">{error}</p>}
+
+            {results && !error && (
+                results.length === 0 ? (
+                    <p className="px-6 py-4 text-sm text-gray-600">No matching slides.</p>
+                ) : (
+                    <div className="divide-y divide-white/5 max-h-96 overflow-y-auto">
+                        {results.map(team => (
+                            <div key={team.submission_id} className="px-6 py-4">
+                                <div className="font-semibold text-sm mb-2">{team.team_name || 'Unnamed team'}</div>
+                                <div className="space-y-2">
+                                    {team.hits.map(hit => (
+                                        <div key={hit.slide_id} className="flex gap-3 text-xs">
+                                            <span className="font-mono text-gray-500 uppercase tracking-widest shrink-0 w-16">
+                                                Slide {hit.slide_number}
+                                            </span>
+                                            <p className="text-gray-400 leading-relaxed font-mono">
+                                                {hit.snippet
+                                                    ? <Highlighted text={hit.snippet} highlights={hit.highlights} />
+                                                    : '(no preview)'}
+                                            </p>
+                                        </div>
+                                    ))}
+                                </div>
+                            </div>
+                        ))}
+                    </div>
+                )
+            )}
+        </div>
+    );
+};
+
 export default ProjectDetail;
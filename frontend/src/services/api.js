@@ -139,13 +139,36 @@ export const startProcessing = async (token, projectId) => {
     return await response.json();
 };
 
-export const getProjectDetails = async (token, projectId) => {
-    const response = await fetch(`${API_URL}/projects/${projectId}/details`, {
+export const getProjectDetails = async (token, projectId, { pageSize = 500 } = {}) => {
+    // The endpoint is paged; follow `has_more` so large projects come back whole
+    let offset = 0;
+    let data = null;
+    const submissions = [];
+    do {
+        const params = new URLSearchParams({ limit: pageSize, offset });
+        const response = await fetch(`${API_URL}/projects/${projectId}/details?${params}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!response.ok) {
+            const error = await response.json();
+            throw new Error(error.detail || 'Failed to fetch project details');
+        }
+        data = await response.json();
+        submissions.push(...(data.submissions || []));
+        offset += pageSize;
+    } while (data.has_more && data.submissions?.length);
+    return { ...data, submissions, offset: 0, has_more: false };
+};
+
+export const searchSlides = async (token, projectId, query, { limit = 10, hybrid = true } = {}) => {
+    // Results are grouped per team; hits carry `snippet` + `highlights` ([start, end] offsets)
+    const params = new URLSearchParams({ q: query, limit, hybrid });
+    const response = await fetch(`${API_URL}/projects/${projectId}/search?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
     });
     if (!response.ok) {
         const error = await response.json();
-        throw new Error(error.detail || 'Failed to fetch project details');
+        throw new Error(error.detail || 'Search failed');
     }
     return await response.json();
 };
@@ -179,3 +202,18 @@ export const parseRubric = async (token, rawText) => {
         throw error;
     }
 };
+
+export const subscribeToProgress = (token, projectId, onProgress) => {
+    // Server-Sent Events: the backend pushes counts + ETA on every pipeline stage transition.
+    // EventSource can't send headers, so the token travels as a query parameter.
+    // onProgress(snapshot, delta) — delta is null for the initial snapshot
+    const source = new EventSource(
+        `${API_URL}/projects/${projectId}/progress/stream?access_token=${encodeURIComponent(token)}`
+    );
+    source.addEventListener('snapshot', (e) => onProgress(JSON.parse(e.data), null));
+    source.addEventListener('progress', (e) => {
+        const delta = JSON.parse(e.data);
+        onProgress(delta.snapshot, delta);
+    });
+    return () => source.close();
+};